@@ -0,0 +1,107 @@
+"""
+Shared answers for canonical first-turn chat prompts.
+
+Picking a numbered concept or gap in student chat becomes a fixed prompt,
+"Can you explain the concept of {concept}?" or "Help me understand {concept}".
+As the first LLM turn of a conversation, such a prompt is answered from a
+reduced system prompt, the static student prefix plus the topic and class
+(system_prompts.shared_student_prompt), so the answer can be shared by every
+student of that topic and class whatever their weak concepts. Answers are
+cached by (prompt kind, normalized concept, topic and branch, prefix
+fingerprint, model), optionally persisted to SQLite, and concurrent requests
+for the same key share one streamed call (shared_generation.SharedGeneration).
+
+Cached answers are replayed as a quick simulated stream so a hit looks like
+a normal reply. Bump ANSWER_PROMPT_VERSION when the canonical prompts change.
+"""
+import hashlib
+import os
+import re
+import time
+
+import llm_gateway
+import metrics
+from caches import PersistentCache
+from disk_cache import DiskCache
+from edubull_client import DISK_CACHE_MAX_BYTES, DISK_CACHE_PATH
+from learning_paths import normalize_concept
+from llm_scheduler import PRIORITY_CHAT
+from shared_generation import SharedGeneration
+from system_prompts import STUDENT_PROMPT_PREFIX, shared_student_prompt
+
+ANSWER_PROMPT_VERSION = "2"
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAXSIZE = int(os.environ.get("ANSWER_CACHE_MAXSIZE", "2000"))
+ANSWER_DISK_CACHE = os.environ.get("ANSWER_DISK_CACHE", DISK_CACHE_PATH)
+ANSWER_WORKERS = int(os.environ.get("ANSWER_WORKERS", "8"))
+# Replay pace for cached answers: words per chunk and seconds between chunks
+REPLAY_WORDS = 4
+REPLAY_DELAY = float(os.environ.get("ANSWER_REPLAY_DELAY", "0.01"))
+
+CANONICAL_PROMPTS = {
+    "explain": re.compile(r"can you explain the concept of (.+?)\??", re.IGNORECASE),
+    "understand": re.compile(r"help me understand (.+?)[.?]?", re.IGNORECASE),
+}
+# Changes to the static prefix invalidate every shared answer
+PREFIX_FINGERPRINT = hashlib.sha256(STUDENT_PROMPT_PREFIX.encode("utf-8")).hexdigest()[:16]
+
+answer_cache = PersistentCache(
+    "canonical_answer",
+    maxsize=ANSWER_CACHE_MAXSIZE,
+    ttl=ANSWER_CACHE_TTL,
+    disk=DiskCache(ANSWER_DISK_CACHE, max_bytes=DISK_CACHE_MAX_BYTES) if ANSWER_DISK_CACHE else None,
+)
+
+
+def canonical_key(prompt_text, topic_name, branch_name, model=None):
+    """The cache key for a student's canonical prompt, or None if prompt_text is not one."""
+    text = re.sub(r"\s+", " ", (prompt_text or "").strip())
+    for kind, pattern in CANONICAL_PROMPTS.items():
+        match = pattern.fullmatch(text)
+        if match:
+            return {
+                "prompt": kind,
+                "concept": normalize_concept(match.group(1)),
+                "topic": normalize_concept(topic_name),
+                "branch": normalize_concept(branch_name),
+                "system": PREFIX_FINGERPRINT,
+                "model": model or llm_gateway.model_for("preset_prompt"),
+                "prompt_version": ANSWER_PROMPT_VERSION,
+            }
+    return None
+
+
+def replay(text):
+    """Yield a cached answer a few words at a time."""
+    words = re.findall(r"\S+\s*", text)
+    for i in range(0, len(words), REPLAY_WORDS):
+        if i:
+            time.sleep(REPLAY_DELAY)
+        yield "".join(words[i:i + REPLAY_WORDS])
+
+
+_generation = SharedGeneration("canonical_answer", "preset_prompt", answer_cache, ANSWER_WORKERS, replay=replay)
+
+
+def stream_answer(key, topic_name, branch_name, prompt_text, on_queue=None):
+    """
+    Yield the answer to a canonical prompt in chunks: replayed from the cache
+    on a hit, otherwise streamed from the (possibly shared) LLM call, which is
+    sent the shared student prompt for topic_name and branch_name. While that
+    call is queued, on_queue(position) is called instead.
+    """
+    messages = [{"role": "system", "content": shared_student_prompt(topic_name, branch_name)},
+                {"role": "user", "content": prompt_text}]
+    return _generation.stream(key, messages, on_queue=on_queue, priority=PRIORITY_CHAT)
+
+
+def invalidate(key=None):
+    """Drop one cached answer (by its key dict), or all of them."""
+    return _generation.invalidate(key)
+
+
+def cache_stats():
+    return _generation.stats()
+
+
+metrics.register_collector("canonical_answer_cache", cache_stats)
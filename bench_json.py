@@ -0,0 +1,131 @@
+"""
+Benchmark JSON decoding and compressed transfer for large teacher payloads.
+
+Builds a synthetic API_STUDENT_INFO response for a 1,000-student batch (the
+mock_edubull generator, padded with typical profile fields so its size is
+closer to a large school's response) and reports:
+
+  - bytes on the wire for identity, gzip and (if installed) brotli encoding
+  - decode time for stdlib json, orjson and ijson streaming (when installed),
+    each followed by parsing into models records, plus peak decode memory
+
+  python bench_json.py --students 1000 --repeat 20
+"""
+import argparse
+import gzip
+import io
+import json
+import time
+import tracemalloc
+
+import fastjson
+import mock_edubull
+from models import BATCH_ARRAYS, parse_batch_data
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Profile fields a student entry may carry; the UI reads none of them
+EXTRA_FIELDS = {
+    "EmailID": "student{0}@school.example.invalid",
+    "MobileNo": "98{0:08d}",
+    "FatherName": "Parent of student {0}",
+    "RollNo": "{0}",
+    "AdmissionNo": "ADM-{0:06d}",
+    "SectionName": "Section A",
+    "BranchName": "Class 8",
+    "LastLoginDate": "2024-01-15T10:{0:02d}:00",
+    "ProfileImage": "https://cdn.example.invalid/profiles/{0}.png",
+    "AvgMarksPercent": "{0}",
+}
+
+
+def build_payload(students, extra_fields=True):
+    body = mock_edubull.synth_student_info(
+        {"BatchID": 1, "TopicID": 3}, mock_edubull._rng("bench", {"students": students}), students
+    )
+    if extra_fields:
+        for i, student in enumerate(body["Students"]):
+            for key, template in EXTRA_FIELDS.items():
+                student[key] = template.format(i % 100 if key == "LastLoginDate" else i)
+    return json.dumps(body).encode("utf-8")
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def run(students, repeat, extra_fields=True):
+    raw = build_payload(students, extra_fields)
+    report = {"students": students, "encodings": {}, "decoders": {}}
+
+    encodings = {"identity": (lambda b: b, lambda b: b), "gzip": (lambda b: gzip.compress(b, 6), gzip.decompress)}
+    if brotli is not None:
+        encodings["br"] = (lambda b: brotli.compress(b, quality=5), brotli.decompress)
+    for name, (compress, decompress) in encodings.items():
+        encoded = compress(raw)
+        report["encodings"][name] = {
+            "bytes": len(encoded),
+            "saved_pct": 100 * (1 - len(encoded) / len(raw)),
+            "decompress_ms": best_of(lambda: decompress(encoded), repeat) * 1000,
+        }
+
+    decoders = {"json": lambda: parse_batch_data(json.loads(raw))}
+    if fastjson.orjson is not None:
+        decoders["orjson"] = lambda: parse_batch_data(fastjson.orjson.loads(raw))
+    if fastjson.ijson is not None:
+        decoders["ijson stream"] = lambda: parse_batch_data(fastjson.stream_arrays(io.BytesIO(raw), BATCH_ARRAYS))
+    for name, decode in decoders.items():
+        report["decoders"][name] = {
+            "decode_ms": best_of(decode, repeat) * 1000,
+            "peak_kb": peak_memory(decode) / 1024,
+        }
+    return report
+
+
+def print_report(report):
+    identity = report["encodings"]["identity"]["bytes"]
+    print(f"\nSynthetic API_STUDENT_INFO response, {report['students']} students: {identity / 1024:.0f} KB\n")
+    print(f"{'encoding':10} {'KB':>8} {'saved':>7} {'decompress ms':>14}")
+    for name, e in report["encodings"].items():
+        print(f"{name:10} {e['bytes'] / 1024:>8.0f} {e['saved_pct']:>6.1f}% {e['decompress_ms']:>14.2f}")
+    print(f"\n{'decoder (+ records)':20} {'ms':>8} {'peak KB':>9}")
+    for name, d in report["decoders"].items():
+        print(f"{name:20} {d['decode_ms']:>8.2f} {d['peak_kb']:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON decoding and compression of batch payloads")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-extra-fields", action="store_true", help="Use the bare mock payload")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = run(args.students, args.repeat, extra_fields=not args.no_extra_fields)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
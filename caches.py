@@ -0,0 +1,288 @@
+"""
+Process-wide in-memory caches.
+
+Streamlit re-executes eeebee.py on every rerun, so anything that must outlive a
+rerun or be shared between sessions lives in an imported module like this one.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    With max_bytes set, least recently used entries are also evicted while the
+    values' total len() exceeds it (for bytes values such as rendered images).
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=3600, max_bytes=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Like get() but without touching LRU order or hit/miss counters."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.monotonic():
+                return item[1]
+            return default
+
+    def _size(self, value):
+        return len(value) if self.max_bytes is not None else 0
+
+    def _drop(self, key):
+        _, value = self._data.pop(key)
+        self.bytes -= self._size(value)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (expires_at, value)
+            self.bytes += self._size(value)
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+            ):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def __contains__(self, key):
+        return self.peek(key) is not None
+
+    def invalidate(self, key):
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._drop(key)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class StaleWhileRevalidateCache:
+    """
+    Serve the last good value immediately and refresh it in the background.
+
+    Values younger than `fresh_for` seconds are returned as-is. Older values are
+    still returned at once while a single background refresh runs. Values older
+    than `max_age` (or missing) are loaded synchronously. Failed refreshes keep
+    the previous value.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, name, fresh_for=60, max_age=3600, maxsize=512):
+        self.name = name
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @classmethod
+    def _get_executor(cls):
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr-refresh")
+        return cls._executor
+
+    def _store(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _refresh(self, key, loader):
+        try:
+            self._store(key, loader())
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.refresh_failures += 1
+            logging.warning(f"Background refresh of {self.name} {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key, loader):
+        """
+        Return (value, fetched_at) for key, calling loader() when needed.
+
+        fetched_at is a time.time() timestamp. Exceptions from a synchronous
+        load propagate and nothing is stored.
+        """
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                fetched_at, value = item
+                age = now - fetched_at
+                if age < self.fresh_for:
+                    self.fresh_hits += 1
+                    self._data.move_to_end(key)
+                    return value, fetched_at
+                if age < self.max_age:
+                    self.stale_hits += 1
+                    self._data.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._get_executor().submit(self._refresh, key, loader)
+                    return value, fetched_at
+            self.misses += 1
+
+        value = loader()
+        self._store(key, value)
+        return value, time.time()
+
+    def peek(self, key):
+        """Return (value, fetched_at) without loading, or None if absent or too old."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or time.time() - item[0] >= self.max_age:
+                return None
+            return item[1], item[0]
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "fresh_hits": self.fresh_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+            }
+
+
+class PersistentCache:
+    """
+    In-memory TTL/LRU cache with an optional DiskCache behind it, for values
+    that are expensive to produce (LLM output) and worth keeping across restarts.
+
+    Keys are flat dicts of JSON scalars; values must be JSON-serialisable.
+    Entries are stored as {"key", "value", "created_at"} so they can be listed
+    and invalidated from an admin page.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=7 * 24 * 3600, disk=None):
+        self.name = name
+        self.ttl = ttl
+        self.disk = disk
+        self._memory = TTLCache(name, maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _memory_key(key):
+        return tuple(sorted(key.items()))
+
+    def get(self, key):
+        """Return the cached entry dict for key, or None."""
+        memory_key = self._memory_key(key)
+        entry = self._memory.get(memory_key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(self.name, key)
+            if entry is not None:
+                remaining = entry["created_at"] + self.ttl - time.time()
+                if remaining > 0:
+                    self._memory.set(memory_key, entry, ttl=remaining)
+                else:
+                    entry = None
+        return entry
+
+    def set(self, key, value):
+        entry = {"key": key, "value": value, "created_at": time.time()}
+        self._memory.set(self._memory_key(key), entry)
+        if self.disk is not None:
+            self.disk.set(self.name, key, entry, self.ttl)
+        return entry
+
+    def delete(self, key):
+        removed = self._memory.invalidate(self._memory_key(key))
+        if self.disk is not None:
+            removed = self.disk.delete(self.name, key) or removed
+        return removed
+
+    def clear(self):
+        self._memory.clear()
+        if self.disk is not None:
+            self.disk.invalidate(self.name)
+
+    def entries(self):
+        """All live entries, newest first (disk entries included when persistence is on)."""
+        entries = {}
+        for memory_key in self._memory.keys():
+            entry = self._memory.peek(memory_key)
+            if entry is not None:
+                entries[memory_key] = entry
+        if self.disk is not None:
+            for entry in self.disk.values(self.name):
+                entries.setdefault(self._memory_key(entry["key"]), entry)
+        return sorted(entries.values(), key=lambda e: e["created_at"], reverse=True)
+
+    def stats(self):
+        stats = self._memory.stats()
+        stats["persistent"] = self.disk is not None
+        return stats
@@ -0,0 +1,170 @@
+"""
+Token-budgeted conversation windows for the chat LLM calls.
+
+ConversationWindow.build_messages() sends the system prompt plus as many
+recent turns as fit in CONTEXT_TOKEN_BUDGET. Turns that fall out of the window
+are folded into a rolling summary that is kept on the session's window and
+only extended when more turns fall out. Bulky command outputs (class and
+student analyses) are sent as the compact digests registered for them with
+add_digest(); only the latest one is sent in full.
+
+Tokens are counted with tiktoken when it is installed, otherwise estimated at
+four characters per token.
+"""
+import hashlib
+import logging
+import os
+
+import llm_gateway
+import metrics
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_MIN_RECENT_MESSAGES = int(os.environ.get("CONTEXT_MIN_RECENT_MESSAGES", "4"))
+# After a fold the recent turns are cut to this share of the budget, so the
+# summary is extended every few turns rather than on every turn
+CONTEXT_FOLD_TARGET = 0.6
+CONTEXT_SUMMARY_MAX_TOKENS = 400
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators around every chat message
+
+TOKEN_BUCKETS = (0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a tutoring conversation on the EeeBee learning platform. "
+    "Merge the new messages into the existing summary. Keep names, class names, concepts, numbers "
+    "and any requests or preferences the user stated; drop greetings and formatting. "
+    "Reply with the updated summary only, in at most 200 words."
+)
+
+_encodings = {}
+
+
+def _encoding(model):
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text, model="gpt-4o"):
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+def content_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ConversationWindow:
+    """Per-session context state: command-output digests and the rolling summary."""
+
+    def __init__(self, model="gpt-4o", budget=CONTEXT_TOKEN_BUDGET):
+        self.model = model
+        self.budget = budget
+        self.digests = {}       # content key -> digest text
+        self.summary = ""
+        self.summarized = 0     # leading history messages covered by the summary
+        self.last_stats = None
+        self._token_counts = {}  # content key -> tokens; history is re-counted every turn otherwise
+
+    def add_digest(self, content, digest):
+        """Send `digest` instead of `content` whenever content is not the latest command output."""
+        self.digests[content_key(content)] = digest
+
+    def tokens(self, text):
+        key = content_key(text)
+        count = self._token_counts.get(key)
+        if count is None:
+            count = self._token_counts[key] = count_tokens(text, self.model) + MESSAGE_OVERHEAD_TOKENS
+        return count
+
+    def build_messages(self, system_prompt, history, call_site):
+        """
+        Return the API messages for history, a list of (role, content) pairs
+        ending with the user's turn, and record the tokens saved.
+        """
+        if len(history) < self.summarized:
+            # The chat was cleared; start over
+            self.summary, self.summarized = "", 0
+
+        contents = self._compact(history)
+        fixed = self.tokens(system_prompt)
+        sizes = [self.tokens(content) for _, content in contents]
+
+        start = self.summarized
+        if fixed + self._summary_tokens() + sum(sizes[start:]) > self.budget:
+            start = self._fold(contents, sizes, fixed)
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        messages.extend({"role": role, "content": content} for role, content in contents[start:])
+
+        full = fixed + sum(self.tokens(content) for _, content in history)
+        sent = fixed + self._summary_tokens() + sum(sizes[start:])
+        self._record(call_site, full, sent)
+        return messages
+
+    def _summary_tokens(self):
+        return self.tokens(self.summary) if self.summary else 0
+
+    def _compact(self, history):
+        """Swap every command output except the latest for its digest."""
+        digested = [i for i, (role, content) in enumerate(history) if content_key(content) in self.digests]
+        keep_full = digested[-1] if digested else None
+        digested = set(digested)
+        return [
+            (role, self.digests[content_key(content)]) if i in digested and i != keep_full else (role, content)
+            for i, (role, content) in enumerate(history)
+        ]
+
+    def _fold(self, contents, sizes, fixed):
+        """Fold the oldest unsummarized turns into the summary; return the first message still sent."""
+        target = self.budget * CONTEXT_FOLD_TARGET - fixed - CONTEXT_SUMMARY_MAX_TOKENS
+        latest_start = max(len(contents) - CONTEXT_MIN_RECENT_MESSAGES, self.summarized)
+        start = len(contents)
+        kept = 0
+        while start > self.summarized and (start > latest_start or kept + sizes[start - 1] <= target):
+            start -= 1
+            kept += sizes[start]
+        if start == self.summarized:
+            return start
+
+        transcript = "\n\n".join(f"{role.upper()}: {content}" for role, content in contents[self.summarized:start])
+        try:
+            summary = llm_gateway.complete(
+                "context_summary",
+                [
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": f"Summary so far:\n{self.summary or '(none)'}\n\nNew messages:\n{transcript}"},
+                ],
+                max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+            )
+            self.summary = summary.strip()
+        except Exception as e:
+            # Still send only the recent turns; the fold is retried next turn
+            logging.warning(f"Conversation summary failed, dropping {start - self.summarized} old messages: {e}")
+            return start
+        metrics.inc("eeebee_context_folds_total", help_text="Conversation turns folded into a summary")
+        self.summarized = start
+        return start
+
+    def _record(self, call_site, full, sent):
+        saved = max(full - sent, 0)
+        self.last_stats = {"full_tokens": full, "sent_tokens": sent, "saved_tokens": saved}
+        metrics.observe("eeebee_context_prompt_tokens", sent, buckets=TOKEN_BUCKETS,
+                        help_text="Estimated prompt tokens sent per chat turn", call_site=call_site)
+        metrics.observe("eeebee_context_tokens_saved", saved, buckets=TOKEN_BUCKETS,
+                        help_text="Prompt tokens saved per chat turn by windowing and digests", call_site=call_site)
+        metrics.inc("eeebee_context_tokens_saved_total", saved,
+                    help_text="Prompt tokens saved by windowing and digests", call_site=call_site)
+        logging.info(f"Context for {call_site}: sent {sent} of {full} tokens ({saved} saved)")
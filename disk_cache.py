@@ -0,0 +1,170 @@
+"""
+Optional persistent cache for Edubull responses.
+
+Backed by a single SQLite file in WAL mode so several Streamlit worker processes
+on one host can share it. Entries are keyed by endpoint and a hash of the
+normalized payload, expire per endpoint, carry a content hash so a changed
+upstream response can be detected, and are evicted least-recently-used once
+the file grows past max_bytes.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from singleflight import normalize_payload
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    value TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+"""
+
+
+def payload_hash(payload):
+    # Normalized like the single-flight key, so requests that coalesce also share an entry
+    return hashlib.sha256(normalize_payload(payload).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, busy_timeout=5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.changed = 0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(endpoint, payload):
+        return f"{endpoint}:{payload_hash(payload)}"
+
+    def get(self, endpoint, payload):
+        """Return the cached JSON value, or None if missing or expired."""
+        key = self.make_key(endpoint, payload)
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logging.warning(f"Disk cache read failed for {endpoint}: {e}")
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, endpoint, payload, value, ttl):
+        """
+        Store a JSON-serialisable value. Returns True if an entry already existed
+        for this key with different content.
+        """
+        key = self.make_key(endpoint, payload)
+        encoded = json.dumps(value, sort_keys=True, separators=(",", ":"))
+        content_hash = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        now = time.time()
+        changed = False
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT content_hash FROM entries WHERE key = ?", (key,)).fetchone()
+                changed = row is not None and row[0] != content_hash
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(key, endpoint, value, content_hash, size, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, endpoint, encoded, content_hash, len(encoded), now, now + ttl, now),
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"Disk cache write failed for {endpoint}: {e}")
+            return False
+        if changed:
+            self.changed += 1
+            logging.info(f"Disk cache entry for {endpoint} changed upstream")
+        return changed
+
+    def _evict(self, conn):
+        now = time.time()
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least-recently-used rows until we are back under 90% of the budget
+        target = int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def delete(self, endpoint, payload):
+        conn = self._connect()
+        return conn.execute("DELETE FROM entries WHERE key = ?", (self.make_key(endpoint, payload),)).rowcount > 0
+
+    def values(self, endpoint, limit=1000):
+        """Return the live values stored for an endpoint, most recently used first."""
+        try:
+            rows = self._connect().execute(
+                "SELECT value FROM entries WHERE endpoint = ? AND expires_at > ? ORDER BY last_access DESC LIMIT ?",
+                (endpoint, time.time(), limit),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Disk cache scan failed for {endpoint}: {e}")
+            return []
+        return [json.loads(row[0]) for row in rows]
+
+    def invalidate(self, endpoint=None):
+        conn = self._connect()
+        if endpoint is None:
+            conn.execute("DELETE FROM entries")
+        else:
+            conn.execute("DELETE FROM entries WHERE endpoint = ?", (endpoint,))
+
+    def stats(self):
+        try:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            count, total = None, None
+        return {
+            "path": self.path,
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "changed": self.changed,
+        }
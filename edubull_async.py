@@ -0,0 +1,203 @@
+"""
+Asyncio-native Edubull API client.
+
+A single background event loop (one daemon thread per process) owns a shared
+httpx.AsyncClient, so Streamlit script threads from any session can fan out
+hundreds of lookups without spawning a thread per request. Script code calls
+run_sync(...) to wait for a coroutine scheduled on that loop.
+"""
+import asyncio
+import logging
+import threading
+
+import time
+
+import httpx
+
+import metrics
+from fastjson import loads
+from singleflight import AsyncSingleFlight, normalize_key
+
+from edubull_client import (
+    API_CONTENT_URL,
+    API_BASELINE_REPORT,
+    API_ALL_CONCEPTS_URL,
+    API_STUDENT_INFO,
+    API_STUDENT_CONCEPTS,
+    DEFAULT_HEADERS,
+    POOL_MAXSIZE,
+    CircuitOpenError,
+    backoff_delay,
+    disk_cache_ttl,
+    endpoint_name,
+    endpoint_timeout,
+    get_breaker,
+    is_idempotent,
+    record_attempt,
+    MAX_RETRIES,
+    RETRYABLE_STATUS,
+)
+
+DEFAULT_CONCURRENCY = 10
+
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+_inflight = AsyncSingleFlight("edubull_async")
+
+
+def get_loop():
+    """Return the process-wide event loop, starting its thread on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="edubull-async", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and block the calling thread for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def _get_client():
+    # Only ever called from the loop thread, so no lock is needed
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE),
+        )
+    return _client
+
+
+def _is_breaker_failure(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500 or exc.response.status_code == 429
+    return isinstance(exc, httpx.TransportError)
+
+
+async def apost_json(url, payload):
+    """
+    POST a JSON payload and return the decoded JSON body.
+
+    Shares timeouts, retry policy and circuit breakers with edubull_client, and
+    coalesces identical idempotent lookups that are already in flight. Content
+    endpoints go through the shared disk cache when it is enabled.
+    """
+    if not is_idempotent(url):
+        return await _apost_json(url, payload)
+
+    disk, ttl = disk_cache_ttl(url)
+    if disk is not None:
+        # SQLite may wait on another worker's lock, so keep it off the loop thread
+        cached = await asyncio.to_thread(disk.get, endpoint_name(url), payload)
+        if cached is not None:
+            return cached
+
+    return await _inflight.do(normalize_key(url, payload), _afetch_and_store, url, payload, disk, ttl)
+
+
+async def _afetch_and_store(url, payload, disk, ttl):
+    # Runs once per coalesced group, so only the request that fetched writes the disk cache
+    data = await _apost_json(url, payload)
+    if disk is not None:
+        await asyncio.to_thread(disk.set, endpoint_name(url), payload, data, ttl)
+    return data
+
+
+def coalescing_stats():
+    return _inflight.stats()
+
+
+async def _apost_json(url, payload):
+    breaker = get_breaker(url)
+    attempts = 1 + (MAX_RETRIES if is_idempotent(url) else 0)
+    connect_timeout, read_timeout = endpoint_timeout(url)
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint_name(url)} is temporarily unavailable (circuit open)")
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await _get_client().post(url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            data = loads(response.content)
+        except httpx.HTTPError as e:
+            record_attempt(url, started, response, e)
+            if not _is_breaker_failure(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in RETRYABLE_STATUS
+            if attempt + 1 >= attempts or not retryable:
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning(f"{endpoint_name(url)} attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        except Exception as e:
+            record_attempt(url, started, response, e)
+            breaker.record_success()
+            raise
+        else:
+            record_attempt(url, started, response)
+            breaker.record_success()
+            return data
+
+
+# ------------------- ASYNC FETCHERS -------------------
+async def afetch_remedial_resources(topic_id, concept_id):
+    return await apost_json(API_CONTENT_URL, {"TopicID": topic_id, "ConceptID": concept_id})
+
+
+async def afetch_student_concepts(user_id, topic_id, org_code):
+    return await apost_json(API_STUDENT_CONCEPTS, {"UserID": user_id, "TopicID": topic_id, "OrgCode": org_code})
+
+
+async def afetch_student_info(batch_id, topic_id, org_code):
+    return await apost_json(API_STUDENT_INFO, {"BatchID": batch_id, "TopicID": topic_id, "OrgCode": org_code})
+
+
+async def afetch_all_concepts(org_code, subject_id, user_id):
+    return await apost_json(API_ALL_CONCEPTS_URL, {"OrgCode": org_code, "SubjectID": subject_id, "UserID": user_id})
+
+
+async def afetch_baseline_data(org_code, subject_id, user_id):
+    return await apost_json(API_BASELINE_REPORT, {"OrgCode": org_code, "SubjectID": subject_id, "UserID": user_id})
+
+
+# ------------------- FAN-OUT -------------------
+async def gather_limited(fetcher, payloads, limit=DEFAULT_CONCURRENCY):
+    """
+    Call fetcher once per payload with at most `limit` calls in flight.
+
+    Each payload is either a dict of keyword arguments or a tuple of positional
+    arguments. Results come back in input order; a failed call yields None.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def call(payload):
+        async with semaphore:
+            try:
+                if isinstance(payload, dict):
+                    return await fetcher(**payload)
+                return await fetcher(*payload)
+            except Exception as e:
+                logging.error(f"{fetcher.__name__} failed for {payload}: {e}")
+                return None
+
+    return await asyncio.gather(*(call(p) for p in payloads))
+
+
+def fetch_many(fetcher, payloads, limit=DEFAULT_CONCURRENCY):
+    """Blocking wrapper around gather_limited for Streamlit script code."""
+    return run_sync(gather_limited(fetcher, list(payloads), limit))
+
+
+metrics.register_collector("edubull_async_coalescing", coalescing_stats)
@@ -0,0 +1,311 @@
+"""
+Shared HTTP client for webapi.edubull.com.
+
+Every Edubull call in the app goes through one process-wide requests.Session
+so that connections are pooled and kept alive across Streamlit sessions and
+reruns instead of paying a fresh TCP/TLS handshake per request.
+"""
+import os
+import random
+import threading
+import time
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from circuit_breaker import CLOSED, CircuitBreaker
+from disk_cache import DiskCache
+from fastjson import ACCEPT_ENCODING, loads, stream_arrays
+from singleflight import SingleFlight, normalize_key
+
+# Pool sizing can be tuned per deployment without a code change
+POOL_CONNECTIONS = int(os.environ.get("EDUBULL_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.environ.get("EDUBULL_POOL_MAXSIZE", "32"))
+
+# Point the app at a different backend (e.g. mock_edubull.py) without code changes
+EDUBULL_API_BASE = os.environ.get("EDUBULL_API_BASE", "https://webapi.edubull.com").rstrip("/")
+
+# API Endpoints
+API_AUTH_URL_ENGLISH = f"{EDUBULL_API_BASE}/api/EnglishLab/Auth_with_topic_for_chatbot"
+API_AUTH_URL_MATH_SCIENCE = f"{EDUBULL_API_BASE}/api/eProfessor/eProf_Org_StudentVerify_with_topic_for_chatbot"
+API_CONTENT_URL = f"{EDUBULL_API_BASE}/api/eProfessor/WeakConcept_Remedy_List_ByConceptID"
+API_TEACHER_WEAK_CONCEPTS = f"{EDUBULL_API_BASE}/api/eProfessor/eProf_Org_Teacher_Topic_Wise_Weak_Concepts"
+API_BASELINE_REPORT = f"{EDUBULL_API_BASE}/api/eProfessor/eProf_Org_Baseline_Report_Single_Student"
+API_ALL_CONCEPTS_URL = f"{EDUBULL_API_BASE}/api/eProfessor/eProf_Org_ConceptList_Single_Student"
+API_STUDENT_INFO = f"{EDUBULL_API_BASE}/api/eProfessor/eProf_Org_Teacher_Topic_Wise_Weak_Concepts_AND_Students"
+API_STUDENT_CONCEPTS = f"{EDUBULL_API_BASE}/api/eProfessor/eProf_Org_Teacher_Topic_Wise_Concepts_OF_Students"
+
+DEFAULT_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+}
+
+# (connect, read) timeouts in seconds per endpoint; anything not listed uses the default
+DEFAULT_TIMEOUT = (3.05, 15)
+ENDPOINT_TIMEOUTS = {
+    API_AUTH_URL_ENGLISH: (3.05, 20),
+    API_AUTH_URL_MATH_SCIENCE: (3.05, 20),
+    API_CONTENT_URL: (3.05, 10),
+    API_BASELINE_REPORT: (3.05, 25),
+    API_ALL_CONCEPTS_URL: (3.05, 15),
+    API_STUDENT_INFO: (3.05, 25),
+    API_TEACHER_WEAK_CONCEPTS: (3.05, 20),
+    API_STUDENT_CONCEPTS: (3.05, 15),
+}
+
+# Login calls carry credentials and create server-side state, so they are never retried
+NON_IDEMPOTENT_ENDPOINTS = {API_AUTH_URL_ENGLISH, API_AUTH_URL_MATH_SCIENCE}
+MAX_RETRIES = int(os.environ.get("EDUBULL_MAX_RETRIES", "2"))
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 4.0
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("EDUBULL_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("EDUBULL_BREAKER_RESET_SECONDS", "30"))
+
+
+# Optional persistent cache: set EDUBULL_DISK_CACHE to a SQLite file path to enable.
+# Only the endpoints listed here are persisted, each with its own TTL in seconds.
+DISK_CACHE_PATH = os.environ.get("EDUBULL_DISK_CACHE")
+DISK_CACHE_MAX_BYTES = int(os.environ.get("EDUBULL_DISK_CACHE_MAX_MB", "256")) * 1024 * 1024
+DISK_CACHE_TTLS = {
+    API_CONTENT_URL: 24 * 3600,
+    API_ALL_CONCEPTS_URL: 5 * 60,
+    API_BASELINE_REPORT: 60 * 60,
+}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+_session = None
+_session_lock = threading.Lock()
+_breakers = {}
+_breakers_lock = threading.Lock()
+_inflight = SingleFlight("edubull_sync")
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def endpoint_name(url):
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def endpoint_timeout(url):
+    return ENDPOINT_TIMEOUTS.get(url, DEFAULT_TIMEOUT)
+
+
+def is_idempotent(url):
+    return url not in NON_IDEMPOTENT_ENDPOINTS
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_breaker_failure(exc):
+    """Connection problems, timeouts and 5xx responses count against the breaker; 4xx do not."""
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return exc.response is not None and (exc.response.status_code >= 500 or exc.response.status_code == 429)
+    return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def get_breaker(url):
+    name = endpoint_name(url)
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(
+                name,
+                CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT),
+            )
+    return breaker
+
+
+def breaker_states():
+    """Return {endpoint name: breaker snapshot} for every configured endpoint."""
+    return {endpoint_name(url): get_breaker(url).snapshot() for url in ENDPOINT_TIMEOUTS}
+
+
+def get_disk_cache():
+    """Return the shared DiskCache, or None when persistence is not configured."""
+    global _disk_cache
+    if _disk_cache is None and DISK_CACHE_PATH:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                _disk_cache = DiskCache(DISK_CACHE_PATH, max_bytes=DISK_CACHE_MAX_BYTES)
+    return _disk_cache
+
+
+def disk_cache_ttl(url):
+    """Return (DiskCache, ttl) for a persisted endpoint, else (None, None)."""
+    ttl = DISK_CACHE_TTLS.get(url)
+    if ttl is None:
+        return None, None
+    return get_disk_cache(), ttl
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    logging.info(
+        f"Edubull HTTP session created (pool_connections={POOL_CONNECTIONS}, pool_maxsize={POOL_MAXSIZE})"
+    )
+    return session
+
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def post_json(url, payload):
+    """
+    POST a JSON payload to an Edubull endpoint and return the decoded JSON body.
+
+    Applies the endpoint's connect/read timeouts, retries idempotent lookups on
+    transient failures with jittered backoff, and fails fast with
+    CircuitOpenError while the endpoint's breaker is open. Identical idempotent
+    lookups already in flight are coalesced into a single upstream request, and
+    content endpoints are served from the disk cache when it is enabled.
+    """
+    if not is_idempotent(url):
+        return _post_json(url, payload)
+
+    disk, ttl = disk_cache_ttl(url)
+    if disk is not None:
+        cached = disk.get(endpoint_name(url), payload)
+        if cached is not None:
+            return cached
+
+    return _inflight.do(normalize_key(url, payload), _fetch_and_store, url, payload, disk, ttl)
+
+
+def _fetch_and_store(url, payload, disk, ttl):
+    # Runs once per coalesced group, so only the request that fetched writes the disk cache
+    data = _post_json(url, payload)
+    if disk is not None:
+        disk.set(endpoint_name(url), payload, data, ttl)
+    return data
+
+
+def post_json_streamed(url, payload, converters):
+    """
+    Like post_json, but the top-level arrays named in `converters` are parsed
+    item by item while the body downloads (see fastjson.stream_arrays), so big
+    batch responses never exist as one decoded document. Not disk-cached.
+    """
+    key = normalize_key(url, payload) + (tuple(sorted(converters)),)
+    return _inflight.do(key, _post_json, url, payload, converters)
+
+
+def coalescing_stats():
+    return _inflight.stats()
+
+
+def wire_size(response):
+    """Bytes received for a response body: the (possibly compressed) Content-Length when sent."""
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+def record_attempt(url, started, response=None, error=None, size=None):
+    """Record latency, status, body size and error class of one HTTP attempt (sync or async)."""
+    if size is None and response is not None:
+        size = wire_size(response)
+    metrics.record_http(
+        endpoint_name(url),
+        time.perf_counter() - started,
+        status=response.status_code if response is not None else None,
+        size=size,
+        error=type(error).__name__ if error is not None else None,
+    )
+
+
+def _post_json(url, payload, converters=None):
+    breaker = get_breaker(url)
+    attempts = 1 + (MAX_RETRIES if is_idempotent(url) else 0)
+
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint_name(url)} is temporarily unavailable (circuit open)")
+        started = time.perf_counter()
+        response = None
+        size = None
+        try:
+            if converters is None:
+                response = get_session().post(url, json=payload, timeout=endpoint_timeout(url))
+                response.raise_for_status()
+                data = loads(response.content)
+            else:
+                response = get_session().post(url, json=payload, timeout=endpoint_timeout(url), stream=True)
+                size = 0  # the body of a failed streamed response is never read
+                with response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    data = stream_arrays(response.raw, converters)
+                    size = response.raw.tell()
+        except requests.exceptions.RequestException as e:
+            record_attempt(url, started, response, e)
+            if not is_breaker_failure(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            retryable = not isinstance(e, requests.exceptions.HTTPError) or e.response.status_code in RETRYABLE_STATUS
+            if attempt + 1 >= attempts or not retryable:
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning(f"{endpoint_name(url)} attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+        except Exception as e:
+            # Anything else means upstream answered; release a half-open trial
+            record_attempt(url, started, response, e)
+            breaker.record_success()
+            raise
+        else:
+            record_attempt(url, started, response, size=size)
+            breaker.record_success()
+            return data
+
+
+def close_session():
+    """Close the shared session (used by tests and scripts that exit cleanly)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _breaker_metrics():
+    return {
+        name: {"open": int(snapshot["state"] != CLOSED), "consecutive_failures": snapshot["consecutive_failures"]}
+        for name, snapshot in breaker_states().items()
+    }
+
+
+def _disk_cache_metrics():
+    disk = get_disk_cache()
+    return disk.stats() if disk is not None else {}
+
+
+metrics.register_collector("edubull_breakers", _breaker_metrics)
+metrics.register_collector("edubull_coalescing", coalescing_stats)
+metrics.register_collector("edubull_disk_cache", _disk_cache_metrics)
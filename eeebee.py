@@ -25,10 +25,41 @@ from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER, TA_LEFT
 from reportlab.lib.units import inch
 import pandas as pd
 import altair as alt
-import matplotlib.pyplot as plt
 from matplotlib import rcParams
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
+from edubull_client import (
+    API_AUTH_URL_ENGLISH,
+    API_AUTH_URL_MATH_SCIENCE,
+    API_BASELINE_REPORT,
+    API_ALL_CONCEPTS_URL,
+    API_STUDENT_INFO,
+    API_STUDENT_CONCEPTS,
+    post_json,
+)
+from remedial import format_remedial_resources, get_remedial, get_remedial_many
+from prefetch import RemedialPrefetch
+from teacher_data import format_age, get_batch_data, is_batch_cached
+import llm_gateway
+from rate_governor import is_throttled
+from context_window import ConversationWindow
+from system_prompts import student_prompt, teacher_prompt
+from models import as_dicts, parse_auth, parse_concepts
+from learning_paths import get_cached_learning_path, stream_learning_path
+import learning_paths
+import latex_images
+from latex_images import LATEX_PATTERN
+from answer_cache import canonical_key, stream_answer
+from question_bank import (
+    BLOOM_LEVELS,
+    QUESTION_PREGENERATE,
+    PregenerationJob,
+    QuestionSplitter,
+    get_cached_questions,
+    split_questions,
+    stream_questions,
+)
+import metrics
 
 # Set page config first, before any other Streamlit commands
 st.set_page_config(
@@ -48,13 +79,6 @@ hide_st_style = """
             """
 st.markdown(hide_st_style, unsafe_allow_html=True)
 
-# Import DeepSeek-style client from openai package
-try:
-    from openai import OpenAI
-except ImportError:
-    st.error("Please install the openai library: pip3 install openai")
-    raise
-
 # ----------------------------------------------------------------------------
 # 1) BASIC SETUP
 # ----------------------------------------------------------------------------
@@ -72,22 +96,8 @@ except KeyError:
     st.error("API key for OpenAI/DeepSeek not found in secrets.")
     OPENAI_API_KEY = None
 
-# Initialize the DeepSeek (OpenAI-like) client if we have the key
-if OPENAI_API_KEY:
-    # Create the client with your base_url
-    client = OpenAI(api_key=OPENAI_API_KEY)
-else:
-    client = None
-
-# API Endpoints
-API_AUTH_URL_ENGLISH = "https://webapi.edubull.com/api/EnglishLab/Auth_with_topic_for_chatbot"
-API_AUTH_URL_MATH_SCIENCE = "https://webapi.edubull.com/api/eProfessor/eProf_Org_StudentVerify_with_topic_for_chatbot"
-API_CONTENT_URL = "https://webapi.edubull.com/api/eProfessor/WeakConcept_Remedy_List_ByConceptID"
-API_TEACHER_WEAK_CONCEPTS = "https://webapi.edubull.com/api/eProfessor/eProf_Org_Teacher_Topic_Wise_Weak_Concepts"
-API_BASELINE_REPORT = "https://webapi.edubull.com/api/eProfessor/eProf_Org_Baseline_Report_Single_Student"
-API_ALL_CONCEPTS_URL = "https://webapi.edubull.com/api/eProfessor/eProf_Org_ConceptList_Single_Student"  # New API Endpoint for All Concepts
-API_STUDENT_INFO = "https://webapi.edubull.com/api/eProfessor/eProf_Org_Teacher_Topic_Wise_Weak_Concepts_AND_Students"
-API_STUDENT_CONCEPTS = "https://webapi.edubull.com/api/eProfessor/eProf_Org_Teacher_Topic_Wise_Concepts_OF_Students"
+# Every LLM call goes through llm_gateway, which shares one client per provider across sessions
+llm_gateway.configure(openai_api_key=OPENAI_API_KEY)
 
 # Initialize session state variables
 if "auth_data" not in st.session_state:
@@ -100,6 +110,8 @@ if "is_authenticated" not in st.session_state:
     st.session_state.is_authenticated = False
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "conversation_window" not in st.session_state:
+    st.session_state.conversation_window = ConversationWindow()
 if "is_teacher" not in st.session_state:
     st.session_state.is_teacher = False
 if "topic_id" not in st.session_state:
@@ -154,22 +166,17 @@ def show_gap_message():
 def latex_to_image(latex_code, dpi=300):
     """
     Converts LaTeX code to PNG and returns it as a BytesIO object.
+    Images come from the shared byte-bounded cache in latex_images when already rendered.
     """
     try:
-        plt.figure(figsize=(0.01, 0.01))
-        plt.text(0.5, 0.5, f"${latex_code}$", fontsize=12, ha='center', va='center')
-        plt.axis('off')
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', pad_inches=0.1, transparent=True)
-        plt.close()
-        buf.seek(0)
-        return buf
+        return BytesIO(latex_images.render(latex_code, dpi))
     except Exception as e:
         st.error(f"Error converting LaTeX to image: {e}")
         return None
 
 # ------------------- 2B) FETCHING RESOURCES -------------------
-def get_matching_resources(concept_text, concept_list, topic_id):
+def get_matching_remedial(concept_text, concept_list, topic_id):
+    """Return the shared cached RemedialEntry for the concept matching concept_text."""
     def clean_text(text):
         return text.lower().strip().replace(" ", "")
 
@@ -178,62 +185,19 @@ def get_matching_resources(concept_text, concept_list, topic_id):
         None
     )
     if matching_concept:
-        content_payload = {
-            'TopicID': topic_id,
-            'ConceptID': int(matching_concept['ConceptID'])
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "application/json"
-        }
         try:
-            response = requests.post(API_CONTENT_URL, json=content_payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return get_remedial(topic_id, matching_concept['ConceptID'])
         except Exception as e:
             st.error(f"Error fetching resources: {e}")
             return None
     return None
 
-def get_resources_for_concept(concept_text, concept_list, topic_id):
-    return get_matching_resources(concept_text, concept_list, topic_id)
-
-def format_resources_message(resources):
-    """
-    Format resources data into a chat-friendly message.
-    """
-    if not resources:
-        return "No remedial resources available for this concept."
-
-    message = ""
-
-    if resources.get("Video_List"):
-        message += "**🎥 Video Lectures:**\n"
-        for video in resources["Video_List"]:
-            video_url = f"https://www.edubull.com/courses/videos/{video.get('LectureID', '')}"
-            title = video.get('LectureTitle', 'Video Lecture')
-            message += f"- [{title}]({video_url})\n"
-        message += "\n"
-
-    if resources.get("Notes_List"):
-        message += "**📄 Study Notes:**\n"
-        for note in resources["Notes_List"]:
-            note_url = f"{note.get('FolderName', '')}{note.get('PDFFileName', '')}"
-            title = note.get('NotesTitle', 'Study Notes')
-            message += f"- [{title}]({note_url})\n"
-        message += "\n"
-
-    if resources.get("Exercise_List"):
-        message += "**📝 Practice Exercises:**\n"
-        for exercise in resources["Exercise_List"]:
-            exercise_url = f"{exercise.get('FolderName', '')}{exercise.get('ExerciseFileName', '')}"
-            title = exercise.get('ExerciseTitle', 'Practice Exercise')
-            message += f"- [{title}]({exercise_url})\n"
-
-    return message
-
 # ------------------- 2C) PDF GENERATION -------------------
+def render_exam_question(question):
+    """Show one completed question and queue its LaTeX for rendering in the background for the PDF download."""
+    st.markdown(question.text.replace("\n", "<br>"), unsafe_allow_html=True)
+    latex_images.prerender(question.text)
+
 def generate_exam_questions_pdf(questions, concept_text, user_name):
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter,
@@ -283,6 +247,7 @@ def generate_exam_questions_pdf(questions, concept_text, user_name):
     story.append(Spacer(1, 12))
 
     # Split questions by blank lines => sections
+    # (render_exam_question() has usually queued or rendered the LaTeX images already)
     sections = re.split(r'\n\n', questions.strip())
     for section in sections:
         lines = [line.strip() for line in section.split('\n') if line.strip()]
@@ -293,7 +258,7 @@ def generate_exam_questions_pdf(questions, concept_text, user_name):
 
         question_items = []
         for line in lines[1:]:
-            latex_matches = re.finditer(r'\$\$(.*?)\$\$|\$(.*?)\$', line)
+            latex_matches = LATEX_PATTERN.finditer(line)
             if latex_matches:
                 last_index = 0
                 for match in latex_matches:
@@ -334,37 +299,36 @@ def generate_exam_questions_pdf(questions, concept_text, user_name):
     buffer.close()
     return pdf_bytes
 
-def generate_learning_path(concept_text):
+def chat_error_message(error):
+    if is_throttled(error):
+        return "EeeBee is getting a lot of questions right now. Please try again in a minute."
+    return f"I'm sorry, I encountered an error: {str(error)}"
+
+def show_queue_position(placeholder):
+    """on_queue callback for LLM calls: show the request's place in the shared LLM queue"""
+    def on_queue(position):
+        placeholder.markdown(f"⏳ EeeBee is busy right now. Your request is number {position} in the queue...")
+    return on_queue
+
+def generate_learning_path(concept_text, placeholder=None):
     """
-    Generates a learning path using DeepSeek Chat. 
-    Replace the prompt/model as needed for your scenario.
+    Return the learning path for a weak concept. Paths are shared by every
+    student in the same branch, so only the first request generates one.
+    If placeholder is given, the text is rendered into it as it streams in.
     """
-    if not client:
+    if not llm_gateway.available("learning_path"):
         st.error("DeepSeek client is not initialized. Check your API key.")
         return None
 
     branch_name = st.session_state.auth_data.get('BranchName', 'their class')
-    prompt = (
-        f"You are a highly experienced educational AI assistant specializing in the NCERT curriculum. "
-        f"A student in {branch_name} is struggling with the weak concept: '{concept_text}'. "
-        f"Please create a structured, step-by-step learning path tailored to {branch_name} students, "
-        f"ensuring clarity, engagement, and curriculum alignment.\n\n"
-        f"Sections:\n1. **Introduction**\n2. **Step-by-Step Learning**\n3. **Engagement**\n"
-        f"4. **Real-World Applications**\n5. **Practice Problems**\n\n"
-        f"All math expressions must be in LaTeX."
-        f"Avoid using LaTeX commands like \\text in your responses."
-    )
-
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o", 
-            messages=[{"role": "system", "content": prompt}],
-            stream=False,
-            max_tokens=1500
-        )
-        # NOTE: Use dot-notation to access the message content
-        gpt_response = response.choices[0].message.content.strip()
-        return gpt_response
+        learning_path = ""
+        on_queue = show_queue_position(placeholder) if placeholder is not None else None
+        for text in stream_learning_path(concept_text, branch_name, on_queue=on_queue):
+            learning_path += text
+            if placeholder is not None:
+                placeholder.markdown(learning_path + "▌", unsafe_allow_html=True)
+        return learning_path.strip()
     except Exception as e:
         st.error(f"Error generating learning path: {e}")
         return None
@@ -461,24 +425,10 @@ def display_learning_path_with_resources(concept_text, learning_path, concept_li
     with st.expander(f"📚 Learning Path for {concept_text} (Grade: {branch_name})", expanded=False):
         st.markdown(learning_path, unsafe_allow_html=True)
 
-        resources = get_matching_resources(concept_text, concept_list, topic_id)
-        if resources:
+        remedial = get_matching_remedial(concept_text, concept_list, topic_id)
+        if remedial and remedial.resources:
             st.markdown("### 📌 Additional Learning Resources")
-            if resources.get("Video_List"):
-                st.markdown("#### 🎥 Video Lectures")
-                for video in resources["Video_List"]:
-                    video_url = f"https://www.edubull.com/courses/videos/{video.get('LectureID', '')}"
-                    st.markdown(f"- [{video.get('LectureTitle', 'Video Lecture')}]({video_url})")
-            if resources.get("Notes_List"):
-                st.markdown("#### 📄 Study Notes")
-                for note in resources["Notes_List"]:
-                    note_url = f"{note.get('FolderName', '')}{note.get('PDFFileName', '')}"
-                    st.markdown(f"- [{note.get('NotesTitle', 'Study Notes')}]({note_url})")
-            if resources.get("Exercise_List"):
-                st.markdown("#### 📝 Practice Exercises")
-                for exercise in resources["Exercise_List"]:
-                    exercise_url = f"{exercise.get('FolderName', '')}{exercise.get('ExerciseFileName', '')}"
-                    st.markdown(f"- [{exercise.get('ExerciseTitle', 'Practice Exercise')}]({exercise_url})")
+            st.markdown(remedial.markdown)
 
         # Download Button
         pdf_bytes = generate_learning_path_pdf(
@@ -500,15 +450,8 @@ def fetch_all_concepts(org_code, subject_id, user_id):
         "SubjectID": subject_id,
         "UserID": user_id
     }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
     try:
-        response = requests.post(API_ALL_CONCEPTS_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return post_json(API_ALL_CONCEPTS_URL, payload)
     except Exception as e:
         st.error(f"Error fetching all concepts: {e}")
         return None
@@ -597,58 +540,6 @@ def generate_all_concepts_pdf(concepts, user_name):
     buffer.close()
     return pdf_bytes
 
-# ------------------- 2G) FETCH REMEDIAL RESOURCES -------------------
-def fetch_remedial_resources(topic_id, concept_id):
-    remedial_api_url = "https://webapi.edubull.com/api/eProfessor/WeakConcept_Remedy_List_ByConceptID"
-    payload = {
-        "TopicID": topic_id,
-        "ConceptID": concept_id
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-    try:
-        response = requests.post(remedial_api_url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        st.error(f"Error fetching remedial resources: {e}")
-        return None
-
-# ------------------- 2H) FORMAT REMEDIAL RESOURCES -------------------
-def format_remedial_resources(resources):
-    if not resources:
-        return "No remedial resources available for this concept."
-
-    message = ""
-
-    if resources.get("Video_List"):
-        message += "**🎥 Video Lectures:**\n"
-        for video in resources["Video_List"]:
-            video_url = f"https://www.edubull.com/courses/videos/{video.get('LectureID', '')}"
-            title = video.get('LectureTitle', 'Video Lecture')
-            message += f"- [{title}]({video_url})\n"
-        message += "\n"
-
-    if resources.get("Notes_List"):
-        message += "**📄 Study Notes:**\n"
-        for note in resources["Notes_List"]:
-            note_url = f"{note.get('FolderName', '')}{note.get('PDFFileName', '')}"
-            title = note.get('NotesTitle', 'Study Notes')
-            message += f"- [{title}]({note_url})\n"
-        message += "\n"
-
-    if resources.get("Exercise_List"):
-        message += "**📝 Practice Exercises:**\n"
-        for exercise in resources["Exercise_List"]:
-            exercise_url = f"{exercise.get('FolderName', '')}{exercise.get('ExerciseFileName', '')}"
-            title = exercise.get('ExerciseTitle', 'Practice Exercise')
-            message += f"- [{title}]({exercise_url})\n"
-
-    return message
-
 # ----------------------------------------------------------------------------
 # 3) BASELINE TESTING REPORT (MODIFIED)
 # ----------------------------------------------------------------------------
@@ -658,17 +549,10 @@ def fetch_baseline_data(org_code, subject_id, user_id):
         "SubjectID": subject_id,
         "UserID": user_id
     }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
 
     try:
         with st.spinner("EeeBee is waking up..."):
-            response = requests.post(API_BASELINE_REPORT, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return post_json(API_BASELINE_REPORT, payload)
     except Exception as e:
         st.error(f"Error fetching baseline data: {e}")
         return None
@@ -818,46 +702,44 @@ def display_all_concepts_tab():
         for concept in all_concepts
     ]
     
-    @st.cache_data(show_spinner=False)
-    def cached_fetch_remedial_resources(topic_id, concept_id):
-        return fetch_remedial_resources(topic_id, concept_id)
+    # Remedial lookups for weak concepts come from the shared cache; misses are
+    # fanned out on the shared event loop
+    remedial_keys = [
+        (c['topic_id'], c['concept_id'])
+        for c in concepts_to_fetch
+        if c['status'] in ["Weak", "Not-Attended"]
+    ]
+    remedial_by_key = get_remedial_many(remedial_keys, limit=10)
     
-    def fetch_resources(concept):
+    for concept in concepts_to_fetch:
         if concept['status'] in ["Weak", "Not-Attended"]:
-            resources = cached_fetch_remedial_resources(concept['topic_id'], concept['concept_id'])
-            formatted_resources = format_remedial_resources(resources)
+            entry = remedial_by_key.get((int(concept['topic_id']), int(concept['concept_id'])))
+            remedial = entry.markdown if entry else format_remedial_resources(None)
         else:
-            formatted_resources = "-"
-        return (concept, formatted_resources)
-    
-    # Parallelize
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_concept = {executor.submit(fetch_resources, c): c for c in concepts_to_fetch}
-        for future in as_completed(future_to_concept):
-            concept, remedial = future.result()
-            
-            concept_text = concept['concept_text']
-            status = concept['status']
-            status_color = 'red' if status == 'Weak' else 'green' if status == 'Cleared' else 'orange'
-            status_icon = '🔴' if status == 'Weak' else '🟢' if status == 'Cleared' else '🟠'
-            status_html = f"<span style='color:{status_color};'>{status_icon} {status}</span>"
-            
-            row_columns = st.columns(col_widths)
-            row_columns[0].markdown(concept_text)
-            row_columns[1].markdown(status_html, unsafe_allow_html=True)
-            
-            with row_columns[2]:
-                if remedial != "-":
-                    with st.expander("🧠 Remedial Resources"):
-                        st.markdown(remedial)
-                else:
-                    st.markdown("-")
-            
-            with row_columns[3]:
-                if status in ["Weak", "Not-Attended"]:
-                    st.button("Previous GAP", key=f"gap_{concept['concept_id']}", on_click=show_gap_message)
-                else:
-                    st.markdown("-")
+            remedial = "-"
+        
+        concept_text = concept['concept_text']
+        status = concept['status']
+        status_color = 'red' if status == 'Weak' else 'green' if status == 'Cleared' else 'orange'
+        status_icon = '🔴' if status == 'Weak' else '🟢' if status == 'Cleared' else '🟠'
+        status_html = f"<span style='color:{status_color};'>{status_icon} {status}</span>"
+        
+        row_columns = st.columns(col_widths)
+        row_columns[0].markdown(concept_text)
+        row_columns[1].markdown(status_html, unsafe_allow_html=True)
+        
+        with row_columns[2]:
+            if remedial != "-":
+                with st.expander("🧠 Remedial Resources"):
+                    st.markdown(remedial)
+            else:
+                st.markdown("-")
+        
+        with row_columns[3]:
+            if status in ["Weak", "Not-Attended"]:
+                st.button("Previous GAP", key=f"gap_{concept['concept_id']}", on_click=show_gap_message)
+            else:
+                st.markdown("-")
 
 # ----------------------------------------------------------------------------
 # 4) TEACHER DASHBOARD
@@ -873,7 +755,7 @@ def display_additional_graphs(weak_concepts):
         concepts_data = weak_concepts.get("Concepts", [])
         students_data = weak_concepts.get("Students", [])
     
-    df = pd.DataFrame(concepts_data)
+    df = pd.DataFrame(as_dicts(concepts_data))
     
     if df.empty:
         st.info("No concept data available to display.")
@@ -939,7 +821,7 @@ def display_additional_graphs(weak_concepts):
         st.altair_chart(time_chart, use_container_width=True)
     
     # 3. Student Progress Overview - Single visualization for student progress
-    students_df = pd.DataFrame(students_data)
+    students_df = pd.DataFrame(as_dicts(students_data))
     if not students_df.empty and "WeakConceptCount" in students_df.columns and "ClearedConceptCount" in students_df.columns:
         # Calculate progress percentage
         students_df["ProgressPercent"] = (students_df["ClearedConceptCount"] / students_df["TotalConceptCount"] * 100).fillna(0)
@@ -985,38 +867,26 @@ def teacher_dashboard():
     selected_batch_id = selected_batch["BatchID"]
     total_students = selected_batch.get("StudentCount", 0)
 
-    if selected_batch_id and st.session_state.selected_batch_id != selected_batch_id:
+    refresh = st.button("🔄 Refresh class data", key="refresh_batch_data")
+    if selected_batch_id and (refresh or st.session_state.selected_batch_id != selected_batch_id):
         st.session_state.selected_batch_id = selected_batch_id
         user_info = st.session_state.auth_data.get('UserInfo', [{}])[0]
         org_code = user_info.get('OrgCode', '012')
-        params = {
-            "BatchID": selected_batch_id,
-            "TopicID": st.session_state.topic_id,
-            "OrgCode": org_code
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "application/json"
-        }
-        with st.spinner("EeeBee is fetching concept data..."):
-            try:
-                # First try the new API endpoint that returns both concepts and students
-                response = requests.post(API_STUDENT_INFO, json=params, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Check if the response has the expected structure
-                if "Concepts" in data and "Students" in data:
-                    st.session_state.teacher_weak_concepts = data
-                else:
-                    # Fall back to the old API endpoint
-                    response = requests.post(API_TEACHER_WEAK_CONCEPTS, json=params, headers=headers)
-                    response.raise_for_status()
-                    st.session_state.teacher_weak_concepts = response.json()
-            except Exception as e:
-                st.error(f"Error fetching concept data: {e}")
-                st.session_state.teacher_weak_concepts = []
+        try:
+            # Cached batches render immediately and refresh in the background
+            if is_batch_cached(selected_batch_id, st.session_state.topic_id, org_code):
+                data, fetched_at = get_batch_data(selected_batch_id, st.session_state.topic_id, org_code)
+            else:
+                with st.spinner("EeeBee is fetching concept data..."):
+                    data, fetched_at = get_batch_data(selected_batch_id, st.session_state.topic_id, org_code)
+            st.session_state.teacher_weak_concepts = data
+            st.session_state.teacher_batch_fetched_at = fetched_at
+        except Exception as e:
+            st.error(f"Error fetching concept data: {e}")
+            st.session_state.teacher_weak_concepts = []
+            st.session_state.teacher_batch_fetched_at = None
+    if st.session_state.get("teacher_batch_fetched_at"):
+        st.caption(f"🕒 Class data updated {format_age(st.session_state.teacher_batch_fetched_at)}")
 
     if st.session_state.teacher_weak_concepts:
         # Initialize the dashboard view in session state if it doesn't exist
@@ -1071,11 +941,15 @@ def teacher_dashboard():
             
             # Display the improved graphs
             display_additional_graphs(st.session_state.teacher_weak_concepts)
+
+            # Fill the question bank for this class while the teacher reads the overview
+            if QUESTION_PREGENERATE and llm_gateway.available("exam_questions"):
+                start_question_pregeneration(selected_batch_id, concepts_data)
             
             # Display student list
             if students_data:
                 with st.expander("👨‍🎓 Student List", expanded=False):
-                    students_df = pd.DataFrame(students_data)
+                    students_df = pd.DataFrame(as_dicts(students_data))
                     students_df["Progress"] = (students_df["ClearedConceptCount"] / students_df["TotalConceptCount"] * 100).round(1).astype(str) + "%"
                     students_df = students_df[["FullName", "ClearedConceptCount", "WeakConceptCount", "TotalConceptCount", "Progress"]]
                     students_df.columns = ["Student Name", "Concepts Cleared", "Weak Concepts", "Total Concepts", "Progress"]
@@ -1086,17 +960,15 @@ def teacher_dashboard():
             st.subheader("📝 Question Generation")
             bloom_level = st.radio(
                 "Select Bloom's Taxonomy Level for the Questions",
-                [
-                    "L1 (Remember)",
-                    "L2 (Understand)",
-                    "L3 (Apply)",
-                    "L4 (Analyze)",
-                    "L5 (Evaluate)"
-                ],
+                BLOOM_LEVELS,
                 index=2,
                 key="bloom_taxonomy_selector"
             )
-            bloom_short = bloom_level.split()[0]  # e.g. "L4"
+
+            pregen_job = st.session_state.get("question_pregen", {}).get((selected_batch_id, st.session_state.topic_id))
+            if pregen_job:
+                ready, total = pregen_job.progress()
+                st.caption(f"🗂️ Question bank for this class: {ready}/{total} question sets ready")
 
             # Handle both data formats for concept selection
             if isinstance(st.session_state.teacher_weak_concepts, list):
@@ -1113,55 +985,57 @@ def teacher_dashboard():
                     st.session_state.selected_teacher_concept_text = chosen_concept_text
 
                     if st.button("Generate Exam Questions", key="generate_exam_btn"):
-                        if not client:
+                        if not llm_gateway.available("exam_questions"):
                             st.error("DeepSeek client is not initialized. Check your API key.")
                             return
 
                         branch_name = st.session_state.auth_data.get("BranchName", "their class")
-                        prompt = (
-                            f"You are a highly knowledgeable educational assistant named EeeBee, built by Edubull, and specialized in {st.session_state.auth_data.get('TopicName', 'Unknown Topic')}.\n\n"
-                            f"Teacher Mode Instructions:\n"
-                            f"- The user is a teacher instructing {branch_name} students under the NCERT curriculum.\n"
-                            f"- Provide detailed suggestions on how to explain concepts and design assessments for the {branch_name} level.\n"
-                            f"- Offer insights into common student difficulties and ways to address them.\n"
-                            f"- Encourage a teaching methodology where students learn progressively, asking guiding questions rather than providing direct answers.\n"
-                            f"- Maintain a professional, informative tone, and ensure all advice aligns with the NCERT curriculum.\n"
-                            f"- Keep all mathematical expressions within LaTeX delimiters ($...$ or $$...$$).\n"
-                            f"- Emphasize to the teacher the importance of fostering critical thinking.\n"
-                            f"- If the teacher requests sample questions, provide them in a progressive manner, ensuring they prompt the student to reason through each step.\n\n"
-                            f"Now, generate a set of 20 exam questions for the concept '{chosen_concept_text}' at Bloom's Taxonomy **{bloom_short}**.\n"
-                            f"Label each question clearly with **({bloom_short})** and use LaTeX for any math.\n"
-                        )
-
-                        with st.spinner("Generating exam questions... Please wait."):
-                            try:
-                                response = client.chat.completions.create(
-                                    model="gpt-4o",
-                                    messages=[{"role": "system", "content": prompt}],
-                                    max_tokens=4000,
-                                    stream=False
-                                )
-                                # Use dot-notation to access the content
-                                questions = response.choices[0].message.content.strip()
-                                st.session_state.exam_questions = questions
-                                st.success("Exam questions generated successfully!")
-                                
-                                st.markdown("### 📝 Generated Exam Questions")
-                                st.markdown(questions.replace("\n", "<br>"), unsafe_allow_html=True)
-                                
-                                pdf_bytes = generate_exam_questions_pdf(
-                                    questions,
+                        # Repeat requests are served from the question bank without calling the model
+                        questions = get_cached_questions(st.session_state.topic_id, chosen_concept_id, bloom_level, branch_name)
+
+                        try:
+                            st.markdown("### 📝 Generated Exam Questions")
+                            if questions:
+                                st.success("Exam questions loaded from the question bank!")
+                                for question in split_questions(questions):
+                                    render_exam_question(question)
+                            else:
+                                # Show each question as soon as the next one starts streaming
+                                status = st.empty()
+                                status.caption("✍️ Generating exam questions...")
+                                splitter = QuestionSplitter()
+                                for text in stream_questions(
+                                    st.session_state.topic_id,
+                                    st.session_state.auth_data.get('TopicName', 'Unknown Topic'),
+                                    chosen_concept_id,
                                     chosen_concept_text,
-                                    st.session_state.auth_data['UserInfo'][0]['FullName']
-                                )
-                                st.download_button(
-                                    label="📥 Download Exam Questions as PDF",
-                                    data=pdf_bytes,
-                                    file_name=f"{st.session_state.auth_data['UserInfo'][0]['FullName']}_Exam_Questions_{chosen_concept_text}.pdf",
-                                    mime="application/pdf"
-                                )
-                            except Exception as e:
-                                st.error(f"Error generating exam questions: {e}")
+                                    bloom_level,
+                                    branch_name,
+                                    on_queue=show_queue_position(status)
+                                ):
+                                    for question in splitter.feed(text):
+                                        render_exam_question(question)
+                                    if splitter.current_number is not None:
+                                        status.caption(f"✍️ Writing question {splitter.current_number}...")
+                                for question in splitter.close():
+                                    render_exam_question(question)
+                                questions = splitter.text.strip()
+                                status.success("Exam questions generated successfully!")
+                            st.session_state.exam_questions = questions
+
+                            pdf_bytes = generate_exam_questions_pdf(
+                                questions,
+                                chosen_concept_text,
+                                st.session_state.auth_data['UserInfo'][0]['FullName']
+                            )
+                            st.download_button(
+                                label="📥 Download Exam Questions as PDF",
+                                data=pdf_bytes,
+                                file_name=f"{st.session_state.auth_data['UserInfo'][0]['FullName']}_Exam_Questions_{chosen_concept_text}.pdf",
+                                mime="application/pdf"
+                            )
+                        except Exception as e:
+                            st.error(f"Error generating exam questions: {e}")
             else:
                 st.info("No concepts available for question generation.")
 
@@ -1273,53 +1147,15 @@ def format_concept_details(concept):
         f"  ⌛ Total time spent: {format_time(concept['TotalTimeTaken_SS'])}"
     )
 
-def fetch_student_info(batch_id, topic_id, org_code):
-    """Fetch student information for a specific batch - exact implementation from test.py"""
-    params = {
-        "BatchID": batch_id,
-        "TopicID": topic_id,
-        "OrgCode": org_code
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-    try:
-        logging.info(f"Fetching student info with params: {params}")
-        response = requests.post(API_STUDENT_INFO, json=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        logging.info(f"Student info API response status: {data.get('Status', 'No status')}")
-        return data
-    except Exception as e:
-        logging.error(f"Error fetching student info: {e}")
-        st.error(f"Error fetching student info: {e}")
-        return None
+def name_digest(students, limit=15):
+    names = [s['FullName'] for s in students[:limit]]
+    if len(students) > limit:
+        names.append(f"+{len(students) - limit} more")
+    return ", ".join(names) or "none"
 
-def fetch_student_concepts(user_id, topic_id, org_code):
-    """Fetch detailed concept information for a specific student - exact implementation from test.py"""
-    params = {
-        "UserID": user_id,
-        "TopicID": topic_id,
-        "OrgCode": org_code
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-    try:
-        logging.info(f"Fetching student concepts with params: {params}")
-        response = requests.post(API_STUDENT_CONCEPTS, json=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        logging.info(f"Student concepts API response status: {data.get('Status', 'No status')}")
-        return data
-    except Exception as e:
-        logging.error(f"Error fetching student concepts: {e}")
-        st.error(f"Error fetching student concepts: {e}")
-        return None
+def remember_digest(response, digest):
+    """Let the chat context send a compact digest instead of a long command output"""
+    st.session_state.conversation_window.add_digest(response, digest)
 
 def handle_teacher_commands(user_input: str):
     """Handle teacher-specific chat commands"""
@@ -1394,6 +1230,11 @@ def handle_teacher_commands(user_input: str):
                 response += "⚠️ No concepts cleared:\n" + "\n".join(no_progress) + "\n\n"
                 
             response += "📢 Just type the number or name of a student to analyze their progress"
+            remember_digest(response, (
+                f"[Student list shown to the teacher] {len(all_cleared)} completed all concepts, "
+                f"{len(partial_progress)} in progress, {len(no_progress)} with no concepts cleared "
+                f"({name_digest([s for s in students if s['ClearedConceptCount'] == 0])})."
+            ))
             return response
     
     # Check if input is a number corresponding to a student
@@ -1500,13 +1341,24 @@ def handle_batch_selection(selected_batch):
         student_list += "⌨️ Just type the number or name of a student to analyze their progress"
         
         # Combine class overview and student list
-        return (
+        response = (
             f"Looking at class {selected_batch['BatchName']}:\n\n"
             f"Class Overview:\n\n"
             f"- Total Students: {total_students}\n"
+            f"- Data updated: {format_age(st.session_state.batch_data_fetched_at)}\n"
             f"- Concepts Coverage:\n{concept_overview}\n\n"
             f"{student_list}"
         )
+        concept_digest = "; ".join(
+            f"{c['ConceptText']} {c['ClearedStudentCount']}/{c['AttendedStudentCount']}" for c in concepts
+        )
+        remember_digest(response, (
+            f"[Class analysis shown to the teacher] Class {selected_batch['BatchName']}: {total_students} students; "
+            f"{len(completed_students)} completed all concepts, {len(in_progress_students)} in progress, "
+            f"{len(no_progress_students)} with no concepts cleared ({name_digest(no_progress_students)}). "
+            f"Students cleared per concept: {concept_digest}."
+        ))
+        return response
     else:
         return "I couldn't get the student information for this class. Please try again."
 
@@ -1586,27 +1438,33 @@ def handle_student_selection(selected_student):
         f"- Detailed analysis of their performance in any concept"
     )
     
+    weak_digest = "; ".join(
+        f"{c['ConceptText']} ({c['CorrectQuestion']}/{c['AttendedQuestion']} correct)"
+        for c in (student_concepts or {}).get('WeakConcepts_List', [])
+    )
+    cleared_digest = "; ".join(c['ConceptText'] for c in (student_concepts or {}).get('ClearedConcepts_List', []))
+    remember_digest(response, (
+        f"[Student analysis shown to the teacher] {selected_student['FullName']}: progress {progress:.1f}%, "
+        f"{total_correct}/{total_questions} questions correct, {format_time(total_time)} spent. "
+        f"Weak concepts: {weak_digest or 'none'}. Mastered: {cleared_digest or 'none'}."
+    ))
     return response
 
 def fetch_student_info(batch_id, topic_id, org_code):
-    """Fetch student information for a specific batch"""
-    params = {
-        "BatchID": batch_id,
-        "TopicID": topic_id,
-        "OrgCode": org_code
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
+    """Fetch student information for a specific batch (shared with the Teacher Dashboard cache)"""
     try:
-        response = requests.post(API_STUDENT_INFO, json=params, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        data, fetched_at = get_batch_data(batch_id, topic_id, org_code)
     except Exception as e:
         st.error(f"Error fetching student info: {e}")
         return None
+    # Orgs on the legacy endpoint get a bare concept list with no students,
+    # as in teacher_dashboard
+    if isinstance(data, list):
+        data = {"Concepts": data, "Students": []}
+    elif not isinstance(data, dict):
+        return None
+    st.session_state.batch_data_fetched_at = fetched_at
+    return data
 
 def fetch_student_concepts(user_id, topic_id, org_code):
     """Fetch detailed concept information for a specific student"""
@@ -1615,15 +1473,8 @@ def fetch_student_concepts(user_id, topic_id, org_code):
         "TopicID": topic_id,
         "OrgCode": org_code
     }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
     try:
-        response = requests.post(API_STUDENT_CONCEPTS, json=params, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return post_json(API_STUDENT_CONCEPTS, params)
     except Exception as e:
         st.error(f"Error fetching student concepts: {e}")
         return None
@@ -1655,119 +1506,41 @@ def format_concept_details(concept):
     )
 
 def get_system_prompt():
+    """The session's chat system prompt: a shared static prefix plus a short session suffix (memoized)"""
     topic_name = st.session_state.auth_data.get('TopicName', 'Unknown Topic')
     branch_name = st.session_state.auth_data.get('BranchName', 'their class')
 
     if st.session_state.is_teacher:
-        # Teacher mode prompt with updated flow instructions
-        batches = st.session_state.auth_data.get("BatchList", [])
-        batch_list = "\n".join([f"- {b['BatchName']} (ID: {b['BatchID']})" for b in batches])
-        
-        return f"""
-You are a highly knowledgeable educational assistant named EeeBee, built by Edubull, and specialized in {topic_name}. 
-
-Technology Stack:
-- When responding, please refrain from mentioning that your architecture is based on GPT. Instead, describe yourself as EeeBee, A Large Language Model developed by Edubull Technologies Private Limited.
-- Chat-based operations are powered by EeeBee.
-- Advanced functionalities such as generating learning paths, question generation assistance, gap analysis, and baseline testing utilize EeeBee Proxima (the reasoning model from EduBull).
-
-Teacher Mode Instructions:
-- The user is a teacher instructing {branch_name} students under the NCERT curriculum.
-- Available batches:\n{batch_list}
-- Guide teachers to use the "Show all classes" button to see their class list
-- When teachers select a class number from the list, show class analysis and student list
-- When teachers select a student number from the list, show detailed analysis for that student
-- Keep all mathematical expressions within LaTeX delimiters.
-- Focus on helping teachers analyze student performance and design effective strategies.
-- Never provide dummy data to teachers.
-
-Commands to recognize:
-- "show classes" or "list classes" - Display available classes with numbers
-- Numbers (e.g., "1", "2") - Select the corresponding class or student from a numbered list
-- "generate lesson plan" - Create a customized lesson plan based on class performance
-- "suggest strategies" - Provide instructional strategies to improve student outcomes
-"""
+        batches = tuple((b['BatchName'], b['BatchID']) for b in st.session_state.auth_data.get("BatchList", []))
+        key = ("teacher", topic_name, branch_name, batches)
+    else:
+        weak_concepts = tuple(concept['ConceptText'] for concept in st.session_state.student_weak_concepts)
+        key = ("student", topic_name, branch_name, weak_concepts)
 
+    cached = st.session_state.get("system_prompt")
+    if cached and cached[0] == key:
+        return cached[1]
+    if st.session_state.is_teacher:
+        prompt = teacher_prompt(topic_name, branch_name, batches)
     else:
-        # Student mode prompt remains unchanged
-        weak_concepts = [concept['ConceptText'] for concept in st.session_state.student_weak_concepts]
-        weak_concepts_text = ", ".join(weak_concepts) if weak_concepts else "none"
-
-        return f"""
-You are a highly knowledgeable educational assistant named EeeBee, developed by iEdubull and specialized in {topic_name}.
-
-Technology Stack:
-- When responding, please refrain from mentioning that your architecture is based on GPT. Instead, describe yourself as EeeBee, A Large Language Model developed by Edubull Technologies Private Limited.
-- Chat-based operations are powered by EeeBee.
-- Advanced functionalities such as generating learning paths, question generation assistance, gap analysis, and baseline testing utilize EeeBee Proxima (the reasoning model from EduBull).
-
-CRITICAL INSTRUCTION: You must NEVER directly answer a student's question or solve a problem for them. Instead, use the Socratic method to guide them toward discovering the answer themselves.
-
-Student Mode Instructions:
-- The student is in {branch_name} and follows the NCERT curriculum.
-- The student's weak concepts are: {weak_concepts_text}
-- Focus exclusively on {topic_name} in your discussions.
-
-Socratic Teaching Method (MANDATORY):
-1. When a student asks a direct question or wants a solution:
-   - NEVER provide the direct answer or solution
-   - Instead, respond with 2-3 guiding questions that help them think through the problem
-   - Ask them what they already know about the topic
-   - Suggest they try a specific approach and explain their reasoning
-   - Break down complex problems into smaller, manageable steps
-
-2. When a student attempts to answer:
-   - Acknowledge their effort positively
-   - If incorrect, don't simply state they're wrong
-   - Guide them to discover their mistake through targeted questions
-   - If correct, ask them to explain their reasoning to reinforce learning
-
-3. For conceptual questions:
-   - Ask them to relate the concept to real-world examples
-   - Guide them to make connections with previously learned material
-   - Encourage them to formulate their own examples
-
-4. For problem-solving:
-   - Ask them to identify the given information and what they're trying to find
-   - Guide them to select appropriate formulas or methods
-   - Have them estimate a reasonable answer before calculating
-   - Encourage them to check their work and verify the solution
-
-Test Generation and Learning Gap Analysis:
-- When a student requests a test, create a comprehensive 10-question MCQ test covering key concepts in {topic_name} and make sure questions cover all the weak concepts in {weak_concepts_text}.
-- Present 10 questions one by one, clearly numbered from 1-10
-- Present the next questions after the previous question has been attempted
-- Do not cross question or guide them get the corrrect answer after they attempt the question in test, move on to the next question
-- Each question should have 4 options (A, B, C, D) with only one correct answer
-- Include a mix of:
-  - Current grade-level concepts from NCERT {branch_name} curriculum
-  - Prerequisite concepts from previous grades that are foundational to current topics
-- After the student submits all answers, provide: (Call this GAP ANALYZER REPORT)
-  1. A score summary (X/10 correct)
-  2. A detailed analysis for each question showing:
-     - The correct answer
-     - The student's answer
-     - A brief explanation of the concept tested
-  3. A comprehensive learning gap analysis that:
-     - Identifies current grade-level gaps based on NCERT curriculum
-     - Pinpoints specific previous grade-level gaps, explicitly stating:
-       * Which concept is weak
-       * Which previous class/grade it belongs to (e.g., "This is a Class 7 concept on...")
-       * How this gap impacts current learning
-     - Recommends targeted remedial activities for each identified gap
-
-Formatting:
-- All mathematical expressions must be enclosed in LaTeX delimiters ($...$ or $$...$$)
-- Use bullet points and numbered lists for clarity
-- Bold important concepts or key points
-
-Remember: Your goal is to develop the student's critical thinking and problem-solving skills, not to provide answers. Success is measured by how well you guide them to discover solutions independently.
-"""
+        prompt = student_prompt(topic_name, branch_name, weak_concepts)
+    st.session_state.system_prompt = (key, prompt)
+    return prompt
+
+CONCEPT_LIST_COMMANDS = ["list concepts", "show concepts", "available concepts"]
+GAP_LIST_COMMANDS = ["learning gaps", "show gaps", "my gaps"]
+
+def is_first_llm_turn():
+    """True while the chat holds only the latest prompt and locally built concept/gap lists."""
+    return all(
+        role == "assistant" or content.lower() in CONCEPT_LIST_COMMANDS + GAP_LIST_COMMANDS
+        for role, content in st.session_state.chat_history[:-1]
+    )
 
 def handle_preset_prompt(prompt_text):
     """Handle a preset prompt or user input"""
     # Check for student concept list requests
-    if not st.session_state.is_teacher and prompt_text.lower() in ["list concepts", "show concepts", "available concepts"]:
+    if not st.session_state.is_teacher and prompt_text.lower() in CONCEPT_LIST_COMMANDS:
         # Generate a list of available concepts
         concept_list = generate_student_concept_list()
         st.session_state.chat_history.append(("user", prompt_text))
@@ -1776,7 +1549,7 @@ def handle_preset_prompt(prompt_text):
         return
     
     # Check for student learning gaps list
-    if not st.session_state.is_teacher and prompt_text.lower() in ["learning gaps", "show gaps", "my gaps"]:
+    if not st.session_state.is_teacher and prompt_text.lower() in GAP_LIST_COMMANDS:
         # Generate a list of learning gaps
         gaps_list = generate_student_gaps_list()
         st.session_state.chat_history.append(("user", prompt_text))
@@ -1822,28 +1595,34 @@ def handle_preset_prompt(prompt_text):
         # If no teacher command matched or user is not a teacher, get GPT response
         try:
             system_prompt = get_system_prompt()
-            conversation_history_formatted = [{"role": "system", "content": system_prompt}]
-            
-            # Format the conversation history for the API
-            for role, content in st.session_state.chat_history:
-                conversation_history_formatted.append({"role": role, "content": content})
-            
-            # Create a streaming response
-            full_response = ""
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=conversation_history_formatted,
-                #max_tokens=2000,
-                stream=True
-            )
+            # A student's canonical first-turn prompt has one answer per topic and class, shared across sessions
+            topic_name = st.session_state.auth_data.get('TopicName', 'Unknown Topic')
+            branch_name = st.session_state.auth_data.get('BranchName', 'their class')
+            answer_key = None
+            if not st.session_state.is_teacher and is_first_llm_turn():
+                answer_key = canonical_key(prompt_text, topic_name, branch_name)
+            if answer_key is not None:
+                chunks = stream_answer(answer_key, topic_name, branch_name, prompt_text,
+                                       on_queue=show_queue_position(message_placeholder))
+            else:
+                # Recent turns within the token budget, older ones as a rolling summary
+                conversation_history_formatted = st.session_state.conversation_window.build_messages(
+                    system_prompt, st.session_state.chat_history, "preset_prompt"
+                )
+                
+                # Create a streaming response
+                chunks = llm_gateway.stream(
+                    "preset_prompt",
+                    conversation_history_formatted,
+                    on_queue=show_queue_position(message_placeholder)
+                )
             
             # Process the streaming response
-            for chunk in response:
-                if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    # Update the placeholder with the current response
-                    message_placeholder.markdown(full_response + "▌")
+            full_response = ""
+            for content in chunks:
+                full_response += content
+                # Update the placeholder with the current response
+                message_placeholder.markdown(full_response + "▌")
             
             # Final update without the cursor
             message_placeholder.markdown(full_response)
@@ -1853,7 +1632,7 @@ def handle_preset_prompt(prompt_text):
             st.rerun()
             
         except Exception as e:
-            error_message = f"I'm sorry, I encountered an error: {str(e)}"
+            error_message = chat_error_message(e)
             message_placeholder.markdown(error_message)
             st.session_state.chat_history.append(("assistant", error_message))
             st.rerun()
@@ -1981,38 +1760,34 @@ def process_pending_messages():
         get_gpt_response(user_input)
 
 def get_gpt_response(user_input):
-    if not client:
+    if not llm_gateway.available("chat"):
         st.error("DeepSeek client is not initialized. Check your API key.")
         return
     
-    system_prompt = get_system_prompt()
-    conversation_history_formatted = [{"role": "system", "content": system_prompt}]
-    
-    # Format the conversation history for the API
-    for role, content in st.session_state.chat_history:
-        conversation_history_formatted.append({"role": role, "content": content})
-    
     try:
+        # Recent turns within the token budget, older ones as a rolling summary
+        conversation_history_formatted = st.session_state.conversation_window.build_messages(
+            get_system_prompt(), st.session_state.chat_history, "chat"
+        )
+
         # Create a chat message container for the assistant
         with st.chat_message("assistant", avatar="🤖"):
             message_placeholder = st.empty()
             full_response = ""
             
             # Create a streaming response
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=conversation_history_formatted,
+            response = llm_gateway.stream(
+                "chat",
+                conversation_history_formatted,
                 max_tokens=2000,
-                stream=True
+                on_queue=show_queue_position(message_placeholder)
             )
             
             # Process the streaming response
-            for chunk in response:
-                if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    # Update the placeholder with the current response
-                    message_placeholder.markdown(full_response + "▌")
+            for content in response:
+                full_response += content
+                # Update the placeholder with the current response
+                message_placeholder.markdown(full_response + "▌")
             
             # Final update without the cursor
             message_placeholder.markdown(full_response)
@@ -2021,7 +1796,7 @@ def get_gpt_response(user_input):
         st.session_state.chat_history.append(("assistant", full_response))
         
     except Exception as e:
-        error_message = f"I'm sorry, I encountered an error: {str(e)}"
+        error_message = chat_error_message(e)
         with st.chat_message("assistant", avatar="🤖"):
             st.markdown(error_message)
         st.session_state.chat_history.append(("assistant", error_message))
@@ -2060,22 +1835,17 @@ def enhanced_login(org_code, login_id, password, topic_id, is_english_mode, user
     if not is_english_mode:
         auth_payload['UserType'] = user_type_value
         
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
     
     try:
-        response = requests.post(api_url, json=auth_payload, headers=headers)
-        response.raise_for_status()
-        auth_data = response.json()
+        auth_data = post_json(api_url, auth_payload)
         logging.info(f"Authentication Response: {auth_data}")
         
         is_valid, subject_id, error_msg = verify_auth_response(auth_data, is_english_mode)
         if not is_valid:
             return False, error_msg
             
+        # Keep only the fields the app reads, as shared compact records
+        auth_data = parse_auth(auth_data)
         st.session_state.auth_data = auth_data
         st.session_state.is_authenticated = True
         st.session_state.topic_id = int(topic_id)
@@ -2089,7 +1859,10 @@ def enhanced_login(org_code, login_id, password, topic_id, is_english_mode, user
             st.session_state.user_id = user_info.get("UserID")
             
             if user_type_value == 3:  # Student
-                st.session_state.student_weak_concepts = auth_data.get("WeakConceptList", [])
+                st.session_state.student_weak_concepts = auth_data["WeakConceptList"]
+                start_remedial_prefetch(
+                    (int(topic_id), c['ConceptID']) for c in st.session_state.student_weak_concepts
+                )
         else:
             user_info = auth_data.get("UserInfo", [{}])[0]
             st.session_state.user_id = user_info.get("UserID")
@@ -2222,9 +1995,48 @@ def load_data_parallel():
             st.error(f"Error fetching baseline data: {e}")
         
         try:
-            st.session_state.all_concepts = concepts_future.result() or []
+            all_concepts = concepts_future.result()
+            if isinstance(all_concepts, list):
+                shared = {c.concept_id: c for c in st.session_state.auth_data.get('ConceptList', [])}
+                st.session_state.all_concepts = parse_concepts(all_concepts, shared=shared)
         except Exception as e:
             st.error(f"Error fetching all concepts: {e}")
+    
+    # Warm the Gap Analyzer with every weak or not-attended concept
+    start_remedial_prefetch(
+        (c['TopicID'], c['ConceptID'])
+        for c in st.session_state.all_concepts
+        if c.get('ConceptStatus') in ["Weak", "Not-Attended"]
+    )
+
+def start_remedial_prefetch(keys):
+    """Queue background remedial fetches for this session without blocking the script."""
+    if "remedial_prefetch" not in st.session_state:
+        st.session_state.remedial_prefetch = RemedialPrefetch()
+    st.session_state.remedial_prefetch.submit(keys)
+
+def start_question_pregeneration(batch_id, concepts):
+    """Queue every missing question set for this batch's concepts (once per batch per session)."""
+    jobs = st.session_state.setdefault("question_pregen", {})
+    job_key = (batch_id, st.session_state.topic_id)
+    if job_key in jobs or not concepts:
+        return
+    jobs[job_key] = PregenerationJob(
+        st.session_state.topic_id,
+        st.session_state.auth_data.get('TopicName', 'Unknown Topic'),
+        st.session_state.auth_data.get("BranchName", "their class"),
+        concepts
+    )
+
+def logout():
+    """Cancel this session's background work and clear its state"""
+    prefetch_job = st.session_state.get("remedial_prefetch")
+    if prefetch_job:
+        prefetch_job.cancel()
+    for pregen_job in st.session_state.get("question_pregen", {}).values():
+        pregen_job.cancel()
+    st.session_state.clear()
+    st.rerun()
 
 def display_tabs_parallel():
     # Create a sidebar for navigation
@@ -2236,8 +2048,7 @@ def display_tabs_parallel():
     
     # Add logout button to sidebar
     if st.sidebar.button("Logout", key="logout_button"):
-        st.session_state.clear()
-        st.rerun()
+        logout()
     
     # Main content area
     if tab_selection == "💬 Chat":
@@ -2273,16 +2084,24 @@ def display_learning_path_tab():
             button_key = f"generate_lp_{concept_id}"
             if st.button("🧠 Generate Learning Path", key=button_key):
                 if concept_id not in st.session_state.student_learning_paths:
-                    with st.spinner(f"Generating learning path for {concept_text}..."):
-                        learning_path = generate_learning_path(concept_text)
-                        if learning_path:
-                            st.session_state.student_learning_paths[concept_id] = {
-                                "concept_text": concept_text,
-                                "learning_path": learning_path
-                            }
-                            st.success(f"Learning path generated for {concept_text}!")
-                        else:
-                            st.error(f"Failed to generate learning path for {concept_text}.")
+                    # Another student in this branch may already have generated it
+                    branch_name = st.session_state.auth_data.get('BranchName', 'their class')
+                    learning_path = get_cached_learning_path(concept_text, branch_name)
+                    if not learning_path:
+                        # Show sections as they arrive, then swap in the full view below
+                        stream_slot = st.empty()
+                        with stream_slot.container():
+                            with st.expander(f"📚 Learning Path for {concept_text} (Grade: {branch_name})", expanded=True):
+                                learning_path = generate_learning_path(concept_text, placeholder=st.empty())
+                        stream_slot.empty()
+                    if learning_path:
+                        st.session_state.student_learning_paths[concept_id] = {
+                            "concept_text": concept_text,
+                            "learning_path": learning_path
+                        }
+                        st.success(f"Learning path generated for {concept_text}!")
+                    else:
+                        st.error(f"Failed to generate learning path for {concept_text}.")
 
             if concept_id in st.session_state.student_learning_paths:
                 lp_data = st.session_state.student_learning_paths[concept_id]
@@ -2317,8 +2136,7 @@ def main_screen():
         
         # Add logout button to sidebar
         if st.sidebar.button("Logout", key="logout_button_teacher"):
-            st.session_state.clear()
-            st.rerun()
+            logout()
         
         if tab_selection == "💬 Chat":
             st.subheader("Chat with your EeeBee AI buddy", anchor=None)
@@ -2341,7 +2159,92 @@ def main_screen():
             # Display tabs in sidebar
             display_tabs_parallel()
 
+# ----------------------------------------------------------------------------
+# HIDDEN ADMIN PAGE (open with ?admin=<ADMIN_TOKEN>)
+# ----------------------------------------------------------------------------
+def get_admin_token():
+    try:
+        return st.secrets.get("ADMIN_TOKEN") or os.environ.get("EEEBEE_ADMIN_TOKEN")
+    except Exception:
+        return os.environ.get("EEEBEE_ADMIN_TOKEN")
+
+def is_admin_request():
+    token = get_admin_token()
+    return bool(token) and st.query_params.get("admin") == token
+
+def admin_page():
+    section = st.sidebar.radio("Admin", ["📈 Metrics", "🧠 Learning Path Cache"], key="admin_section")
+    if section == "📈 Metrics":
+        admin_metrics_page()
+    else:
+        admin_learning_path_cache_page()
+
+def admin_learning_path_cache_page():
+    st.title("Learning Path Cache")
+    stats = learning_paths.cache_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Entries (this process)", stats["size"])
+    col2.metric("Hit rate", f"{stats['hit_rate'] * 100:.1f}%")
+    col3.metric("Coalesced requests", stats["coalesced"])
+    col4.metric("Persistent", "Yes" if stats["persistent"] else "No")
+
+    if st.button("🗑️ Invalidate all learning paths", key="admin_lp_clear"):
+        learning_paths.invalidate()
+        st.success("All cached learning paths were removed.")
+        st.rerun()
+
+    search = st.text_input("Filter by concept or branch", key="admin_lp_filter").strip().lower()
+    entries = [
+        e for e in learning_paths.learning_path_cache.entries()
+        if not search or search in e["key"]["concept"] or search in e["key"]["branch"]
+    ]
+    if not entries:
+        st.info("No cached learning paths.")
+        return
+
+    for idx, entry in enumerate(entries):
+        key = entry["key"]
+        cols = st.columns([4, 2, 2, 2, 1])
+        cols[0].markdown(f"**{key['concept']}**")
+        cols[1].markdown(key["branch"])
+        cols[2].markdown(f"{key['model']} · v{key['prompt_version']}")
+        cols[3].markdown(format_age(entry["created_at"]))
+        if cols[4].button("🗑️", key=f"admin_lp_delete_{idx}", help="Invalidate this learning path"):
+            learning_paths.invalidate(key)
+            st.rerun()
+        with st.expander("Preview"):
+            st.markdown(entry["value"])
+
+def admin_metrics_page():
+    st.title("EeeBee Metrics")
+    st.caption("Process-wide since this server started. Percentiles are bucket upper bounds.")
+    if st.button("Refresh", key="admin_refresh"):
+        st.rerun()
+
+    data = metrics.summary()
+    st.subheader("Latency and size histograms")
+    if data["histograms"]:
+        st.dataframe(pd.DataFrame(data["histograms"]), use_container_width=True)
+    else:
+        st.info("No calls recorded yet.")
+
+    st.subheader("Counters")
+    if data["counters"]:
+        st.dataframe(pd.DataFrame(data["counters"]), use_container_width=True)
+
+    st.subheader("Components")
+    st.json(data["components"])
+
+    prometheus_text = metrics.render_prometheus()
+    st.download_button("📥 Download Prometheus metrics", prometheus_text, file_name="eeebee_metrics.txt")
+    with st.expander("Prometheus text"):
+        st.code(prometheus_text, language="text")
+
 def main():
+    metrics.start_metrics_server()
+    if is_admin_request():
+        admin_page()
+        st.stop()
     if st.session_state.is_authenticated:
         main_screen()
         # Process any pending messages after rendering the UI
@@ -2362,17 +2265,8 @@ def fetch_class_analysis(batch_id):
             "TopicID": st.session_state.topic_id
         }
         
-        # Make API request
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "application/json"
-        }
-        
         # Use the API_STUDENT_INFO endpoint to get student information
-        response = requests.post(API_STUDENT_INFO, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        data = post_json(API_STUDENT_INFO, payload)
         
         if not data or "StudentList" not in data:
             return None
@@ -2415,17 +2309,8 @@ def fetch_student_analysis(student_id):
             "TopicID": st.session_state.topic_id
         }
         
-        # Make API request
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "application/json"
-        }
-        
         # Use the API_STUDENT_CONCEPTS endpoint to get student concept information
-        response = requests.post(API_STUDENT_CONCEPTS, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        data = post_json(API_STUDENT_CONCEPTS, payload)
         
         if not data or "ConceptList" not in data:
             return None
@@ -0,0 +1,96 @@
+"""
+JSON decoding for Edubull responses.
+
+Uses orjson when it is installed and falls back to the stdlib json module.
+stream_arrays() parses the big top-level arrays of a response (Students,
+Concepts, ...) item by item with ijson when it is installed, so a batch can be
+turned into records without first building the whole document in memory.
+Brotli is only advertised in Accept-Encoding when a brotli decoder is present.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+ACCEPT_ENCODING = "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate"
+
+_SCALAR_EVENTS = {"null", "boolean", "integer", "double", "number", "string"}
+
+
+def backend():
+    return "orjson" if orjson is not None else "json"
+
+
+def loads(data):
+    """Decode a JSON document from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def stream_arrays(fp, converters):
+    """
+    Parse a top-level JSON object from the binary file object fp.
+
+    Every item of a top-level array named in `converters` is passed through
+    converters[name](item) as soon as it is complete, and only the converted
+    items are kept. Other top-level scalar values, including nulls such as
+    "Students": null, are kept as-is; other nested values are skipped. Without
+    ijson the document is decoded in one go, with the same result.
+    """
+    if ijson is None:
+        data = loads(fp.read())
+        if not isinstance(data, dict):
+            return data
+        result = {}
+        for key, value in data.items():
+            if isinstance(value, list):
+                if key in converters:
+                    result[key] = [converters[key](item) for item in value]
+            elif not isinstance(value, dict):
+                result[key] = value
+        return result
+
+    item_prefixes = {f"{name}.item": name for name in converters}
+    result = {}
+    builder = None
+    building = None
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == building and event in ("end_map", "end_array"):
+                name = item_prefixes[building]
+                result[name].append(converters[name](builder.value))
+                builder = None
+            continue
+
+        name = item_prefixes.get(prefix)
+        if name is not None:
+            if event in ("start_map", "start_array"):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                building = prefix
+            elif event in _SCALAR_EVENTS:
+                result[name].append(converters[name](value))
+        elif prefix in converters and event == "start_array":
+            result[prefix] = []
+        elif "." not in prefix and prefix and event in _SCALAR_EVENTS:
+            result[prefix] = value
+    return result
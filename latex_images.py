@@ -0,0 +1,87 @@
+"""
+LaTeX expressions rendered to PNG for the exam-question and learning-path PDFs.
+
+Images are cached process-wide in a TTL/LRU cache bounded by entry count and
+by total bytes. While questions stream in, prerender() queues their
+expressions on a small executor so the page is not blocked by matplotlib; the
+PDF builder's render() then reuses those images, waits for a render still in
+progress, or renders a missing one itself. Rendering uses matplotlib's
+object API rather than pyplot, so it is safe off the script thread.
+"""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from matplotlib.figure import Figure
+
+import metrics
+from caches import TTLCache
+
+LATEX_PATTERN = re.compile(r'\$\$(.*?)\$\$|\$(.*?)\$')
+LATEX_CACHE_TTL = int(os.environ.get("LATEX_CACHE_TTL", "3600"))
+LATEX_CACHE_MAXSIZE = int(os.environ.get("LATEX_CACHE_MAXSIZE", "512"))
+LATEX_CACHE_MAX_BYTES = int(os.environ.get("LATEX_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+LATEX_WORKERS = int(os.environ.get("LATEX_WORKERS", "2"))
+
+latex_cache = TTLCache("latex_images", maxsize=LATEX_CACHE_MAXSIZE, ttl=LATEX_CACHE_TTL,
+                       max_bytes=LATEX_CACHE_MAX_BYTES)
+_executor = ThreadPoolExecutor(max_workers=LATEX_WORKERS, thread_name_prefix="latex")
+_pending = {}  # (latex_code, dpi) -> Future of a queued or running render
+_pending_lock = threading.Lock()
+
+
+def expressions(text):
+    """The non-empty LaTeX expressions in text, in order."""
+    for line in text.split("\n"):
+        for match in LATEX_PATTERN.finditer(line.strip()):
+            latex = (match.group(1) or match.group(2) or "").strip()
+            if latex:
+                yield latex
+
+
+def _png(latex_code, dpi):
+    figure = Figure(figsize=(0.01, 0.01))
+    figure.text(0.5, 0.5, f"${latex_code}$", fontsize=12, ha='center', va='center')
+    buf = BytesIO()
+    figure.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', pad_inches=0.1, transparent=True)
+    return buf.getvalue()
+
+
+def _render_and_store(key):
+    try:
+        png = _png(*key)
+        latex_cache.set(key, png)
+        return png
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def prerender(text, dpi=300):
+    """Queue the LaTeX in text for rendering in the background; returns immediately."""
+    for latex in expressions(text):
+        key = (latex, dpi)
+        with _pending_lock:
+            if key in _pending or key in latex_cache:
+                continue
+            _pending[key] = _executor.submit(_render_and_store, key)
+
+
+def render(latex_code, dpi=300):
+    """PNG bytes for latex_code, from the cache, a pending background render, or rendered now."""
+    key = (latex_code, dpi)
+    png = latex_cache.get(key)
+    if png is not None:
+        return png
+    with _pending_lock:
+        future = _pending.get(key)
+    if future is not None:
+        return future.result()
+    png = _png(latex_code, dpi)
+    latex_cache.set(key, png)
+    return png
+
+
+metrics.register_collector("latex_images", latex_cache.stats)
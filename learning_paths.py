@@ -0,0 +1,108 @@
+"""
+Learning paths shared across sessions.
+
+The learning-path prompt depends only on the concept text and the student's
+branch (grade), so one generation can serve every student in that grade with
+the same weak concept. Results are cached process-wide by (normalized concept,
+branch, model, prompt version), optionally persisted to SQLite, and concurrent
+requests for the same key share a single LLM call.
+
+Generation is streamed (shared_generation.SharedGeneration): a background
+worker owns each in-flight generation and every session asking for the same
+path follows its tokens as they arrive, so the first tokens show up in about a
+second and the result is still cached if the student navigates away mid-stream.
+
+Bump LEARNING_PATH_PROMPT_VERSION whenever build_prompt() changes so stale
+paths are not served.
+"""
+import os
+import re
+
+import llm_gateway
+import metrics
+from caches import PersistentCache
+from disk_cache import DiskCache
+from edubull_client import DISK_CACHE_MAX_BYTES, DISK_CACHE_PATH
+from llm_scheduler import PRIORITY_GENERATION
+from shared_generation import SharedGeneration
+
+LEARNING_PATH_MAX_TOKENS = 1500
+LEARNING_PATH_PROMPT_VERSION = "1"
+LEARNING_PATH_CACHE_TTL = int(os.environ.get("LEARNING_PATH_CACHE_TTL", str(7 * 24 * 3600)))
+LEARNING_PATH_CACHE_MAXSIZE = int(os.environ.get("LEARNING_PATH_CACHE_MAXSIZE", "2000"))
+# SQLite file for persistence; defaults to the Edubull disk cache file when that is enabled
+LEARNING_PATH_DISK_CACHE = os.environ.get("LEARNING_PATH_DISK_CACHE", DISK_CACHE_PATH)
+LEARNING_PATH_WORKERS = int(os.environ.get("LEARNING_PATH_WORKERS", "8"))
+
+learning_path_cache = PersistentCache(
+    "learning_path",
+    maxsize=LEARNING_PATH_CACHE_MAXSIZE,
+    ttl=LEARNING_PATH_CACHE_TTL,
+    disk=DiskCache(LEARNING_PATH_DISK_CACHE, max_bytes=DISK_CACHE_MAX_BYTES) if LEARNING_PATH_DISK_CACHE else None,
+)
+_generation = SharedGeneration(
+    "learning_path", "learning_path", learning_path_cache, LEARNING_PATH_WORKERS, max_tokens=LEARNING_PATH_MAX_TOKENS
+)
+
+
+def normalize_concept(text):
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a concept text."""
+    return re.sub(r"\s+", " ", (text or "").strip().lower()).rstrip(" .:;")
+
+
+def cache_key(concept_text, branch_name, model=None):
+    return {
+        "concept": normalize_concept(concept_text),
+        "branch": normalize_concept(branch_name),
+        "model": model or llm_gateway.model_for("learning_path"),
+        "prompt_version": LEARNING_PATH_PROMPT_VERSION,
+    }
+
+
+def build_prompt(concept_text, branch_name):
+    return (
+        f"You are a highly experienced educational AI assistant specializing in the NCERT curriculum. "
+        f"A student in {branch_name} is struggling with the weak concept: '{concept_text}'. "
+        f"Please create a structured, step-by-step learning path tailored to {branch_name} students, "
+        f"ensuring clarity, engagement, and curriculum alignment.\n\n"
+        f"Sections:\n1. **Introduction**\n2. **Step-by-Step Learning**\n3. **Engagement**\n"
+        f"4. **Real-World Applications**\n5. **Practice Problems**\n\n"
+        f"All math expressions must be in LaTeX."
+        f"Avoid using LaTeX commands like \\text in your responses."
+    )
+
+
+def get_cached_learning_path(concept_text, branch_name):
+    return _generation.get(cache_key(concept_text, branch_name))
+
+
+def _messages(concept_text, branch_name):
+    return [{"role": "system", "content": build_prompt(concept_text, branch_name)}]
+
+
+def stream_learning_path(concept_text, branch_name, on_queue=None, priority=PRIORITY_GENERATION):
+    """
+    Yield the learning path text in chunks as it is generated. A cached path
+    is yielded in one piece. While the LLM call waits for a scheduler slot,
+    on_queue(position) is called instead. Raises whatever the LLM call raised.
+    """
+    return _generation.stream(cache_key(concept_text, branch_name), _messages(concept_text, branch_name),
+                              on_queue=on_queue, priority=priority)
+
+
+def get_learning_path(concept_text, branch_name, priority=PRIORITY_GENERATION):
+    """Return the complete learning path text, generating it on a cache miss."""
+    return _generation.complete(cache_key(concept_text, branch_name), _messages(concept_text, branch_name),
+                                priority=priority)
+
+
+def invalidate(key=None):
+    """Drop one cached learning path (by its key dict), or all of them."""
+    return _generation.invalidate(key)
+
+
+def cache_stats():
+    return _generation.stats()
+
+
+metrics.register_collector("learning_path_cache", cache_stats)
@@ -0,0 +1,125 @@
+"""
+Instrumented pipeline behind every LLM call.
+
+llm_gateway routes each call to a provider (llm_providers.py) and sends it
+through chat_completion(), so its latency, time to first token, token usage
+(including prompt tokens served from the provider's prompt cache) and errors
+are recorded in metrics.py, labelled by model and by the call site that made
+it. Each call first waits for a slot in the process-wide llm_scheduler, by
+priority class, and is then paced and retried by the API key's rate_governor.
+The slot is given back while the call sleeps for pacing or backoff.
+"""
+import logging
+import time
+
+import metrics
+from llm_scheduler import CALL_SITE_PRIORITY, PRIORITY_GENERATION, scheduler
+from rate_governor import LLM_MAX_RETRIES, estimate_tokens, governor_for, is_retryable
+
+
+def chat_completion(provider, call_site, model, messages, stream=False, max_tokens=None, timeout=None,
+                    priority=None, ticket=None, on_queue=None):
+    """
+    Send one chat request to provider and record metrics.
+
+    The call first waits for a scheduler slot at `priority` (by default the
+    call site's class), calling on_queue(position) while it is queued. A
+    caller that already holds a granted scheduler ticket passes it instead.
+    The slot is held until the reply, or the whole stream, is consumed.
+    The call is paced by the API key's rate governor, and 429s and overload
+    errors are retried; the slot is suspended during those sleeps.
+
+    Returns the reply text, or with stream=True an iterator over text chunks.
+    """
+    if ticket is None:
+        if priority is None:
+            priority = CALL_SITE_PRIORITY.get(call_site, PRIORITY_GENERATION)
+        ticket = scheduler.acquire(priority, call_site, on_queue)
+    request = {"model": model, "messages": messages, "stream": stream, "max_tokens": max_tokens, "timeout": timeout}
+    governor = governor_for(provider)
+    estimate = estimate_tokens(request)
+    try:
+        response, started = _create(provider, request, governor, estimate, model, call_site, ticket, on_queue)
+    except Exception:
+        ticket.release()
+        raise
+
+    if stream:
+        return _instrumented_stream(response, model, call_site, started, ticket, governor, estimate)
+
+    ticket.release()
+    usage = response.usage
+    governor.settle(estimate, getattr(usage, "total_tokens", None))
+    metrics.record_llm(
+        model,
+        call_site,
+        time.perf_counter() - started,
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        completion_tokens=getattr(usage, "completion_tokens", None),
+        cached_tokens=getattr(usage, "cached_tokens", None),
+    )
+    return response.text
+
+
+def _create(provider, request, governor, estimate, model, call_site, ticket, on_queue):
+    """Send the request, paced and retried by the governor; return (response, start time)."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        _sleep_outside_slot(ticket, governor.reserve(estimate), on_queue)
+        started = time.perf_counter()
+        try:
+            response, headers = provider.create(**request)
+        except Exception as e:
+            metrics.record_llm(model, call_site, time.perf_counter() - started, error=type(e).__name__)
+            governor.settle(estimate, 0)
+            if attempt >= LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = governor.record_throttle(e, attempt)
+            logging.warning(f"LLM call {call_site} failed ({type(e).__name__}); retry {attempt + 1} in {delay:.2f}s")
+            _sleep_outside_slot(ticket, delay, on_queue)
+        else:
+            governor.record_success(headers)
+            return response, started
+
+
+def _sleep_outside_slot(ticket, delay, on_queue):
+    """Sleep without holding the scheduler slot, then queue for it again."""
+    if delay <= 0:
+        return
+    ticket.suspend()
+    time.sleep(delay)
+    ticket.resume(on_queue)
+
+
+def _instrumented_stream(stream, model, call_site, started, ticket, governor, estimate):
+    first_token_at = None
+    usage = None
+    error = None
+    try:
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.text:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield chunk.text
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        # Also runs when the consumer stops early (e.g. a Streamlit rerun)
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        ticket.release()
+        governor.settle(estimate, getattr(usage, "total_tokens", None))
+        metrics.record_llm(
+            model,
+            call_site,
+            time.perf_counter() - started,
+            ttft=(first_token_at - started) if first_token_at is not None else None,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            cached_tokens=getattr(usage, "cached_tokens", None),
+            error=error,
+        )
@@ -0,0 +1,172 @@
+"""
+Single entry point for LLM calls.
+
+Call sites name what they are doing (the call site) and pass OpenAI-style
+messages. The gateway picks the provider and model from LLM_ROUTES, applies
+the call site's timeout and sends the request through llm_client's scheduler,
+rate governor and metrics. Providers (llm_providers.py) are built once per
+process and shared by every session.
+
+  stream(call_site, messages, ...)     iterator of text chunks
+  complete(call_site, messages, ...)   reply text
+  astream / acomplete                  the same for asyncio code
+
+Routes are "provider:model" strings. Override them with LLM_ROUTES, a JSON
+object such as {"learning_path": "gemini:gemini-2.0-flash"}, or send every
+call to the in-process fake provider with LLM_PROVIDER=fake. API keys come
+from configure() (the apps pass their Streamlit secrets) or from
+OPENAI_API_KEY / GEMINI_API_KEY.
+"""
+import asyncio
+import functools
+import json
+import os
+import threading
+from collections import namedtuple
+
+from llm_client import chat_completion
+from llm_providers import FakeProvider, GeminiProvider, OpenAIProvider
+
+DEFAULT_ROUTES = {
+    "chat": "openai:gpt-4o",
+    "preset_prompt": "openai:gpt-4o",
+    "context_summary": "openai:gpt-4o-mini",
+    "learning_path": "openai:gpt-4o",
+    "exam_questions": "openai:gpt-4o",
+    "document_chat": "gemini:gemini-2.0-flash",
+}
+LLM_ROUTES = {**DEFAULT_ROUTES, **json.loads(os.environ.get("LLM_ROUTES") or "{}")}
+# Send every route to this provider instead (e.g. "fake" for tests and offline runs)
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER")
+
+# Seconds per request; for streams, the longest wait for the next chunk
+CALL_SITE_TIMEOUTS = {
+    "chat": 60,
+    "preset_prompt": 60,
+    "context_summary": 30,
+    "learning_path": 120,
+    "exam_questions": 180,
+    "document_chat": 120,
+}
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "120"))
+
+API_KEY_ENV = {"openai": "OPENAI_API_KEY", "gemini": "GEMINI_API_KEY"}
+
+Route = namedtuple("Route", "provider model")
+
+_credentials = {}  # provider name -> {"api_key", "base_url"}
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def route_for(call_site, model=None):
+    """The (provider, model) a call site is sent to; model overrides the routed model."""
+    provider, _, routed_model = LLM_ROUTES.get(call_site, LLM_ROUTES["chat"]).partition(":")
+    return Route(LLM_PROVIDER or provider, model or routed_model)
+
+
+def model_for(call_site):
+    return route_for(call_site).model
+
+
+def timeout_for(call_site):
+    return CALL_SITE_TIMEOUTS.get(call_site, LLM_TIMEOUT)
+
+
+# ------------------- PROVIDERS -------------------
+def configure(openai_api_key=None, gemini_api_key=None, openai_base_url=None):
+    """Set provider credentials. A provider is rebuilt only when its credentials change."""
+    settings = {
+        "openai": {"api_key": openai_api_key, "base_url": openai_base_url},
+        "gemini": {"api_key": gemini_api_key},
+    }
+    with _providers_lock:
+        for name, values in settings.items():
+            credentials = {**_credentials.get(name, {}), **{k: v for k, v in values.items() if v}}
+            if credentials != _credentials.get(name, {}):
+                _credentials[name] = credentials
+                _providers.pop(name, None)
+
+
+def _build(name):
+    credentials = _credentials.get(name, {})
+    api_key = credentials.get("api_key") or os.environ.get(API_KEY_ENV.get(name, ""))
+    if name == "openai":
+        return OpenAIProvider(api_key=api_key, base_url=credentials.get("base_url"))
+    if name == "gemini":
+        return GeminiProvider(api_key=api_key)
+    if name == "fake":
+        return FakeProvider()
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def get_provider(name):
+    """The shared provider instance, built on first use."""
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = _providers[name] = _build(name)
+        return provider
+
+
+def set_provider(name, provider):
+    """Install a provider instance, e.g. a FakeProvider with scripted replies in a test."""
+    with _providers_lock:
+        _providers[name] = provider
+
+
+def available(call_site="chat"):
+    """True if the provider routed for call_site can be used (has an API key, or needs none)."""
+    name = route_for(call_site).provider
+    if name == "fake" or name in _providers:
+        return True
+    return bool(_credentials.get(name, {}).get("api_key") or os.environ.get(API_KEY_ENV.get(name, "")))
+
+
+# ------------------- CALLS -------------------
+def stream(call_site, messages, model=None, max_tokens=None, timeout=None, priority=None, ticket=None,
+           on_queue=None):
+    """
+    Stream the reply to messages as text chunks. Returns once the call holds
+    a scheduler slot and the provider has accepted it, so queueing, rate
+    limiting and connection errors are raised here; later failures are
+    raised while iterating. See llm_client.chat_completion for priority,
+    ticket and on_queue.
+    """
+    route = route_for(call_site, model)
+    return chat_completion(
+        get_provider(route.provider), call_site, route.model, messages, stream=True, max_tokens=max_tokens,
+        timeout=timeout or timeout_for(call_site), priority=priority, ticket=ticket, on_queue=on_queue,
+    )
+
+
+def complete(call_site, messages, model=None, max_tokens=None, timeout=None, priority=None, ticket=None,
+             on_queue=None):
+    """Return the whole reply text to messages."""
+    route = route_for(call_site, model)
+    return chat_completion(
+        get_provider(route.provider), call_site, route.model, messages, stream=False, max_tokens=max_tokens,
+        timeout=timeout or timeout_for(call_site), priority=priority, ticket=ticket, on_queue=on_queue,
+    )
+
+
+async def astream(call_site, messages, **options):
+    """stream() for asyncio code; the blocking waits run on the loop's default executor."""
+    loop = asyncio.get_running_loop()
+    chunks = await loop.run_in_executor(None, functools.partial(stream, call_site, messages, **options))
+    finished = object()
+    try:
+        while True:
+            text = await loop.run_in_executor(None, next, chunks, finished)
+            if text is finished:
+                return
+            yield text
+    finally:
+        # Releases the scheduler slot if the consumer stops early
+        await loop.run_in_executor(None, chunks.close)
+
+
+async def acomplete(call_site, messages, **options):
+    """complete() for asyncio code."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(complete, call_site, messages, **options))
@@ -0,0 +1,160 @@
+"""
+LLM provider adapters with one request and response shape.
+
+Every provider implements
+
+    create(model, messages, stream=False, max_tokens=None, timeout=None)
+        -> (Completion, headers) or (iterator of Chunk, headers)
+
+where messages are OpenAI-style {"role", "content"} dicts, headers are the
+HTTP response headers when the provider exposes them (for the rate governor),
+and usage is normalized to Usage. Errors are the SDK's own; llm_client
+decides which are retried. SDKs are imported only when a provider is built.
+
+  OpenAIProvider  OpenAI chat completions (OPENAI_BASE_URL works, e.g. mock_llm.py)
+  GeminiProvider  Google Gemini through google-genai
+  FakeProvider    in-process replies for tests, no network
+"""
+import itertools
+import threading
+import time
+from collections import namedtuple
+
+Usage = namedtuple("Usage", "prompt_tokens completion_tokens total_tokens cached_tokens")
+Completion = namedtuple("Completion", "text usage")
+Chunk = namedtuple("Chunk", "text usage")
+
+
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, api_key=None, base_url=None):
+        from openai import OpenAI
+        # rate_governor owns retries, so the SDK's are off
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.api_key = self.client.api_key
+
+    def create(self, model, messages, stream=False, max_tokens=None, timeout=None):
+        kwargs = {"model": model, "messages": messages, "stream": stream}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        if timeout:
+            kwargs["timeout"] = timeout
+        if stream:
+            kwargs["stream_options"] = {"include_usage": True}
+        completions = self.client.chat.completions
+        # The raw-response API exposes the x-ratelimit-* headers the governor feeds on
+        raw = completions.with_raw_response.create(**kwargs)
+        response = raw.parse()
+        if stream:
+            return self._chunks(response), raw.headers
+        return Completion(response.choices[0].message.content or "", _openai_usage(response.usage)), raw.headers
+
+    def _chunks(self, stream):
+        try:
+            for chunk in stream:
+                # The trailing usage-only chunk has no choices
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                usage = _openai_usage(chunk.usage)
+                if text or usage:
+                    yield Chunk(text or "", usage)
+        finally:
+            stream.close()
+
+
+def _openai_usage(usage):
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return Usage(usage.prompt_tokens, usage.completion_tokens, usage.total_tokens,
+                 getattr(details, "cached_tokens", None))
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, api_key=None):
+        from google import genai
+        self.api_key = api_key
+        self.client = genai.Client(api_key=api_key)
+
+    def create(self, model, messages, stream=False, max_tokens=None, timeout=None):
+        from google.genai import types
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        contents = [
+            types.Content(role="model" if m["role"] == "assistant" else "user", parts=[types.Part(text=m["content"])])
+            for m in messages if m["role"] != "system"
+        ]
+        config = types.GenerateContentConfig(
+            system_instruction=system or None,
+            max_output_tokens=max_tokens,
+            http_options=types.HttpOptions(timeout=int(timeout * 1000)) if timeout else None,
+        )
+        if not stream:
+            response = self.client.models.generate_content(model=model, contents=contents, config=config)
+            return Completion(response.text or "", _gemini_usage(response.usage_metadata)), None
+        chunks = self._chunks(self.client.models.generate_content_stream(model=model, contents=contents, config=config))
+        # The request is only sent on the first read; make it here so failures are retried like OpenAI's
+        first = next(chunks, None)
+        return itertools.chain([first] if first else [], chunks), None
+
+    def _chunks(self, stream):
+        for chunk in stream:
+            # usage_metadata is cumulative, so the last one seen is the call's total
+            yield Chunk(chunk.text or "", _gemini_usage(chunk.usage_metadata))
+
+
+def _gemini_usage(meta):
+    if meta is None:
+        return None
+    return Usage(meta.prompt_token_count, meta.candidates_token_count, meta.total_token_count,
+                 meta.cached_content_token_count)
+
+
+def _echo(model, messages):
+    prompt = messages[-1]["content"] if messages else ""
+    return f"[{model}] reply to: {prompt[:200]}"
+
+
+class FakeProvider:
+    """
+    In-process provider for tests and offline runs. reply(model, messages)
+    returns the reply text (by default an echo of the last message), which is
+    streamed chunk_words words at a time, delay seconds apart. Every request
+    is recorded in .requests; exceptions appended to .errors are raised by the
+    next calls, in order.
+    """
+    name = "fake"
+    api_key = "fake"
+
+    def __init__(self, reply=_echo, chunk_words=4, delay=0.0):
+        self.reply = reply
+        self.chunk_words = chunk_words
+        self.delay = delay
+        self.requests = []
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def create(self, model, messages, stream=False, max_tokens=None, timeout=None):
+        with self._lock:
+            self.requests.append({"model": model, "messages": messages, "stream": stream,
+                                  "max_tokens": max_tokens, "timeout": timeout})
+            error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        text = self.reply(model, messages)
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = len(text) // 4
+        usage = Usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens, 0)
+        if not stream:
+            return Completion(text, usage), None
+        return self._chunks(text, usage), None
+
+    def _chunks(self, text, usage):
+        words = text.split(" ")
+        for i in range(0, len(words), self.chunk_words):
+            if self.delay:
+                time.sleep(self.delay)
+            last = i + self.chunk_words >= len(words)
+            piece = " ".join(words[i:i + self.chunk_words]) + ("" if last else " ")
+            yield Chunk(piece, usage if last else None)
@@ -0,0 +1,265 @@
+"""
+Process-wide scheduler for LLM calls.
+
+Every LLM call made through llm_gateway waits here for one of
+LLM_MAX_CONCURRENCY slots. When slots are scarce, waiting calls are served by
+priority class and then in arrival order:
+
+  chat        interactive chat turns (and their context summaries)
+  generation  learning paths and question sets someone is waiting for
+  bulk        question-bank pre-generation and offline batch jobs
+
+Bulk calls never hold more than LLM_BULK_MAX_CONCURRENCY slots, so a burst of
+pre-generation cannot occupy every slot while chat turns queue behind it.
+Queue wait is exported per priority class and call site, and a waiting call
+can report its queue position (Ticket.positions() / Ticket.wait()). A call
+that has to sleep before sending (rate pacing, retry backoff) suspends its
+ticket so the slot serves other calls meanwhile, then resumes it.
+"""
+import os
+import threading
+import time
+
+import metrics
+
+PRIORITY_CHAT = 0
+PRIORITY_GENERATION = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {PRIORITY_CHAT: "chat", PRIORITY_GENERATION: "generation", PRIORITY_BULK: "bulk"}
+
+CALL_SITE_PRIORITY = {
+    "chat": PRIORITY_CHAT,
+    "preset_prompt": PRIORITY_CHAT,
+    "context_summary": PRIORITY_CHAT,
+    "learning_path": PRIORITY_GENERATION,
+    "exam_questions": PRIORITY_GENERATION,
+    "document_chat": PRIORITY_CHAT,
+}
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_BULK_MAX_CONCURRENCY = int(os.environ.get("LLM_BULK_MAX_CONCURRENCY", str(max(1, LLM_MAX_CONCURRENCY // 2))))
+
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class QueuePosition(int):
+    """Marker a streaming producer yields while its LLM call is still queued."""
+
+
+class Ticket:
+    """One LLM call's place in the scheduler queue, and then its slot."""
+
+    def __init__(self, scheduler, priority, call_site, seq):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.call_site = call_site
+        self.seq = seq
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+        self.released = False
+
+    def positions(self, poll=0.5):
+        """
+        Yield this ticket's queue position (1 = next) whenever it changes and
+        return once a slot is granted. Closing the generator early cancels it.
+        """
+        scheduler = self.scheduler
+        last = None
+        granted = False
+        try:
+            while True:
+                with scheduler._cond:
+                    while not self.granted and scheduler._position(self) == last:
+                        scheduler._cond.wait(poll)
+                    if self.granted:
+                        granted = True
+                        return
+                    last = scheduler._position(self)
+                yield last
+        finally:
+            if not granted:
+                self.release()
+
+    def wait(self, on_position=None):
+        """Block until a slot is granted, calling on_position(position) while queued."""
+        for position in self.positions():
+            if on_position is not None:
+                on_position(position)
+
+    def release(self):
+        """Give the slot back (or leave the queue). Safe to call more than once."""
+        self.scheduler._release(self)
+
+    def suspend(self):
+        """Give the slot back while the call sleeps (rate pacing, retry backoff); see resume()."""
+        self.scheduler._suspend(self)
+
+    def resume(self, on_position=None):
+        """Queue a suspended ticket again, ahead of later arrivals of its class, and wait for a slot."""
+        self.scheduler._resume(self)
+        self.wait(on_position)
+
+    def __del__(self):
+        # Safety net for a stream that was created but never iterated or closed
+        if not self.released:
+            self.release()
+
+
+class LLMScheduler:
+    def __init__(self, limit=LLM_MAX_CONCURRENCY, bulk_limit=LLM_BULK_MAX_CONCURRENCY):
+        self.limit = limit
+        self.bulk_limit = bulk_limit
+        self._cond = threading.Condition(threading.RLock())
+        self._waiting = []
+        self._running = {p: 0 for p in PRIORITY_NAMES}
+        self._seq = 0
+        self.granted_total = 0
+        self.cancelled_total = 0
+
+    def enqueue(self, priority, call_site):
+        with self._cond:
+            self._seq += 1
+            ticket = Ticket(self, priority, call_site, self._seq)
+            self._waiting.append(ticket)
+            self._dispatch()
+            return ticket
+
+    def acquire(self, priority, call_site, on_position=None):
+        ticket = self.enqueue(priority, call_site)
+        ticket.wait(on_position)
+        return ticket
+
+    def set_limit(self, limit):
+        """Change the global concurrency limit; running calls are not interrupted."""
+        with self._cond:
+            self.limit = max(1, limit)
+            self._dispatch()
+
+    def promote(self, ticket, priority):
+        """Move a still-queued ticket up to a more urgent priority class."""
+        with self._cond:
+            if ticket.granted or ticket.released or priority >= ticket.priority:
+                return
+            ticket.priority = priority
+            self._dispatch()
+            self._cond.notify_all()
+
+    def _eligible(self, ticket):
+        return ticket.priority != PRIORITY_BULK or self._running[PRIORITY_BULK] < self.bulk_limit
+
+    def _position(self, ticket):
+        return 1 + sum(
+            1 for other in self._waiting
+            if (other.priority, other.seq) < (ticket.priority, ticket.seq)
+        )
+
+    def _dispatch(self):
+        granted = False
+        while self._waiting and sum(self._running.values()) < self.limit:
+            candidates = [t for t in self._waiting if self._eligible(t)]
+            if not candidates:
+                break
+            ticket = min(candidates, key=lambda t: (t.priority, t.seq))
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            self._running[ticket.priority] += 1
+            self.granted_total += 1
+            granted = True
+            metrics.observe("eeebee_llm_queue_wait_seconds", time.perf_counter() - ticket.enqueued_at,
+                            buckets=WAIT_BUCKETS, help_text="Time LLM calls waited for a scheduler slot",
+                            priority=PRIORITY_NAMES[ticket.priority], call_site=ticket.call_site)
+        if granted or self._waiting:
+            self._cond.notify_all()
+
+    def _suspend(self, ticket):
+        with self._cond:
+            if ticket.released or not ticket.granted:
+                return
+            ticket.granted = False
+            self._running[ticket.priority] -= 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    def _resume(self, ticket):
+        with self._cond:
+            if ticket.released or ticket.granted or ticket in self._waiting:
+                return
+            ticket.enqueued_at = time.perf_counter()
+            self._waiting.append(ticket)
+            self._dispatch()
+
+    def _release(self, ticket):
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.granted:
+                self._running[ticket.priority] -= 1
+            elif ticket in self._waiting:
+                self._waiting.remove(ticket)
+                self.cancelled_total += 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+            for ticket in self._waiting:
+                waiting[PRIORITY_NAMES[ticket.priority]] += 1
+            return {
+                "limit": self.limit,
+                "bulk_limit": self.bulk_limit,
+                "running": {PRIORITY_NAMES[p]: n for p, n in self._running.items()},
+                "waiting": waiting,
+                "granted": self.granted_total,
+                "cancelled": self.cancelled_total,
+            }
+
+
+class _SharedCall:
+    def __init__(self, priority):
+        self.priority = priority
+        self.ticket = None
+
+
+class SharedPriorities:
+    """
+    Priorities of LLM calls shared by several callers (see StreamingSingleFlight).
+
+    A shared call is queued at the most urgent priority of the callers waiting
+    for it, so an interactive request that joins a queued bulk generation
+    promotes it instead of waiting behind the bulk limit.
+    """
+
+    def __init__(self, call_site, scheduler):
+        self.call_site = call_site
+        self.scheduler = scheduler
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def join(self, key, priority):
+        """Register a caller for key; returns the shared call to hand to its producer."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _SharedCall(priority)
+            elif priority < call.priority:
+                call.priority = priority
+                if call.ticket is not None:
+                    self.scheduler.promote(call.ticket, priority)
+            return call
+
+    def enqueue(self, call):
+        """Queue the shared call's ticket at the most urgent priority joined so far."""
+        with self._lock:
+            call.ticket = self.scheduler.enqueue(call.priority, self.call_site)
+            return call.ticket
+
+    def finish(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+
+scheduler = LLMScheduler()
+metrics.register_collector("llm_scheduler", scheduler.stats)
@@ -0,0 +1,278 @@
+"""
+Concurrent-session load test harness for eeebee.py.
+
+Drives N simulated student and teacher sessions through the real Streamlit app
+(via streamlit.testing.v1.AppTest) against local stand-ins for the Edubull API
+(mock_edubull.py) and the LLM (mock_llm.py), then reports per-stage latency
+percentiles, throughput and peak RSS.
+
+Student flow:  login_screen -> enhanced_login + load_data_parallel -> every tab
+               in display_tabs_parallel (plus one learning path generation)
+Teacher flow:  login -> dashboard batch selection for each batch -> chat class
+               and student drill-down -> exam question generation
+
+  python load_test.py --students 40 --teachers 5 --edubull-latency lognormal:150,0.5
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eeebee.py")
+
+STUDENT_TABS = ["💬 Chat", "🧠 Learning Path", "🔎 Gap Analyzer™", "📝 Baseline Testing"]
+
+
+# ------------------- MEASUREMENT -------------------
+class Recorder:
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def stage(self, name, fn):
+        """Time fn() as one sample of `name`; AppTest exceptions count as errors."""
+        started = time.perf_counter()
+        try:
+            at = fn()
+            failed = bool(at is not None and getattr(at, "exception", None))
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.durations[name].append(elapsed)
+            if failed:
+                self.errors[name] += 1
+        return not failed
+
+
+def _free_port():
+    """A currently free local port, so the mock's URL is known before it starts."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval=0.1):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak_kb = _rss_kb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak_kb = max(self.peak_kb, _rss_kb())
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# ------------------- FLOWS -------------------
+def _new_app(topic_id, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    at.secrets["OPENAI_API_KEY"] = "load-test"
+    at.query_params["T"] = str(topic_id)
+    return at
+
+
+def _login(at, recorder, org_code, login_id, user_type):
+    recorder.stage("login_screen", at.run)
+    at.radio(key="user_type_selector").set_value(user_type)
+    at.text_input(key="org_code").input(org_code)
+    at.text_input(key="login_id").input(login_id)
+    at.text_input(key="password").input("load-test")
+    return recorder.stage("enhanced_login+load_data", lambda: at.button(key="login_button").click().run())
+
+
+def student_session(index, args, recorder):
+    at = _new_app(args.topic_id, args.timeout)
+    if not _login(at, recorder, args.org_code, f"student{index}", "Student"):
+        return
+    for tab in STUDENT_TABS:
+        recorder.stage(f"tab:{tab}", lambda: at.sidebar.radio[0].set_value(tab).run())
+
+    # Learning Path generation for the first weak concept
+    at.sidebar.radio[0].set_value("🧠 Learning Path").run()
+    lp_buttons = [b for b in at.button if str(b.key).startswith("generate_lp_")]
+    if lp_buttons:
+        recorder.stage("generate_learning_path", lambda: lp_buttons[0].click().run())
+
+
+def teacher_session(index, args, recorder):
+    at = _new_app(args.topic_id, args.timeout)
+    if not _login(at, recorder, args.org_code, f"teacher{index}", "Teacher"):
+        return
+
+    at.sidebar.radio[0].set_value("📊 Teacher Dashboard").run()
+    batch_selector = at.selectbox(key="batch_selector")
+    for batch_name in list(batch_selector.options):
+        recorder.stage("batch_selection", lambda: at.selectbox(key="batch_selector").set_value(batch_name).run())
+
+    at.sidebar.radio[0].set_value("💬 Chat").run()
+    recorder.stage("chat:show_classes", lambda: at.chat_input(key="chat_input").set_value("show classes").run())
+    recorder.stage("chat:class_drilldown", lambda: at.chat_input(key="chat_input").set_value("1").run())
+    recorder.stage("chat:student_drilldown", lambda: at.chat_input(key="chat_input").set_value("1").run())
+
+    at.sidebar.radio[0].set_value("📊 Teacher Dashboard").run()
+    at.radio(key="dashboard_view_radio").set_value("📝 Question Generation").run()
+    recorder.stage("question_generation", lambda: at.button(key="generate_exam_btn").click().run())
+
+
+# ------------------- REPORT -------------------
+def build_report(recorder, wall_time, sessions, baseline_kb, peak_kb):
+    stages = {}
+    for name, values in recorder.durations.items():
+        stages[name] = {
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "mean_ms": statistics.fmean(values) * 1000,
+            "throughput_per_s": len(values) / wall_time if wall_time else 0.0,
+        }
+    return {
+        "sessions": sessions,
+        "wall_time_s": wall_time,
+        "sessions_per_s": sessions / wall_time if wall_time else 0.0,
+        "baseline_rss_mb": baseline_kb / 1024,
+        "peak_rss_mb": peak_kb / 1024,
+        "peak_rss_per_session_mb": (peak_kb - baseline_kb) / 1024 / sessions if sessions else 0.0,
+        "stages": stages,
+    }
+
+
+def print_report(report):
+    print(f"\nSessions: {report['sessions']} in {report['wall_time_s']:.1f}s "
+          f"({report['sessions_per_s']:.2f} sessions/s)")
+    print(f"RSS: baseline {report['baseline_rss_mb']:.0f} MB, peak {report['peak_rss_mb']:.0f} MB, "
+          f"~{report['peak_rss_per_session_mb']:.1f} MB per session\n")
+    print(f"{'stage':34} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>7}")
+    for name, s in sorted(report["stages"].items()):
+        print(f"{name:34} {s['count']:>5} {s['errors']:>4} {s['p50_ms']:>9.0f} {s['p95_ms']:>9.0f} "
+              f"{s['p99_ms']:>9.0f} {s['throughput_per_s']:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for eeebee.py")
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--teachers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=0, help="Max sessions in flight (default: all)")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="Spread session starts over this period")
+    parser.add_argument("--topic-id", type=int, default=3)
+    parser.add_argument("--org-code", default="012")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-run AppTest timeout in seconds")
+    parser.add_argument("--edubull-base", help="Use an already running Edubull stand-in instead of starting one")
+    parser.add_argument("--llm-base", help="Use an already running LLM stand-in (…/v1) instead of starting one")
+    parser.add_argument("--edubull-latency", default="lognormal:120,0.5")
+    parser.add_argument("--edubull-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=400)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80)
+    parser.add_argument("--llm-completion-tokens", type=int, default=200)
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    # edubull_client builds its API_* URLs from EDUBULL_API_BASE at import time, and
+    # mock_edubull imports it, so the base must be set before either is imported
+    edubull_port = None
+    if args.edubull_base:
+        edubull_base = args.edubull_base
+    else:
+        edubull_port = _free_port()
+        edubull_base = f"http://127.0.0.1:{edubull_port}"
+    os.environ["EDUBULL_API_BASE"] = edubull_base
+
+    import edubull_client
+    import mock_edubull
+    import mock_llm
+
+    assert edubull_client.API_AUTH_URL_ENGLISH.startswith(edubull_base), (
+        f"edubull_client was imported before EDUBULL_API_BASE was set; it points at {edubull_client.EDUBULL_API_BASE}"
+    )
+
+    servers = []
+    if edubull_port is not None:
+        server, _ = mock_edubull.start_in_background(
+            mock_edubull.MockConfig(latency=args.edubull_latency, error_rate=args.edubull_error_rate),
+            port=edubull_port,
+        )
+        servers.append(server)
+    if args.llm_base:
+        llm_base = args.llm_base
+    else:
+        server, llm_base = mock_llm.start_in_background(
+            mock_llm.MockLLMConfig(args.llm_ttft_ms, args.llm_tokens_per_second, args.llm_completion_tokens)
+        )
+        servers.append(server)
+
+    # Must be set before the app creates its OpenAI client
+    os.environ["OPENAI_BASE_URL"] = llm_base
+
+    # Import Streamlit up front so its memory is part of the baseline, not the sessions
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+
+    jobs = [(student_session, i) for i in range(args.students)] + [(teacher_session, i) for i in range(args.teachers)]
+    sessions = len(jobs)
+    recorder = Recorder()
+    sampler = RSSSampler()
+    baseline_kb = _rss_kb()
+    sampler.start()
+
+    def run_job(job_index, job):
+        if args.ramp_seconds and sessions > 1:
+            time.sleep(args.ramp_seconds * job_index / (sessions - 1))
+        flow, index = job
+        try:
+            flow(index, args, recorder)
+        except Exception as e:
+            recorder.errors[f"session:{flow.__name__}"] += 1
+            print(f"{flow.__name__} {index} aborted: {e}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency or sessions or 1) as executor:
+        list(executor.map(lambda item: run_job(*item), enumerate(jobs)))
+    wall_time = time.perf_counter() - started
+    sampler.stop()
+
+    for server in servers:
+        server.shutdown()
+
+    report = build_report(recorder, wall_time, sessions, baseline_kb, sampler.peak_kb)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
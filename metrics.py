@@ -0,0 +1,261 @@
+"""
+Process-wide latency and volume metrics.
+
+Records histograms and counters for outbound Edubull HTTP calls and LLM calls,
+plus snapshots from registered components (caches, breakers, prefetch, ...),
+and renders everything in the Prometheus text exposition format. The text is
+served by the hidden admin page in eeebee.py and, when METRICS_PORT is set, by
+a small standalone HTTP endpoint for scraping. That endpoint binds METRICS_HOST
+(127.0.0.1 by default; set 0.0.0.0 to expose it beyond the host).
+"""
+import logging
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+RATIO_BUCKETS = (0, 0.1, 0.25, 0.5, 0.75, 0.9, 1)
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> Histogram
+_counters = {}     # (name, labels) -> float
+_help = {}         # name -> (type, help text)
+_collectors = {}   # component name -> zero-argument callable returning a dict
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Approximate quantile from bucket upper bounds."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for upper, n in zip(self.buckets + (math.inf,), self.counts):
+            running += n
+            if running >= target:
+                return upper
+        return math.inf
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, help_text="", **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _help.setdefault(name, ("histogram", help_text))
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def inc(name, amount=1, help_text="", **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _help.setdefault(name, ("counter", help_text))
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def register_collector(component, fn):
+    """Register a callable whose dict of numeric stats is exported as gauges."""
+    _collectors[component] = fn
+
+
+# ------------------- RECORDERS -------------------
+def record_http(endpoint, seconds, status=None, size=None, error=None):
+    """Record one outbound Edubull HTTP attempt."""
+    status_label = str(status) if status is not None else "none"
+    observe("eeebee_http_request_duration_seconds", seconds,
+            help_text="Edubull HTTP request latency", endpoint=endpoint, status=status_label)
+    inc("eeebee_http_requests_total", help_text="Edubull HTTP requests", endpoint=endpoint, status=status_label)
+    if size is not None:
+        observe("eeebee_http_response_bytes", size, buckets=SIZE_BUCKETS,
+                help_text="Edubull HTTP response body size", endpoint=endpoint)
+    if error is not None:
+        inc("eeebee_http_errors_total", help_text="Edubull HTTP errors", endpoint=endpoint, error=error)
+
+
+def record_llm(model, call_site, seconds, ttft=None, prompt_tokens=None, completion_tokens=None, error=None,
+               cached_tokens=None):
+    """
+    Record one LLM call. ttft and token counts are optional (unknown for failed
+    calls); cached_tokens is the part of the prompt served from the provider's
+    prompt cache.
+    """
+    labels = {"model": model, "call_site": call_site}
+    observe("eeebee_llm_request_duration_seconds", seconds, help_text="LLM call latency", **labels)
+    inc("eeebee_llm_requests_total", help_text="LLM calls", **labels)
+    if error is not None:
+        inc("eeebee_llm_errors_total", help_text="LLM call errors", error=error, **labels)
+        return
+    if ttft is not None:
+        observe("eeebee_llm_time_to_first_token_seconds", ttft, help_text="LLM time to first token", **labels)
+    if prompt_tokens is not None:
+        inc("eeebee_llm_prompt_tokens_total", prompt_tokens, help_text="LLM prompt tokens", **labels)
+    if cached_tokens is not None:
+        inc("eeebee_llm_cached_prompt_tokens_total", cached_tokens,
+            help_text="LLM prompt tokens served from the provider prompt cache", **labels)
+        if prompt_tokens:
+            observe("eeebee_llm_prompt_cache_hit_ratio", cached_tokens / prompt_tokens, buckets=RATIO_BUCKETS,
+                    help_text="Share of each LLM prompt served from the provider prompt cache", **labels)
+    if completion_tokens is not None:
+        inc("eeebee_llm_completion_tokens_total", completion_tokens, help_text="LLM completion tokens", **labels)
+        generation_time = seconds - (ttft or 0)
+        if completion_tokens and generation_time > 0:
+            observe("eeebee_llm_tokens_per_second", completion_tokens / generation_time, buckets=RATE_BUCKETS,
+                    help_text="LLM completion tokens per second after the first token", **labels)
+
+
+# ------------------- EXPORT -------------------
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _collect_components():
+    lines = []
+    for component, fn in sorted(_collectors.items()):
+        try:
+            stats = fn()
+        except Exception as e:
+            logging.warning(f"Metrics collector {component} failed: {e}")
+            continue
+        for key, value in _flatten(stats):
+            lines.append((f"eeebee_component_{key}", (("component", component),), value))
+    return lines
+
+
+def _flatten(stats, prefix=""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}".replace(".", "_").replace("-", "_")
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(value, prefix=f"{name}_")
+
+
+def render_prometheus():
+    with _lock:
+        histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in _histograms.items()}
+        counters = dict(_counters)
+        help_items = dict(_help)
+
+    out = []
+    for name in sorted({k[0] for k in histograms} | {k[0] for k in counters}):
+        metric_type, help_text = help_items.get(name, ("untyped", ""))
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {metric_type}")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                out.append(f"{name}{_format_labels(labels)} {value}")
+        for (n, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            if n != name:
+                continue
+            running = 0
+            for upper, c in zip(buckets + ("+Inf",), counts):
+                running += c
+                out.append(f"{name}_bucket{_format_labels(labels + (('le', upper),))} {running}")
+            out.append(f"{name}_sum{_format_labels(labels)} {total}")
+            out.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    families = {}
+    for name, labels, value in _collect_components():
+        families.setdefault(name, []).append((labels, value))
+    for name, samples in sorted(families.items()):
+        out.append(f"# HELP {name} {name[len('eeebee_component_'):]} from each registered component's stats")
+        out.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            out.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(out) + "\n"
+
+
+def summary():
+    """Per-series p50/p95 and counts, for the admin page tables."""
+    with _lock:
+        rows = []
+        for (name, labels), h in sorted(_histograms.items()):
+            rows.append({
+                "metric": name,
+                **dict(labels),
+                "count": h.count,
+                "mean": h.sum / h.count if h.count else 0.0,
+                "p50<=": h.quantile(0.5),
+                "p95<=": h.quantile(0.95),
+            })
+        counters = [{"metric": name, **dict(labels), "value": value} for (name, labels), value in sorted(_counters.items())]
+    components = {}
+    for component, fn in sorted(_collectors.items()):
+        try:
+            components[component] = fn()
+        except Exception as e:
+            components[component] = {"error": str(e)}
+    return {"histograms": rows, "counters": counters, "components": components}
+
+
+# ------------------- SCRAPE ENDPOINT -------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """Serve /metrics on METRICS_PORT (once per process). Does nothing if no port is configured."""
+    global _server
+    port = port or os.environ.get("METRICS_PORT")
+    if not port or _server is not None:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer((METRICS_HOST, int(port)), _MetricsHandler)
+        except OSError as e:
+            # Another worker on this host already owns the port
+            logging.warning(f"Metrics endpoint not started on port {port}: {e}")
+            _server = False
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info(f"Metrics endpoint listening on {METRICS_HOST}:{port}/metrics")
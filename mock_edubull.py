@@ -0,0 +1,462 @@
+"""
+Local stand-in for webapi.edubull.com, for offline development and load testing.
+
+Serves every endpoint the app uses with configurable latency and error rates,
+in one of three modes:
+
+  synthetic  generate plausible responses from the request payload (default)
+  record     proxy to the real API and save anonymized responses as fixtures
+  replay     serve previously recorded fixtures (optionally falling back to synthetic)
+
+Point the app at it with:
+
+  python mock_edubull.py --port 8765 --latency lognormal:120,0.5 --error-rate 0.01
+  EDUBULL_API_BASE=http://127.0.0.1:8765 streamlit run eeebee.py
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import edubull_client
+from edubull_client import endpoint_name
+
+ENDPOINT_URLS = [
+    edubull_client.API_AUTH_URL_ENGLISH,
+    edubull_client.API_AUTH_URL_MATH_SCIENCE,
+    edubull_client.API_CONTENT_URL,
+    edubull_client.API_TEACHER_WEAK_CONCEPTS,
+    edubull_client.API_BASELINE_REPORT,
+    edubull_client.API_ALL_CONCEPTS_URL,
+    edubull_client.API_STUDENT_INFO,
+    edubull_client.API_STUDENT_CONCEPTS,
+]
+# URL path -> endpoint name, independent of whatever EDUBULL_API_BASE is set to
+ENDPOINT_PATHS = {
+    url[len(edubull_client.EDUBULL_API_BASE):]: endpoint_name(url) for url in ENDPOINT_URLS
+}
+DEFAULT_UPSTREAM = "https://webapi.edubull.com"
+
+# Request/response fields that identify a person and are masked in recorded fixtures
+PII_FIELDS = {
+    "FullName", "FirstName", "LastName", "UserName", "LoginID", "Password",
+    "EmailID", "Email", "MobileNo", "Mobile", "PhoneNo", "FatherName",
+    "MotherName", "Address", "DOB",
+}
+
+# Responses at least this large are gzipped when the client sends Accept-Encoding: gzip
+GZIP_MIN_BYTES = 1024
+
+
+# ------------------- LATENCY AND ERRORS -------------------
+def parse_latency(spec):
+    """
+    Parse a latency spec (milliseconds) into a zero-argument sampler returning seconds.
+
+    fixed:80 | uniform:50,200 | normal:100,20 | lognormal:MEDIAN,SIGMA
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v] if args else []
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def parse_overrides(items, cast):
+    """Parse repeated NAME=VALUE options into a dict."""
+    overrides = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        overrides[name] = cast(value)
+    return overrides
+
+
+# ------------------- ANONYMIZATION AND FIXTURES -------------------
+def _mask(field, value):
+    digest = hashlib.sha1(str(value).encode("utf-8")).hexdigest()[:8]
+    return f"{field}-{digest}"
+
+
+def anonymize(data):
+    if isinstance(data, dict):
+        return {
+            k: (_mask(k, v) if k in PII_FIELDS and v not in (None, "") else anonymize(v))
+            for k, v in data.items()
+        }
+    if isinstance(data, list):
+        return [anonymize(v) for v in data]
+    return data
+
+
+def fixture_key(payload):
+    """Stable hash of a request payload; passwords never take part in matching."""
+    matched = {k: str(v) for k, v in (payload or {}).items() if k != "Password"}
+    return hashlib.sha256(json.dumps(matched, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def fixture_path(fixtures_dir, name, payload):
+    return os.path.join(fixtures_dir, name, f"{fixture_key(payload)}.json")
+
+
+def load_fixture(fixtures_dir, name, payload):
+    path = fixture_path(fixtures_dir, name, payload)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(fixtures_dir, name, payload, status, body):
+    path = fixture_path(fixtures_dir, name, payload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fixture = {
+        "endpoint": name,
+        "request": anonymize({k: v for k, v in payload.items() if k != "Password"}),
+        "status": status,
+        "body": anonymize(body),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False, indent=1)
+
+
+# ------------------- SYNTHETIC RESPONSES -------------------
+CONCEPT_COUNT = 12
+
+
+def _rng(name, payload):
+    return random.Random(f"{name}:{fixture_key(payload)}")
+
+
+def _concepts(topic_id, count=CONCEPT_COUNT):
+    return [
+        {"ConceptID": topic_id * 100 + i, "ConceptText": f"Concept {i} of topic {topic_id}", "TopicID": topic_id}
+        for i in range(1, count + 1)
+    ]
+
+
+def _student_name(user_id):
+    return f"Student {user_id}"
+
+
+def synth_auth(payload, rng, students_per_batch):
+    topic_id = int(payload.get("TopicID") or 1)
+    is_teacher = payload.get("UserType") == 2
+    user_id = int(hashlib.sha1(str(payload.get("LoginID")).encode("utf-8")).hexdigest()[:6], 16)
+    concepts = _concepts(topic_id)
+    data = {
+        "statusCode": 1,
+        "SubjectID": 1,
+        "TopicName": f"Topic {topic_id}",
+        "BranchName": "Class 8",
+        "UserInfo": [{
+            "UserID": user_id,
+            "FullName": f"Teacher {user_id}" if is_teacher else _student_name(user_id),
+            "OrgCode": payload.get("OrgCode", "012"),
+            "SubjectID": 1,
+        }],
+        "ConceptList": concepts,
+        "WeakConceptList": rng.sample(concepts, k=rng.randint(2, 5)),
+    }
+    if is_teacher:
+        data["BatchList"] = [
+            {"BatchID": 1000 + i, "BatchName": f"Class-8 {chr(65 + i)}", "StudentCount": students_per_batch}
+            for i in range(6)
+        ]
+    return data
+
+
+def synth_content(payload, rng, students_per_batch):
+    concept_id = payload.get("ConceptID")
+    return {
+        "Video_List": [
+            {"LectureID": concept_id * 10 + i, "LectureTitle": f"Video {i} for concept {concept_id}"}
+            for i in range(rng.randint(1, 3))
+        ],
+        "Notes_List": [
+            {"FolderName": "https://cdn.example.invalid/notes/", "PDFFileName": f"{concept_id}_{i}.pdf",
+             "NotesTitle": f"Notes {i} for concept {concept_id}"}
+            for i in range(rng.randint(0, 2))
+        ],
+        "Exercise_List": [
+            {"FolderName": "https://cdn.example.invalid/exercises/", "ExerciseFileName": f"{concept_id}_{i}.pdf",
+             "ExerciseTitle": f"Exercise {i} for concept {concept_id}"}
+            for i in range(rng.randint(0, 2))
+        ],
+    }
+
+
+def _concept_stats(topic_id, rng, students):
+    stats = []
+    for concept in _concepts(topic_id):
+        attended = rng.randint(students // 2, students)
+        stats.append(dict(
+            concept,
+            AttendedStudentCount=attended,
+            ClearedStudentCount=rng.randint(0, attended),
+            DurationTaken_SS=rng.randint(300, 6000),
+        ))
+    return stats
+
+
+def synth_teacher_weak_concepts(payload, rng, students_per_batch):
+    return _concept_stats(int(payload.get("TopicID") or 1), rng, students_per_batch)
+
+
+def synth_student_info(payload, rng, students_per_batch):
+    topic_id = int(payload.get("TopicID") or 1)
+    batch_id = int(payload.get("BatchID") or 1)
+    students = []
+    for i in range(students_per_batch):
+        total = CONCEPT_COUNT
+        cleared = rng.randint(0, total)
+        user_id = batch_id * 1000 + i
+        students.append({
+            "UserID": user_id,
+            "FullName": _student_name(user_id),
+            "TotalConceptCount": total,
+            "ClearedConceptCount": cleared,
+            "WeakConceptCount": total - cleared,
+        })
+    return {"Status": "Success", "Concepts": _concept_stats(topic_id, rng, students_per_batch), "Students": students}
+
+
+def _concept_performance(concept, rng):
+    attended = rng.randint(0, 10)
+    avg_time = rng.randint(20, 120)
+    return dict(
+        concept,
+        AttendedQuestion=attended,
+        CorrectQuestion=rng.randint(0, attended),
+        AvgMarksPercent=rng.randint(0, 100) if attended else 0,
+        AvgTimeTaken_SS=avg_time if attended else 0,
+        TotalTimeTaken_SS=avg_time * attended,
+    )
+
+
+def synth_student_concepts(payload, rng, students_per_batch):
+    concepts = [_concept_performance(c, rng) for c in _concepts(int(payload.get("TopicID") or 1))]
+    split = rng.randint(0, len(concepts))
+    return {"Status": "Success", "WeakConcepts_List": concepts[:split], "ClearedConcepts_List": concepts[split:]}
+
+
+def synth_all_concepts(payload, rng, students_per_batch):
+    statuses = ["Weak", "Cleared", "Not-Attended"]
+    concepts = []
+    for topic_id in (1, 2, 3):
+        for concept in _concepts(topic_id, count=6):
+            concepts.append(dict(concept, ConceptStatus=rng.choice(statuses)))
+    return concepts
+
+
+def synth_baseline(payload, rng, students_per_batch):
+    user_id = payload.get("UserID")
+    return {
+        "u_list": [{
+            "FullName": _student_name(user_id), "SubjectName": "Mathematics", "BatchName": "Class-8 A",
+            "AttendDate": "2024-01-01", "MarksPercent": rng.randint(20, 95), "TotalQuestion": 20,
+            "CorrectQuestion": rng.randint(5, 20), "WeakConceptCount": rng.randint(0, 8),
+            "DiffQuesPercent": rng.randint(0, 100), "EasyQuesPercent": rng.randint(0, 100),
+            "DurationHH": 0, "DurationMM": rng.randint(10, 59),
+        }],
+        "s_skills": [
+            {"SubjectSkillName": skill, "TotalQuestion": 5, "RightAnswerCount": c, "RightAnswerPercent": c * 20}
+            for skill, c in (("Knowledge", rng.randint(0, 5)), ("Application", rng.randint(0, 5)))
+        ],
+        "concept_wise_data": [
+            {"ConceptText": c["ConceptText"], "BranchName": "Class 8", "RightAnswerPercent": rng.choice([0.0, 50.0, 100.0])}
+            for c in _concepts(1, count=8)
+        ],
+        "taxonomy_list": [
+            {"TaxonomyText": level, "TotalQuestion": 4, "CorrectAnswer": c, "PercentObt": c * 25}
+            for level, c in (("Remember", rng.randint(0, 4)), ("Apply", rng.randint(0, 4)))
+        ],
+    }
+
+
+SYNTHESIZERS = {
+    endpoint_name(edubull_client.API_AUTH_URL_ENGLISH): synth_auth,
+    endpoint_name(edubull_client.API_AUTH_URL_MATH_SCIENCE): synth_auth,
+    endpoint_name(edubull_client.API_CONTENT_URL): synth_content,
+    endpoint_name(edubull_client.API_TEACHER_WEAK_CONCEPTS): synth_teacher_weak_concepts,
+    endpoint_name(edubull_client.API_BASELINE_REPORT): synth_baseline,
+    endpoint_name(edubull_client.API_ALL_CONCEPTS_URL): synth_all_concepts,
+    endpoint_name(edubull_client.API_STUDENT_INFO): synth_student_info,
+    endpoint_name(edubull_client.API_STUDENT_CONCEPTS): synth_student_concepts,
+}
+
+
+# ------------------- SERVER -------------------
+class MockConfig:
+    def __init__(self, mode="synthetic", fixtures_dir="fixtures", upstream=DEFAULT_UPSTREAM,
+                 latency="fixed:0", endpoint_latency=None, error_rate=0.0, endpoint_error_rate=None,
+                 error_status=503, students_per_batch=40, replay_fallback=True):
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self.upstream = upstream.rstrip("/")
+        self.latency = parse_latency(latency)
+        self.endpoint_latency = {k: parse_latency(v) for k, v in (endpoint_latency or {}).items()}
+        self.error_rate = error_rate
+        self.endpoint_error_rate = endpoint_error_rate or {}
+        self.error_status = error_status
+        self.students_per_batch = students_per_batch
+        self.replay_fallback = replay_fallback
+        self.request_counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.request_counts[name] = self.request_counts.get(name, 0) + 1
+
+
+class MockEdubullHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    config = None
+
+    def log_message(self, format, *args):
+        logging.debug("mock_edubull: " + format % args)
+
+    def _send_json(self, status, body):
+        encoded = json.dumps(body).encode("utf-8")
+        content_encoding = None
+        if len(encoded) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            encoded = gzip.compress(encoded, compresslevel=6)
+            content_encoding = "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        if self.path == "/__stats":
+            self._send_json(200, {"mode": self.config.mode, "requests": self.config.request_counts})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        config = self.config
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        name = ENDPOINT_PATHS.get(self.path.split("?", 1)[0])
+        if name is None:
+            self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+            return
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        config.count(name)
+
+        time.sleep(config.endpoint_latency.get(name, config.latency)())
+        if random.random() < config.endpoint_error_rate.get(name, config.error_rate):
+            self._send_json(config.error_status, {"error": "injected failure"})
+            return
+
+        if config.mode == "record":
+            status, body = self._proxy(raw)
+            if status < 500:
+                save_fixture(config.fixtures_dir, name, payload, status, body)
+            self._send_json(status, body)
+            return
+
+        if config.mode == "replay":
+            fixture = load_fixture(config.fixtures_dir, name, payload)
+            if fixture is not None:
+                self._send_json(fixture["status"], fixture["body"])
+                return
+            if not config.replay_fallback:
+                self._send_json(404, {"error": "no fixture recorded for this request"})
+                return
+
+        body = SYNTHESIZERS[name](payload, _rng(name, payload), config.students_per_batch)
+        self._send_json(200, body)
+
+    def _proxy(self, raw):
+        request = urllib.request.Request(
+            self.config.upstream + self.path,
+            data=raw,
+            headers={"Content-Type": "application/json", "Accept": "application/json", "User-Agent": "Mozilla/5.0"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, {"error": e.reason}
+        except (urllib.error.URLError, ValueError) as e:
+            return 502, {"error": str(e)}
+
+
+def make_server(config, host="127.0.0.1", port=8765):
+    handler = type("ConfiguredMockEdubullHandler", (MockEdubullHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_background(config, host="127.0.0.1", port=0):
+    """Start a mock server on a daemon thread; returns (server, base_url). Port 0 picks a free port."""
+    server = make_server(config, host, port)
+    thread = threading.Thread(target=server.serve_forever, name="mock-edubull", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Edubull web API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--fixtures", default="fixtures", help="Directory for recorded fixtures")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="Real API base URL for record mode")
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:LO,HI | normal:MEAN,STD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--endpoint-latency", action="append", metavar="NAME=SPEC", help="Per-endpoint latency override")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--endpoint-error-rate", action="append", metavar="NAME=RATE", help="Per-endpoint error rate override")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--students-per-batch", type=int, default=40)
+    parser.add_argument("--no-replay-fallback", action="store_true", help="In replay mode, 404 on unrecorded requests")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = MockConfig(
+        mode=args.mode,
+        fixtures_dir=args.fixtures,
+        upstream=args.upstream,
+        latency=args.latency,
+        endpoint_latency=parse_overrides(args.endpoint_latency, str),
+        error_rate=args.error_rate,
+        endpoint_error_rate=parse_overrides(args.endpoint_error_rate, float),
+        error_status=args.error_status,
+        students_per_batch=args.students_per_batch,
+        replay_fallback=not args.no_replay_fallback,
+    )
+    server = make_server(config, args.host, args.port)
+    logging.info(f"Mock Edubull API ({args.mode}) listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Local stand-in for the OpenAI chat completions API, for offline load testing.
+
+Implements POST /v1/chat/completions with and without streaming, with a
+configurable time-to-first-token, token rate and error rate. Point the app at
+it with OPENAI_BASE_URL=http://127.0.0.1:8766/v1 (any API key works).
+
+Usage includes prompt_tokens_details.cached_tokens, computed like OpenAI's
+prompt cache: the longest previously seen prompt prefix of at least 1,024
+tokens, in 128-token steps.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+WORDS = (
+    "concept step example practice apply explain reason fraction equation "
+    "area volume ratio energy force cell reaction graph angle number pattern"
+).split()
+
+
+class MockLLMConfig:
+    def __init__(self, ttft_ms=400, tokens_per_second=60, completion_tokens=300,
+                 error_rate=0.0, error_status=503):
+        self.ttft_ms = ttft_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._prefixes = set()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def cached_tokens(self, prompt_text):
+        """Tokens of the longest cached prefix of prompt_text, and remember its prefixes."""
+        boundaries = range(CACHE_MIN_TOKENS, len(prompt_text) // 4 + 1, CACHE_STEP_TOKENS)
+        hashes = [(n, hash(prompt_text[:n * 4])) for n in boundaries]
+        with self._lock:
+            cached = max((n for n, h in hashes if h in self._prefixes), default=0)
+            if len(self._prefixes) > 100_000:
+                self._prefixes.clear()
+            self._prefixes.update(h for _, h in hashes)
+        return cached
+
+
+def generate_tokens(n, rng):
+    """Produce n word tokens laid out as numbered lines and paragraphs, like real answers."""
+    tokens = []
+    line_no = 1
+    for i in range(n):
+        if i % 24 == 0:
+            tokens.append(("\n\n" if i else "") + f"{line_no}. **Section {line_no}**\n")
+            line_no += 1
+        elif i % 8 == 0:
+            tokens.append("\n")
+        tokens.append(rng.choice(WORDS) + " ")
+    return tokens
+
+
+def _prompt_text(messages):
+    return "".join(str(m.get("content", "")) for m in messages)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    config = None
+
+    def log_message(self, format, *args):
+        logging.debug("mock_llm: " + format % args)
+
+    def _send_json(self, status, body):
+        encoded = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_POST(self):
+        config = self.config
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config.count()
+
+        if random.random() < config.error_rate:
+            self._send_json(config.error_status, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        model = request.get("model", "gpt-4o")
+        n_tokens = min(request.get("max_tokens") or config.completion_tokens, config.completion_tokens)
+        tokens = generate_tokens(n_tokens, random.Random())
+        prompt_text = _prompt_text(request.get("messages", []))
+        # Rough 4-characters-per-token estimate; good enough for a stand-in
+        prompt_tokens = len(prompt_text) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": n_tokens,
+            "total_tokens": prompt_tokens + n_tokens,
+            "prompt_tokens_details": {"cached_tokens": config.cached_tokens(prompt_text)},
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        delay = 1.0 / config.tokens_per_second if config.tokens_per_second else 0
+
+        time.sleep(config.ttft_ms / 1000)
+
+        if not request.get("stream"):
+            time.sleep(delay * n_tokens)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send_chunk(delta, finish_reason=None, chunk_usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+            }
+            if chunk_usage is not None:
+                chunk["usage"] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send_chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            send_chunk({"content": token})
+            time.sleep(delay)
+        send_chunk({}, finish_reason="stop")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send_chunk(None, chunk_usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def make_server(config, host="127.0.0.1", port=8766):
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_background(config, host="127.0.0.1", port=0):
+    """Start a mock LLM server on a daemon thread; returns (server, base_url ending in /v1)."""
+    server = make_server(config, host, port)
+    thread = threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--tokens-per-second", type=float, default=60)
+    parser.add_argument("--completion-tokens", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = MockLLMConfig(args.ttft_ms, args.tokens_per_second, args.completion_tokens,
+                           args.error_rate, args.error_status)
+    server = make_server(config, args.host, args.port)
+    logging.info(f"Mock LLM listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
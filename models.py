@@ -0,0 +1,165 @@
+"""
+Compact records for Edubull payloads.
+
+Upstream JSON carries many fields the UI never reads. Payloads are parsed once
+at ingest into __slots__ records holding only the fields the app uses, and
+every session_state copy (numbered lists, weak concepts, batch students, ...)
+refers to the same objects. Records still answer record["ConceptText"] and
+record.get("ConceptID") with the upstream keys, so call sites read them like
+the dicts they replace.
+"""
+import sys
+
+
+def _compact(value):
+    # Concept texts and names repeat across sessions; keep one copy of each
+    return sys.intern(value) if type(value) is str else value
+
+
+class Record:
+    __slots__ = ()
+    FIELDS = ()  # (attribute, upstream key) pairs
+    _attr_by_key = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._attr_by_key = {key: attr for attr, key in cls.FIELDS}
+
+    @classmethod
+    def from_json(cls, raw):
+        record = cls.__new__(cls)
+        for attr, key in cls.FIELDS:
+            setattr(record, attr, _compact(raw.get(key)))
+        return record
+
+    def __getitem__(self, key):
+        attr = self._attr_by_key.get(key)
+        if attr is None:
+            raise KeyError(key)
+        return getattr(self, attr)
+
+    def get(self, key, default=None):
+        attr = self._attr_by_key.get(key)
+        value = getattr(self, attr) if attr is not None else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def to_dict(self):
+        """Upstream-keyed dict of the fields that were present (for DataFrames)."""
+        return {key: getattr(self, attr) for attr, key in self.FIELDS if getattr(self, attr) is not None}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Concept(Record):
+    """An entry of ConceptList / WeakConceptList or of the all-concepts report."""
+    __slots__ = ("concept_id", "concept_text", "topic_id", "status")
+    FIELDS = (
+        ("concept_id", "ConceptID"),
+        ("concept_text", "ConceptText"),
+        ("topic_id", "TopicID"),
+        ("status", "ConceptStatus"),
+    )
+
+
+class ConceptStat(Record):
+    """Class-level results for one concept of a batch."""
+    __slots__ = ("concept_id", "concept_text", "attended_students", "cleared_students", "duration_seconds")
+    FIELDS = (
+        ("concept_id", "ConceptID"),
+        ("concept_text", "ConceptText"),
+        ("attended_students", "AttendedStudentCount"),
+        ("cleared_students", "ClearedStudentCount"),
+        ("duration_seconds", "DurationTaken_SS"),
+    )
+
+
+class Student(Record):
+    """One student's progress within a batch."""
+    __slots__ = ("user_id", "full_name", "cleared_concepts", "weak_concepts", "total_concepts")
+    FIELDS = (
+        ("user_id", "UserID"),
+        ("full_name", "FullName"),
+        ("cleared_concepts", "ClearedConceptCount"),
+        ("weak_concepts", "WeakConceptCount"),
+        ("total_concepts", "TotalConceptCount"),
+    )
+
+
+class Batch(Record):
+    __slots__ = ("batch_id", "batch_name", "student_count")
+    FIELDS = (
+        ("batch_id", "BatchID"),
+        ("batch_name", "BatchName"),
+        ("student_count", "StudentCount"),
+    )
+
+
+class User(Record):
+    __slots__ = ("user_id", "full_name", "org_code", "subject_id")
+    FIELDS = (
+        ("user_id", "UserID"),
+        ("full_name", "FullName"),
+        ("org_code", "OrgCode"),
+        ("subject_id", "SubjectID"),
+    )
+
+
+# ------------------- PARSERS -------------------
+def parse_list(record_cls, items):
+    return [item if isinstance(item, record_cls) else record_cls.from_json(item) for item in items or []]
+
+
+def as_dicts(records):
+    return [record.to_dict() for record in records]
+
+
+def parse_concepts(items, shared=None):
+    """
+    Parse a concept list. Concepts whose ConceptID is in `shared` (a dict of
+    ConceptID -> Concept) and whose fields match reuse that object.
+    """
+    concepts = []
+    for item in items or []:
+        concept = Concept.from_json(item)
+        existing = shared.get(concept.concept_id) if shared else None
+        if existing is not None and existing.to_dict() == concept.to_dict():
+            concept = existing
+        concepts.append(concept)
+    return concepts
+
+
+def parse_auth(raw):
+    """Project a login response down to what the app reads; WeakConceptList shares ConceptList's objects."""
+    concept_list = parse_concepts(raw.get("ConceptList"))
+    by_id = {c.concept_id: c for c in concept_list}
+    auth = {key: _compact(raw[key]) for key in ("TopicName", "BranchName", "SubjectID") if raw.get(key) is not None}
+    auth.update({
+        "UserInfo": parse_list(User, raw.get("UserInfo")) or [User.from_json({})],
+        "ConceptList": concept_list,
+        "WeakConceptList": parse_concepts(raw.get("WeakConceptList"), shared=by_id),
+        "BatchList": parse_list(Batch, raw.get("BatchList")),
+    })
+    return auth
+
+
+# Converters for edubull_client.post_json_streamed on combined batch responses
+BATCH_ARRAYS = {"Concepts": ConceptStat.from_json, "Students": Student.from_json}
+
+
+def parse_batch_data(data):
+    """
+    Parse teacher batch data in either format: the combined dict with Concepts
+    and Students, or the legacy list of concept results.
+    """
+    if isinstance(data, list):
+        return parse_list(ConceptStat, data)
+    if isinstance(data, dict) and ("Concepts" in data or "Students" in data):
+        return {
+            "Concepts": parse_list(ConceptStat, data.get("Concepts")),
+            "Students": parse_list(Student, data.get("Students")),
+        }
+    return data
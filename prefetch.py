@@ -0,0 +1,115 @@
+"""
+Background prefetch of remedial resources after a student logs in.
+
+The fetches run on the shared edubull_async event loop, so starting a prefetch
+never blocks the Streamlit script thread. Results land in the shared remedial
+cache, where the Gap Analyzer and Learning Path tabs find them warm.
+"""
+import asyncio
+import logging
+import os
+import threading
+
+import metrics
+from edubull_async import afetch_remedial_resources, get_loop
+from remedial import RemedialEntry, cache_key, remedial_cache
+
+PREFETCH_CONCURRENCY = int(os.environ.get("PREFETCH_CONCURRENCY", "4"))
+
+# Process-wide totals across all sessions
+_totals = {"started": 0, "prefetched": 0, "failed": 0, "cancelled": 0}
+_totals_lock = threading.Lock()
+
+
+def _bump(counter, n=1):
+    with _totals_lock:
+        _totals[counter] += n
+
+
+def prefetch_totals():
+    with _totals_lock:
+        return dict(_totals)
+
+
+class RemedialPrefetch:
+    """A cancellable set of background remedial fetches owned by one session."""
+
+    def __init__(self, limit=PREFETCH_CONCURRENCY):
+        self.limit = limit
+        self.keys = []
+        self._futures = []
+        self._prefetched = set()
+        self._failed = 0
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def submit(self, keys):
+        """Schedule fetches for any of `keys` not already cached or queued. Returns immediately."""
+        if self._cancelled:
+            return
+        with self._lock:
+            queued = set(self.keys)
+            new_keys = []
+            for topic_id, concept_id in keys:
+                key = cache_key(topic_id, concept_id)
+                if key not in queued and key not in remedial_cache:
+                    queued.add(key)
+                    new_keys.append(key)
+            if not new_keys:
+                return
+            self.keys.extend(new_keys)
+            self._futures.append(asyncio.run_coroutine_threadsafe(self._run(new_keys), get_loop()))
+        _bump("started", len(new_keys))
+
+    async def _run(self, keys):
+        semaphore = asyncio.Semaphore(self.limit)
+
+        async def fetch(key):
+            async with semaphore:
+                # A page may have fetched it while this one was queued
+                if key in remedial_cache:
+                    return
+                try:
+                    resources = await afetch_remedial_resources(*key)
+                except Exception as e:
+                    self._failed += 1
+                    _bump("failed")
+                    logging.warning(f"Prefetch of remedial resources {key} failed: {e}")
+                    return
+                remedial_cache.set(key, RemedialEntry(resources, prefetched=True))
+                self._prefetched.add(key)
+                _bump("prefetched")
+
+        await asyncio.gather(*(fetch(k) for k in keys))
+
+    def cancel(self):
+        """Stop any outstanding fetches (e.g. on logout)."""
+        self._cancelled = True
+        with self._lock:
+            pending = [f for f in self._futures if not f.done()]
+        for future in pending:
+            future.cancel()
+        if pending:
+            _bump("cancelled", len(pending))
+        logging.info(f"Remedial prefetch finished: {self.stats()}")
+
+    def done(self):
+        with self._lock:
+            return all(f.done() for f in self._futures)
+
+    def stats(self):
+        used = 0
+        for key in list(self._prefetched):
+            entry = remedial_cache.peek(key)
+            if entry is not None and entry.used:
+                used += 1
+        return {
+            "requested": len(self.keys),
+            "prefetched": len(self._prefetched),
+            "used": used,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+        }
+
+
+metrics.register_collector("remedial_prefetch", prefetch_totals)
@@ -0,0 +1,297 @@
+"""
+Offline pre-generation of learning paths for a whole org.
+
+Collects every distinct (weak concept, branch) pair from auth payloads,
+fetch_all_concepts responses, live API_ALL_CONCEPTS_URL calls or a CSV,
+skips the pairs already cached, and generates the rest with the same prompt,
+model and cache key as the Learning Path tab (learning_paths.py). Results are
+written to the persistent learning-path cache the tab reads from, so a unit's
+paths can be built overnight instead of during class.
+
+Two modes:
+
+  concurrent (default)  --concurrency streamed calls at bulk priority, paced by
+                        the rate governor like the app's own calls
+  --batch               one OpenAI Batch API job (half price, finishes within
+                        24h); --no-wait submits it and exits
+
+Progress is appended to --checkpoint as JSON lines. Re-running the same command
+resumes: pairs found in the cache are skipped, failed or evicted ones are
+generated again, and a submitted batch is collected instead of being
+submitted again.
+
+  python pregen_learning_paths.py --cache lp.sqlite3 --csv concepts.csv
+  python pregen_learning_paths.py --cache lp.sqlite3 --payload auth/*.json --batch
+  python pregen_learning_paths.py --cache lp.sqlite3 --fetch-users users.txt \\
+      --org-code 012 --subject-id 1 --branch "Class 8"
+
+CSV files need concept and branch columns (ConceptText/BranchName also work).
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import learning_paths
+import llm_gateway
+from disk_cache import DiskCache
+from edubull_client import API_ALL_CONCEPTS_URL, DISK_CACHE_MAX_BYTES, post_json
+from learning_paths import LEARNING_PATH_MAX_TOKENS, LEARNING_PATH_WORKERS, build_prompt, cache_key
+from llm_scheduler import PRIORITY_BULK, scheduler
+
+BATCH_DONE_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+# ------------------- INPUTS -------------------
+def pairs_from_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            concept = row.get("concept") or row.get("ConceptText")
+            branch = row.get("branch") or row.get("BranchName")
+            if concept and branch:
+                yield concept, branch
+
+
+def pairs_from_payload(data, branch=None, all_concepts=False):
+    """Pairs from an auth payload (dict) or a fetch_all_concepts response (list)."""
+    if isinstance(data, dict):
+        branch = data.get("BranchName") or branch
+        concepts = data.get("ConceptList" if all_concepts else "WeakConceptList") or []
+    else:
+        concepts = [c for c in data if all_concepts or c.get("ConceptStatus") == "Weak"]
+    if not branch:
+        logging.warning(f"Skipping {len(concepts)} concepts with no branch; pass --branch")
+        return
+    for concept in concepts:
+        yield concept["ConceptText"], branch
+
+
+def fetch_user_concepts(user_ids, org_code, subject_id):
+    for user_id in user_ids:
+        try:
+            yield post_json(API_ALL_CONCEPTS_URL, {"OrgCode": org_code, "SubjectID": subject_id, "UserID": user_id})
+        except Exception as e:
+            logging.warning(f"Fetching concepts for user {user_id} failed: {e}")
+
+
+def pair_id(concept, branch):
+    return json.dumps(sorted(cache_key(concept, branch).items()))
+
+
+def distinct_pairs(pairs):
+    distinct = {}
+    for concept, branch in pairs:
+        distinct.setdefault(pair_id(concept, branch), (concept.strip(), branch.strip()))
+    return distinct
+
+
+# ------------------- CHECKPOINT -------------------
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        self.batches = {}  # batch_id -> {custom_id: [concept, branch]} not yet collected
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+    def _apply(self, event):
+        kind = event["event"]
+        if kind == "done":
+            self.done.add(event["id"])
+            self.failed.pop(event["id"], None)
+        elif kind == "failed":
+            self.failed[event["id"]] = event["error"]
+        elif kind == "batch_submitted":
+            self.batches[event["batch_id"]] = event["requests"]
+        elif kind == "batch_collected":
+            self.batches.pop(event["batch_id"], None)
+
+    def record(self, **event):
+        self._apply(event)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+# ------------------- CONCURRENT MODE -------------------
+def run_concurrent(todo, checkpoint, concurrency):
+    def generate(concept, branch):
+        return learning_paths.get_learning_path(concept, branch, priority=PRIORITY_BULK)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(generate, concept, branch): (pid, concept, branch)
+                   for pid, (concept, branch) in todo.items()}
+        for future in as_completed(futures):
+            pid, concept, branch = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                checkpoint.record(event="failed", id=pid, error=str(e))
+                logging.warning(f"{concept} ({branch}) failed: {e}")
+                continue
+            checkpoint.record(event="done", id=pid)
+            done += 1
+            if done % 10 == 0 or done == len(todo):
+                logging.info(f"Generated {done}/{len(todo)} learning paths")
+    return done
+
+
+# ------------------- BATCH MODE -------------------
+def submit_batch(client, todo, checkpoint):
+    requests = {}
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+        for i, (pid, (concept, branch)) in enumerate(todo.items()):
+            custom_id = f"lp-{i}"
+            requests[custom_id] = [concept, branch]
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": llm_gateway.model_for("learning_path"),
+                    "messages": [{"role": "system", "content": build_prompt(concept, branch)}],
+                    "max_tokens": LEARNING_PATH_MAX_TOKENS,
+                },
+            }) + "\n")
+        input_path = f.name
+    try:
+        with open(input_path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+    finally:
+        os.unlink(input_path)
+    batch = client.batches.create(
+        input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    checkpoint.record(event="batch_submitted", batch_id=batch.id, requests=requests)
+    logging.info(f"Submitted batch {batch.id} with {len(requests)} learning paths")
+    return batch.id
+
+
+def collect_batch(client, batch_id, checkpoint, wait, poll_interval):
+    """Store a finished batch's results; return the number stored, or None if it is still running."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in BATCH_DONE_STATES:
+            break
+        if not wait:
+            logging.info(f"Batch {batch_id} is {batch.status}; re-run later to collect it")
+            return None
+        logging.info(f"Batch {batch_id} is {batch.status}; checking again in {poll_interval:.0f}s")
+        time.sleep(poll_interval)
+
+    requests = checkpoint.batches[batch_id]
+    stored = 0
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            concept, branch = requests[result["custom_id"]]
+            pid = pair_id(concept, branch)
+            response = result.get("response") or {}
+            if response.get("status_code") != 200:
+                checkpoint.record(event="failed", id=pid, error=str(result.get("error") or response.get("status_code")))
+                continue
+            text = (response["body"]["choices"][0]["message"]["content"] or "").strip()
+            if not text:
+                checkpoint.record(event="failed", id=pid, error="empty completion")
+                continue
+            learning_paths.learning_path_cache.set(cache_key(concept, branch), text)
+            checkpoint.record(event="done", id=pid)
+            stored += 1
+    if batch.status != "completed":
+        logging.warning(f"Batch {batch_id} ended as {batch.status}; unfinished pairs will be retried")
+    checkpoint.record(event="batch_collected", batch_id=batch_id)
+    logging.info(f"Collected {stored} learning paths from batch {batch_id}")
+    return stored
+
+
+# ------------------- MAIN -------------------
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate learning paths into the shared cache")
+    parser.add_argument("--cache", help="SQLite file for the learning-path cache (default: LEARNING_PATH_DISK_CACHE)")
+    parser.add_argument("--csv", nargs="*", default=[], help="CSV files with concept and branch columns")
+    parser.add_argument("--payload", nargs="*", default=[],
+                        help="JSON files holding auth payloads or fetch_all_concepts responses")
+    parser.add_argument("--fetch-users", help="File of UserIDs whose concepts are fetched from the API")
+    parser.add_argument("--org-code", default="012")
+    parser.add_argument("--subject-id", type=int)
+    parser.add_argument("--branch", help="Branch for inputs that do not carry one (fetch_all_concepts lists)")
+    parser.add_argument("--all-concepts", action="store_true", help="Generate for every concept, not only weak ones")
+    parser.add_argument("--checkpoint", default="pregen_learning_paths.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch", action="store_true", help="Use the OpenAI Batch API")
+    parser.add_argument("--no-wait", action="store_true", help="With --batch: submit (or check) and exit")
+    parser.add_argument("--poll-interval", type=float, default=60)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be generated")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    cache = learning_paths.learning_path_cache
+    if args.cache:
+        cache.disk = DiskCache(args.cache, max_bytes=DISK_CACHE_MAX_BYTES)
+    if cache.disk is None:
+        parser.error("the learning-path cache is not persistent; pass --cache or set LEARNING_PATH_DISK_CACHE")
+
+    pairs = []
+    for path in args.csv:
+        pairs.extend(pairs_from_csv(path))
+    for path in args.payload:
+        with open(path, encoding="utf-8") as f:
+            pairs.extend(pairs_from_payload(json.load(f), args.branch, args.all_concepts))
+    if args.fetch_users:
+        with open(args.fetch_users, encoding="utf-8") as f:
+            user_ids = [line.strip() for line in f if line.strip()]
+        for data in fetch_user_concepts(user_ids, args.org_code, args.subject_id):
+            pairs.extend(pairs_from_payload(data, args.branch, args.all_concepts))
+
+    checkpoint = Checkpoint(args.checkpoint)
+    # The Batch API calls go straight to the shared OpenAI SDK client
+    batch_ready = llm_gateway.route_for("learning_path").provider == "openai" and llm_gateway.available("learning_path")
+    client = llm_gateway.get_provider("openai").client if batch_ready and not args.dry_run else None
+    if args.batch and client is None and not args.dry_run:
+        parser.error("--batch needs learning_path routed to OpenAI and OPENAI_API_KEY set")
+
+    # Results of a batch submitted by an earlier run come first
+    for batch_id in list(checkpoint.batches):
+        if client is not None:
+            collect_batch(client, batch_id, checkpoint, not args.no_wait, args.poll_interval)
+    pending = {tuple(request) for requests in checkpoint.batches.values() for request in requests.values()}
+
+    distinct = distinct_pairs(pairs)
+    # The cache decides what is missing; "done" in the checkpoint is only a hint, as entries expire or get evicted
+    todo = {
+        pid: pair for pid, pair in distinct.items()
+        if pair not in pending and learning_paths.get_cached_learning_path(*pair) is None
+    }
+    regenerated = sum(pid in checkpoint.done for pid in todo)
+    logging.info(f"{len(distinct)} distinct (concept, branch) pairs; {len(todo)} to generate"
+                 f" ({len(checkpoint.failed)} failed earlier, {regenerated} done earlier but no longer cached,"
+                 f" {len(pending)} in a running batch)")
+    if not todo or args.dry_run:
+        return
+
+    if args.batch:
+        batch_id = submit_batch(client, todo, checkpoint)
+        if not args.no_wait:
+            collect_batch(client, batch_id, checkpoint, True, args.poll_interval)
+        return
+
+    if args.concurrency > LEARNING_PATH_WORKERS:
+        logging.warning(f"Concurrency is capped at LEARNING_PATH_WORKERS={LEARNING_PATH_WORKERS}")
+    # This process only runs bulk work, so bulk may use every scheduler slot
+    scheduler.bulk_limit = args.concurrency
+    scheduler.set_limit(args.concurrency)
+    run_concurrent(todo, checkpoint, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Persistent bank of generated exam questions.
+
+A question set depends only on the topic, the concept, the Bloom level, the
+teacher's branch and the prompt, so it is stored by (topic, concept ID, Bloom
+level, branch, model, prompt version) in SQLite and served instantly on
+repeat requests from any teacher or process. Concurrent requests for the same
+set share one streamed LLM call (shared_generation.SharedGeneration), and
+QuestionSplitter turns that stream into
+question records as each question completes.
+
+When QUESTION_PREGENERATE is enabled, opening a batch's overview queues the
+missing sets for every concept at all five Bloom levels on a small shared
+worker pool (see PregenerationJob), at bulk priority in the LLM scheduler.
+
+Bump QUESTION_PROMPT_VERSION whenever build_prompt() changes.
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_gateway
+import metrics
+from caches import PersistentCache
+from disk_cache import DiskCache
+from edubull_client import DISK_CACHE_MAX_BYTES
+from learning_paths import normalize_concept
+from llm_scheduler import PRIORITY_BULK, PRIORITY_GENERATION
+from shared_generation import SharedGeneration
+
+QUESTION_MAX_TOKENS = 4000
+QUESTION_PROMPT_VERSION = "1"
+QUESTION_BANK_TTL = int(os.environ.get("QUESTION_BANK_TTL", str(30 * 24 * 3600)))
+QUESTION_BANK_MAXSIZE = int(os.environ.get("QUESTION_BANK_MAXSIZE", "2000"))
+# SQLite file backing the bank; set to an empty string to keep it in memory only
+QUESTION_BANK_DB = os.environ.get("QUESTION_BANK_DB", "question_bank.sqlite3")
+QUESTION_PREGENERATE = os.environ.get("QUESTION_PREGENERATE", "").lower() in ("1", "true", "yes")
+QUESTION_PREGEN_CONCURRENCY = int(os.environ.get("QUESTION_PREGEN_CONCURRENCY", "2"))
+QUESTION_WORKERS = int(os.environ.get("QUESTION_WORKERS", "8"))
+
+BLOOM_LEVELS = [
+    "L1 (Remember)",
+    "L2 (Understand)",
+    "L3 (Apply)",
+    "L4 (Analyze)",
+    "L5 (Evaluate)",
+]
+
+question_bank = PersistentCache(
+    "question_bank",
+    maxsize=QUESTION_BANK_MAXSIZE,
+    ttl=QUESTION_BANK_TTL,
+    disk=DiskCache(QUESTION_BANK_DB, max_bytes=DISK_CACHE_MAX_BYTES) if QUESTION_BANK_DB else None,
+)
+_generation = SharedGeneration(
+    "question_bank", "exam_questions", question_bank, QUESTION_WORKERS, max_tokens=QUESTION_MAX_TOKENS
+)
+_pregen_executor = ThreadPoolExecutor(max_workers=QUESTION_PREGEN_CONCURRENCY, thread_name_prefix="question-pregen")
+
+
+def bloom_short(bloom_level):
+    """'L4 (Analyze)' -> 'L4'."""
+    return bloom_level.split()[0]
+
+
+def cache_key(topic_id, concept_id, bloom, branch_name, model=None):
+    return {
+        "topic_id": int(topic_id),
+        "concept_id": int(concept_id),
+        "bloom": bloom_short(bloom),
+        "branch": normalize_concept(branch_name),
+        "model": model or llm_gateway.model_for("exam_questions"),
+        "prompt_version": QUESTION_PROMPT_VERSION,
+    }
+
+
+def build_prompt(topic_name, branch_name, concept_text, bloom):
+    bloom = bloom_short(bloom)
+    return (
+        f"You are a highly knowledgeable educational assistant named EeeBee, built by Edubull, and specialized in {topic_name}.\n\n"
+        f"Teacher Mode Instructions:\n"
+        f"- The user is a teacher instructing {branch_name} students under the NCERT curriculum.\n"
+        f"- Provide detailed suggestions on how to explain concepts and design assessments for the {branch_name} level.\n"
+        f"- Offer insights into common student difficulties and ways to address them.\n"
+        f"- Encourage a teaching methodology where students learn progressively, asking guiding questions rather than providing direct answers.\n"
+        f"- Maintain a professional, informative tone, and ensure all advice aligns with the NCERT curriculum.\n"
+        f"- Keep all mathematical expressions within LaTeX delimiters ($...$ or $$...$$).\n"
+        f"- Emphasize to the teacher the importance of fostering critical thinking.\n"
+        f"- If the teacher requests sample questions, provide them in a progressive manner, ensuring they prompt the student to reason through each step.\n\n"
+        f"Now, generate a set of 20 exam questions for the concept '{concept_text}' at Bloom's Taxonomy **{bloom}**.\n"
+        f"Label each question clearly with **({bloom})** and use LaTeX for any math.\n"
+    )
+
+
+def get_cached_questions(topic_id, concept_id, bloom, branch_name):
+    return _generation.get(cache_key(topic_id, concept_id, bloom, branch_name))
+
+
+def _messages(topic_name, concept_text, bloom, branch_name):
+    return [{"role": "system", "content": build_prompt(topic_name, branch_name, concept_text, bloom)}]
+
+
+def stream_questions(topic_id, topic_name, concept_id, concept_text, bloom, branch_name,
+                     on_queue=None, priority=PRIORITY_GENERATION):
+    """
+    Yield the question set text in chunks as it is generated. A banked set is
+    yielded in one piece. While the LLM call waits for a scheduler slot,
+    on_queue(position) is called instead. Raises whatever the LLM call raises.
+    """
+    return _generation.stream(cache_key(topic_id, concept_id, bloom, branch_name),
+                              _messages(topic_name, concept_text, bloom, branch_name),
+                              on_queue=on_queue, priority=priority)
+
+
+def get_questions(topic_id, topic_name, concept_id, concept_text, bloom, branch_name, priority=PRIORITY_GENERATION):
+    """Return the complete question set, generating it on a miss."""
+    return _generation.complete(cache_key(topic_id, concept_id, bloom, branch_name),
+                                _messages(topic_name, concept_text, bloom, branch_name), priority=priority)
+
+
+# ------------------- QUESTION RECORDS -------------------
+# "1. ...", "**2.** ...", "Q3) ...", "### Question 4: ..." -- but not "3.5 kg"
+_QUESTION_START = re.compile(r"^\s*(?:#{1,6}\s*)?(?:\*\*)?\s*(?:Q(?:uestion)?\s*)?(\d{1,3})\s*[.):](?:\*\*)?(?:\s|$)")
+
+
+class Question:
+    """One generated question; number is None for the text before the first question."""
+    __slots__ = ("number", "text")
+
+    def __init__(self, number, text):
+        self.number = number
+        self.text = text
+
+    def __repr__(self):
+        return f"Question({self.number!r}, {self.text[:40]!r})"
+
+
+class QuestionSplitter:
+    """
+    Split streamed question-set text into Question records. feed() returns the
+    questions completed by the new text (a question is complete once the next
+    one starts); close() returns the last one when the stream ends.
+    """
+
+    def __init__(self):
+        self.questions = []
+        self._parts = []
+        self._partial_line = ""
+        self._number = None
+        self._lines = []
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    @property
+    def current_number(self):
+        """Number of the question being written, or None before the first one."""
+        return self._number
+
+    def feed(self, text):
+        self._parts.append(text)
+        *lines, self._partial_line = (self._partial_line + text).split("\n")
+        completed = []
+        for line in lines:
+            match = _QUESTION_START.match(line)
+            if match:
+                completed.extend(self._flush())
+                self._number = int(match.group(1))
+            self._lines.append(line)
+        return completed
+
+    def close(self):
+        if self._partial_line:
+            self.feed("\n")
+            self._parts.pop()
+        return self._flush()
+
+    def _flush(self):
+        text = "\n".join(self._lines).strip()
+        self._lines = []
+        if not text:
+            return []
+        question = Question(self._number, text)
+        self.questions.append(question)
+        return [question]
+
+
+def split_questions(text):
+    """Split a complete question set into Question records."""
+    splitter = QuestionSplitter()
+    splitter.feed(text)
+    splitter.close()
+    return splitter.questions
+
+
+# ------------------- PRE-GENERATION -------------------
+class PregenerationJob:
+    """Background generation of every missing (concept, Bloom level) set for one batch."""
+
+    def __init__(self, topic_id, topic_name, branch_name, concepts):
+        self._futures = []
+        self._lock = threading.Lock()
+        self.failed = 0
+        self.total = 0
+        for concept in concepts:
+            for bloom in BLOOM_LEVELS:
+                self.total += 1
+                if get_cached_questions(topic_id, concept["ConceptID"], bloom, branch_name) is not None:
+                    continue
+                self._futures.append(_pregen_executor.submit(
+                    self._run, topic_id, topic_name, concept["ConceptID"], concept["ConceptText"],
+                    bloom, branch_name,
+                ))
+        self.cached_at_start = self.total - len(self._futures)
+        logging.info(f"Question pre-generation queued {len(self._futures)} of {self.total} sets")
+
+    def _run(self, *args):
+        try:
+            get_questions(*args, priority=PRIORITY_BULK)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logging.warning(f"Question pre-generation failed: {e}")
+
+    def progress(self):
+        """Return (ready, total) question sets for this batch."""
+        finished = sum(1 for f in self._futures if f.done() and not f.cancelled())
+        return self.cached_at_start + finished - self.failed, self.total
+
+    def done(self):
+        return all(f.done() for f in self._futures)
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+
+
+def bank_stats():
+    return _generation.stats()
+
+
+metrics.register_collector("question_bank", bank_stats)
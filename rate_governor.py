@@ -0,0 +1,244 @@
+"""
+Adaptive rate-limit governor for LLM calls.
+
+One RateGovernor per API key paces new calls with two token buckets, requests
+per minute and tokens per minute. The buckets start from LLM_RPM / LLM_TPM and
+are resized from the x-ratelimit-* headers of every response. A call whose
+budget is exhausted waits for the bucket to refill instead of being sent and
+rejected: reserve() returns the wait, and llm_client sleeps it outside the
+call's scheduler slot.
+
+429s and overload errors (5xx, timeouts) are retried up to LLM_MAX_RETRIES
+times after Retry-After or full-jitter backoff. Concurrency in the LLM
+scheduler is adapted AIMD-style: halved on a throttle (at most once per
+cool-down) and raised by one after a full window of successful calls.
+"""
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+import metrics
+from llm_scheduler import LLM_MAX_CONCURRENCY, scheduler
+
+LLM_RPM = int(os.environ.get("LLM_RPM", "500"))
+LLM_TPM = int(os.environ.get("LLM_TPM", "30000"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+LLM_MIN_CONCURRENCY = int(os.environ.get("LLM_MIN_CONCURRENCY", "1"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+MAX_PACING_WAIT = 60.0
+DECREASE_COOLDOWN = 5.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError"}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """'6m0s' -> 360.0, '20ms' -> 0.02, '1.5' -> 1.5; None if unparseable."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def estimate_tokens(kwargs):
+    """Rate-limit cost of a request: rough prompt size plus the completion budget."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+    return prompt_chars // 4 + (kwargs.get("max_tokens") or 1000)
+
+
+def error_status(exc):
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(exc, "code", None), int):
+        # google-genai errors carry the HTTP status as .code
+        status = exc.code
+    return status
+
+
+def is_retryable(exc):
+    if getattr(exc, "code", None) == "insufficient_quota":
+        return False
+    return error_status(exc) in RETRYABLE_STATUS or type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def is_throttled(exc):
+    """True for rate-limit and overload errors (the ones worth a friendlier message)."""
+    return error_status(exc) in (429, 503, 529)
+
+
+def retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        return parse_duration(headers["retry-after-ms"] + "ms")
+    return parse_duration(headers.get("retry-after"))
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute; reservations may drive it negative."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount and return the seconds to wait until the bucket is back at zero."""
+        self._refill(now)
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens * 60 / self.capacity
+
+    def sync(self, limit, remaining, now):
+        """Adopt the server's view of the budget."""
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+
+    def refund(self, amount, now):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateGovernor:
+    def __init__(self, key_id, rpm=LLM_RPM, tpm=LLM_TPM):
+        self.key_id = key_id
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._successes = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def reserve(self, estimate):
+        """Reserve budget for a call costing `estimate` tokens; return the seconds to wait before sending it."""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(estimate, now),
+                self._blocked_until - now,
+            )
+        wait = min(wait, MAX_PACING_WAIT)
+        if wait > 0:
+            metrics.observe("eeebee_llm_rate_limit_wait_seconds", wait,
+                            help_text="Time LLM calls were paced by the rate-limit governor")
+        return max(wait, 0.0)
+
+    def settle(self, estimate, actual_tokens):
+        """Give back the part of a call's token reservation it did not use."""
+        if actual_tokens is None or actual_tokens >= estimate:
+            return
+        with self._lock:
+            self.tokens.refund(estimate - actual_tokens, time.monotonic())
+
+    def record_success(self, headers):
+        """Note an accepted call and adopt the budgets from its response headers."""
+        now = time.monotonic()
+        with self._lock:
+            if headers:
+                self._sync(headers, now)
+            self._successes += 1
+            increase = self._successes >= scheduler.limit and scheduler.limit < LLM_MAX_CONCURRENCY
+            if increase:
+                self._successes = 0
+        if increase:
+            scheduler.set_limit(scheduler.limit + 1)
+
+    def _sync(self, headers, now):
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        self.requests.sync(number("x-ratelimit-limit-requests"), number("x-ratelimit-remaining-requests"), now)
+        self.tokens.sync(number("x-ratelimit-limit-tokens"), number("x-ratelimit-remaining-tokens"), now)
+
+    def record_throttle(self, exc, attempt):
+        """Note a retryable failure and return how long to wait before retrying."""
+        now = time.monotonic()
+        delay = retry_after(exc)
+        if delay is None:
+            delay = backoff_delay(attempt)
+        decrease = False
+        with self._lock:
+            self.retries += 1
+            self._successes = 0
+            if is_throttled(exc):
+                self.throttled += 1
+                self._blocked_until = max(self._blocked_until, now + delay)
+                if now - self._last_decrease >= DECREASE_COOLDOWN:
+                    self._last_decrease = now
+                    decrease = True
+        if decrease and scheduler.limit > LLM_MIN_CONCURRENCY:
+            new_limit = max(LLM_MIN_CONCURRENCY, scheduler.limit // 2)
+            logging.warning(f"LLM throttled ({error_status(exc)}); concurrency {scheduler.limit} -> {new_limit}")
+            scheduler.set_limit(new_limit)
+        metrics.inc("eeebee_llm_retries_total", help_text="LLM calls retried after throttling or overload",
+                    status=str(error_status(exc) or type(exc).__name__))
+        return delay
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "rpm_limit": self.requests.capacity,
+                "requests_available": self.requests.tokens,
+                "tpm_limit": self.tokens.capacity,
+                "tokens_available": self.tokens.tokens,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "concurrency_limit": scheduler.limit,
+            }
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def governor_for(provider):
+    """The governor for the provider's API key (keys are only ever held as a short hash)."""
+    api_key = getattr(provider, "api_key", None) or ""
+    key_id = hashlib.sha256(str(api_key).encode("utf-8")).hexdigest()[:12]
+    with _governors_lock:
+        governor = _governors.get(key_id)
+        if governor is None:
+            governor = _governors[key_id] = RateGovernor(key_id)
+        return governor
+
+
+def governor_stats():
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {governor.key_id: governor.stats() for governor in governors}
+
+
+metrics.register_collector("llm_rate_governor", governor_stats)
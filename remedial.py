@@ -0,0 +1,127 @@
+"""
+Remedial resources for a concept, shared across all sessions.
+
+WeakConcept_Remedy_List_ByConceptID returns the same content for every student,
+so responses are cached process-wide by (TopicID, ConceptID) together with
+their formatted markdown, which is therefore built once per concept.
+"""
+import os
+import threading
+
+import metrics
+from caches import TTLCache
+from edubull_client import API_CONTENT_URL, post_json
+from edubull_async import afetch_remedial_resources, fetch_many
+
+REMEDIAL_CACHE_TTL = int(os.environ.get("REMEDIAL_CACHE_TTL", "3600"))
+REMEDIAL_CACHE_MAXSIZE = int(os.environ.get("REMEDIAL_CACHE_MAXSIZE", "5000"))
+
+remedial_cache = TTLCache("remedial_resources", maxsize=REMEDIAL_CACHE_MAXSIZE, ttl=REMEDIAL_CACHE_TTL)
+
+# Process-wide count of prefetched entries that a page later actually read
+_prefetch_used = 0
+_prefetch_lock = threading.Lock()
+
+
+class RemedialEntry:
+    __slots__ = ("resources", "markdown", "prefetched", "used")
+
+    def __init__(self, resources, prefetched=False):
+        self.resources = resources
+        self.markdown = format_remedial_resources(resources)
+        self.prefetched = prefetched
+        self.used = False
+
+
+def prefetch_used_count():
+    return _prefetch_used
+
+
+def _lookup(key):
+    global _prefetch_used
+    entry = remedial_cache.get(key)
+    if entry is not None and entry.prefetched and not entry.used:
+        with _prefetch_lock:
+            if not entry.used:
+                entry.used = True
+                _prefetch_used += 1
+    return entry
+
+
+def format_remedial_resources(resources):
+    """
+    Format resources data into a chat-friendly message.
+    """
+    if not resources:
+        return "No remedial resources available for this concept."
+
+    message = ""
+
+    if resources.get("Video_List"):
+        message += "**🎥 Video Lectures:**\n"
+        for video in resources["Video_List"]:
+            video_url = f"https://www.edubull.com/courses/videos/{video.get('LectureID', '')}"
+            title = video.get('LectureTitle', 'Video Lecture')
+            message += f"- [{title}]({video_url})\n"
+        message += "\n"
+
+    if resources.get("Notes_List"):
+        message += "**📄 Study Notes:**\n"
+        for note in resources["Notes_List"]:
+            note_url = f"{note.get('FolderName', '')}{note.get('PDFFileName', '')}"
+            title = note.get('NotesTitle', 'Study Notes')
+            message += f"- [{title}]({note_url})\n"
+        message += "\n"
+
+    if resources.get("Exercise_List"):
+        message += "**📝 Practice Exercises:**\n"
+        for exercise in resources["Exercise_List"]:
+            exercise_url = f"{exercise.get('FolderName', '')}{exercise.get('ExerciseFileName', '')}"
+            title = exercise.get('ExerciseTitle', 'Practice Exercise')
+            message += f"- [{title}]({exercise_url})\n"
+
+    return message
+
+
+def cache_key(topic_id, concept_id):
+    return (int(topic_id), int(concept_id))
+
+
+def get_remedial(topic_id, concept_id):
+    """Return the cached RemedialEntry for a concept, fetching it on a miss. Raises on fetch errors."""
+    key = cache_key(topic_id, concept_id)
+    entry = _lookup(key)
+    if entry is None:
+        resources = post_json(API_CONTENT_URL, {"TopicID": key[0], "ConceptID": key[1]})
+        entry = RemedialEntry(resources)
+        remedial_cache.set(key, entry)
+    return entry
+
+
+def get_remedial_many(keys, limit=10):
+    """
+    Return {(topic_id, concept_id): RemedialEntry} for every key that could be loaded.
+
+    Cache misses are fetched concurrently; failed fetches are left out and not cached.
+    """
+    entries = {}
+    missing = []
+    for topic_id, concept_id in keys:
+        key = cache_key(topic_id, concept_id)
+        entry = _lookup(key)
+        if entry is None:
+            missing.append(key)
+        else:
+            entries[key] = entry
+
+    if missing:
+        missing = list(dict.fromkeys(missing))
+        for key, resources in zip(missing, fetch_many(afetch_remedial_resources, missing, limit=limit)):
+            if resources is not None:
+                entry = RemedialEntry(resources)
+                remedial_cache.set(key, entry)
+                entries[key] = entry
+    return entries
+
+
+metrics.register_collector("remedial_cache", lambda: {**remedial_cache.stats(), "prefetch_used": prefetch_used_count()})
@@ -0,0 +1,108 @@
+"""
+LLM-generated texts shared across sessions.
+
+Learning paths, exam question sets and canonical chat answers all work the
+same way: the text depends only on a small key, so it is cached in a
+PersistentCache by that key and generated at most once at a time. A
+background producer owns each in-flight generation (StreamingSingleFlight)
+and every caller follows its chunks as they arrive, so the result is still
+cached if they all navigate away. The LLM call is queued at the most urgent
+priority of the callers waiting for it (SharedPriorities).
+
+Modules configure one SharedGeneration each and keep their own cache keys
+and prompts.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_gateway
+from llm_scheduler import PRIORITY_GENERATION, QueuePosition, SharedPriorities, scheduler
+from singleflight import StreamingSingleFlight
+
+
+def _whole(text):
+    yield text
+
+
+class SharedGeneration:
+    """
+    Cached, coalesced streaming generation for one call site.
+
+    Keys are the cache's flat key dicts; a key's "model" entry is the model
+    the text is generated with. replay(text) turns a cached text into chunks
+    (by default the whole text at once).
+    """
+
+    def __init__(self, name, call_site, cache, workers, max_tokens=None, replay=_whole):
+        self.name = name
+        self.call_site = call_site
+        self.cache = cache
+        self.max_tokens = max_tokens
+        self.replay = replay
+        self._streams = StreamingSingleFlight(
+            name, ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name.replace("_", "-"))
+        )
+        self._priorities = SharedPriorities(call_site, scheduler)
+
+    def get(self, key):
+        """The cached text for key, or None."""
+        entry = self.cache.get(key)
+        return entry["value"] if entry else None
+
+    def stream(self, key, messages, on_queue=None, priority=PRIORITY_GENERATION):
+        """
+        Yield the text for key in chunks: replayed from the cache on a hit,
+        otherwise streamed from the (possibly shared) LLM call for messages.
+        While that call waits for a scheduler slot, on_queue(position) is
+        called instead. Raises whatever the LLM call raised.
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            yield from self.replay(entry["value"])
+            return
+        flight_key = tuple(sorted(key.items()))
+        # Joining a queued generation (e.g. a bulk one) raises it to this caller's priority
+        call = self._priorities.join(flight_key, priority)
+        for item in self._streams.stream(flight_key, self._produce, flight_key, call, key, messages):
+            if isinstance(item, QueuePosition):
+                if on_queue is not None:
+                    on_queue(item)
+            else:
+                yield item
+
+    def complete(self, key, messages, priority=PRIORITY_GENERATION):
+        """Return the whole text for key, generating it on a miss."""
+        return "".join(self.stream(key, messages, priority=priority)).strip()
+
+    def _produce(self, flight_key, call, key, messages):
+        try:
+            # Another producer may have finished between the caller's cache check and now
+            entry = self.cache.get(key)
+            if entry is not None:
+                yield entry["value"]
+                return
+            ticket = self._priorities.enqueue(call)
+            for position in ticket.positions():
+                yield QueuePosition(position)
+            response = llm_gateway.stream(
+                self.call_site, messages, model=key["model"], max_tokens=self.max_tokens, ticket=ticket
+            )
+            chunks = []
+            for content in response:
+                chunks.append(content)
+                yield content
+            text = "".join(chunks).strip()
+            if text:
+                self.cache.set(key, text)
+        finally:
+            self._priorities.finish(flight_key, call)
+
+    def invalidate(self, key=None):
+        """Drop one cached text (by its key dict), or all of them."""
+        if key is None:
+            self.cache.clear()
+            return True
+        return self.cache.delete(key)
+
+    def stats(self):
+        streams = self._streams.stats()
+        return {**self.cache.stats(), "coalesced": streams["coalesced"], "in_flight": streams["in_flight"]}
@@ -0,0 +1,184 @@
+"""
+Single-flight request coalescing.
+
+While a call for a given key is in flight, other callers with the same key wait
+for that call's result instead of starting their own. Nothing is cached once the
+call finishes; the next caller after that starts a fresh call.
+
+StreamingSingleFlight does the same for generators: one background producer
+per key, and every caller follows its items as they are produced.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+
+def normalize_payload(payload):
+    """Payload as canonical JSON, ignoring key order and int/str differences."""
+    normalized = {str(k): str(v) for k, v in (payload or {}).items()}
+    return json.dumps(normalized, sort_keys=True)
+
+
+def normalize_key(endpoint, payload):
+    """Build a coalescing key that ignores payload key order and int/str differences."""
+    return endpoint, normalize_payload(payload)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-based coalescing group for blocking callers."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"name": self.name, "calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class _Stream:
+    """Items of one producer run, readable by any number of followers while it runs."""
+
+    def __init__(self):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def append(self, item):
+        with self._cond:
+            self.items.append(item)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.finished = True
+            self.error = error
+            self._cond.notify_all()
+
+    def follow(self):
+        position = 0
+        while True:
+            with self._cond:
+                while position >= len(self.items) and not self.finished:
+                    self._cond.wait()
+                new_items = self.items[position:]
+                position = len(self.items)
+                finished, error = self.finished, self.error
+            yield from new_items
+            if finished and position >= len(self.items):
+                if error is not None:
+                    raise error
+                return
+
+
+class StreamingSingleFlight:
+    """
+    Coalescing group for generator functions. The producer runs on `executor`,
+    so it finishes (and can cache its result) even if every follower stops
+    reading early; a follower that joins late first gets the items so far.
+    """
+
+    def __init__(self, name, executor):
+        self.name = name
+        self.executor = executor
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def stream(self, key, produce, *args, **kwargs):
+        """Return an iterator over the items of produce(*args, **kwargs), shared per key."""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self.coalesced += 1
+            else:
+                stream = self._streams[key] = _Stream()
+                self.calls += 1
+                self.executor.submit(self._run, key, stream, produce, args, kwargs)
+        return stream.follow()
+
+    def _run(self, key, stream, produce, args, kwargs):
+        error = None
+        try:
+            for item in produce(*args, **kwargs):
+                stream.append(item)
+        except Exception as e:
+            logging.warning(f"{self.name} stream failed: {e}")
+            error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            stream.finish(error)
+
+    def stats(self):
+        with self._lock:
+            return {"name": self.name, "calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._streams)}
+
+
+class AsyncSingleFlight:
+    """Coalescing group for coroutines; must only be used from one event loop."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield() so one waiter being cancelled does not cancel the shared call
+            return await asyncio.shield(future)
+
+        self.calls += 1
+        future = asyncio.ensure_future(coro_fn(*args, **kwargs))
+        self._calls[key] = future
+        future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {"name": self.name, "calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
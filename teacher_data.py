@@ -0,0 +1,162 @@
+"""
+Per-batch teacher data with stale-while-revalidate caching.
+
+Teachers flip between the same handful of batches during a period. The last
+good response for each (BatchID, TopicID, OrgCode) is served immediately and
+refreshed in the background once it is older than BATCH_FRESH_SECONDS.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import metrics
+from caches import StaleWhileRevalidateCache, TTLCache
+from edubull_async import apost_json, run_sync
+from edubull_client import API_STUDENT_INFO, API_TEACHER_WEAK_CONCEPTS, post_json, post_json_streamed
+from models import BATCH_ARRAYS, parse_batch_data
+
+BATCH_FRESH_SECONDS = int(os.environ.get("BATCH_FRESH_SECONDS", "120"))
+BATCH_MAX_AGE_SECONDS = int(os.environ.get("BATCH_MAX_AGE_SECONDS", "3600"))
+CAPABILITY_TTL_SECONDS = int(os.environ.get("CAPABILITY_TTL_SECONDS", str(6 * 3600)))
+
+# Which batch-data format each org's backend supports
+FORMAT_COMBINED = "combined"  # API_STUDENT_INFO returns Concepts and Students
+FORMAT_LEGACY = "legacy"      # only API_TEACHER_WEAK_CONCEPTS is usable
+
+org_capabilities = TTLCache("org_capabilities", maxsize=10000, ttl=CAPABILITY_TTL_SECONDS)
+_decisions = {"combined": 0, "legacy": 0, "race": 0, "race_combined": 0, "race_legacy": 0, "reclassified": 0}
+_decisions_lock = threading.Lock()
+
+batch_cache = StaleWhileRevalidateCache(
+    "batch_student_info",
+    fresh_for=BATCH_FRESH_SECONDS,
+    max_age=BATCH_MAX_AGE_SECONDS,
+)
+
+
+def _record(decision):
+    with _decisions_lock:
+        _decisions[decision] += 1
+
+
+def _is_combined(data):
+    return isinstance(data, dict) and "Concepts" in data and "Students" in data
+
+
+async def _race_formats(params):
+    """
+    Call both endpoints concurrently for an org whose format is unknown and
+    return (format, data).
+
+    A combined response (Concepts and Students) is returned as soon as it
+    arrives and classifies the org as combined. A legacy response that
+    arrives first is held until the combined call answers: it is returned,
+    classified as legacy, if the combined call answers in the old shape, and
+    returned without classifying the org if the combined call fails. Calls
+    still pending are cancelled.
+    """
+    combined_task = asyncio.ensure_future(apost_json(API_STUDENT_INFO, params))
+    legacy_task = asyncio.ensure_future(apost_json(API_TEACHER_WEAK_CONCEPTS, params))
+    pending = {combined_task, legacy_task}
+    combined_is_legacy = False
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if combined_task in done:
+                if combined_task.exception() is not None:
+                    # A failed call says nothing about the org's format, so don't classify it
+                    logging.warning(f"Combined batch endpoint failed during format detection: "
+                                    f"{combined_task.exception()}")
+                elif _is_combined(combined_task.result()):
+                    return FORMAT_COMBINED, combined_task.result()
+                else:
+                    combined_is_legacy = True
+            if combined_task.done() and legacy_task.done() and legacy_task.exception() is None:
+                return (FORMAT_LEGACY if combined_is_legacy else None), legacy_task.result()
+        # Neither response was usable; surface the legacy call's error
+        raise legacy_task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+        for task in (combined_task, legacy_task):
+            if task.done() and not task.cancelled():
+                task.exception()  # mark any failure as retrieved
+
+
+def fetch_batch_data(batch_id, topic_id, org_code):
+    """
+    Fetch concept and student data for a batch, uncached.
+
+    Calls only the endpoint the org is known to support. Orgs not yet classified
+    race both endpoints; the outcome is remembered for CAPABILITY_TTL_SECONDS.
+    """
+    params = {
+        "BatchID": batch_id,
+        "TopicID": topic_id,
+        "OrgCode": org_code
+    }
+    known_format = org_capabilities.get(org_code)
+
+    if known_format == FORMAT_LEGACY:
+        _record("legacy")
+        return post_json(API_TEACHER_WEAK_CONCEPTS, params)
+
+    if known_format == FORMAT_COMBINED:
+        _record("combined")
+        data = post_json_streamed(API_STUDENT_INFO, params, BATCH_ARRAYS)
+        if _is_combined(data):
+            return data
+        # The org's backend changed format; forget it and fall back once
+        _record("reclassified")
+        org_capabilities.set(org_code, FORMAT_LEGACY)
+        logging.info(f"Org {org_code} reclassified as {FORMAT_LEGACY}")
+        return post_json(API_TEACHER_WEAK_CONCEPTS, params)
+
+    _record("race")
+    detected_format, data = run_sync(_race_formats(params))
+    if detected_format is not None:
+        _record(f"race_{detected_format}")
+        org_capabilities.set(org_code, detected_format)
+        logging.info(f"Org {org_code} detected as {detected_format}")
+    return data
+
+
+def capability_stats():
+    """Decision counts plus the current format of every classified org."""
+    with _decisions_lock:
+        decisions = dict(_decisions)
+    orgs = {org: org_capabilities.peek(org) for org in org_capabilities.keys()}
+    return {
+        "decisions": decisions,
+        "orgs": {org: fmt for org, fmt in orgs.items() if fmt is not None},
+    }
+
+
+def get_batch_data(batch_id, topic_id, org_code):
+    """Return (data, fetched_at) for a batch as parsed records, serving cached data while it refreshes."""
+    return batch_cache.get(
+        (batch_id, topic_id, org_code),
+        lambda: parse_batch_data(fetch_batch_data(batch_id, topic_id, org_code)),
+    )
+
+
+def is_batch_cached(batch_id, topic_id, org_code):
+    return batch_cache.peek((batch_id, topic_id, org_code)) is not None
+
+
+def format_age(fetched_at):
+    """Human-readable age of a fetched_at timestamp, e.g. 'just now' or '3 min ago'."""
+    age = max(0, int(time.time() - fetched_at))
+    if age < 10:
+        return "just now"
+    if age < 60:
+        return f"{age} sec ago"
+    if age < 3600:
+        return f"{age // 60} min ago"
+    return f"{age // 3600} hr ago"
+
+
+metrics.register_collector("batch_cache", batch_cache.stats)
+metrics.register_collector("org_capabilities", capability_stats)
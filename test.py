@@ -1,6 +1,6 @@
 import streamlit as st
 import os
-from google import genai
+import llm_gateway
 import tempfile
 import fitz  # PyMuPDF for PDF handling
 import docx  # python-docx for DOCX handling
@@ -102,38 +102,22 @@ for message in st.session_state.messages:
 # Function to generate response from Gemini with streaming
 def generate_gemini_response(prompt, document_content="", conversation_history=None):
     try:
-        # Get API key from Streamlit secrets
-        api_key = st.secrets["gemini_api_key"]
+        # Get API key from Streamlit secrets; the gateway keeps one shared Gemini client
+        llm_gateway.configure(gemini_api_key=st.secrets["gemini_api_key"])
         
-        # Initialize the client with the API key
-        client = genai.Client(api_key=api_key)
-        
-        # Prepare the full prompt with conversation history and document content
-        full_prompt = ""
-        
-        # Add conversation history if available
-        if conversation_history and len(conversation_history) > 0:
-            full_prompt += "Previous conversation:\n"
-            for msg in conversation_history:
-                role = "User" if msg["role"] == "user" else "Assistant"
-                full_prompt += f"{role}: {msg['content']}\n"
-            full_prompt += "\n"
-        
-        # Add document content if available
+        # Document content goes in the system message, followed by the conversation
+        messages = []
         if document_content:
-            full_prompt += f"Document content:\n{document_content}\n\n"
+            messages.append({"role": "system", "content": f"Document content:\n{document_content}"})
+        for msg in conversation_history or []:
+            messages.append({"role": msg["role"], "content": msg["content"]})
         
-        # Add the current prompt
-        full_prompt += f"User: {prompt}\n\nAssistant:"
-        
-        # Use streaming response
-        response_stream = client.models.generate_content_stream(
-            model="gemini-2.0-flash", 
-            contents=full_prompt
-        )
+        # Add the current prompt unless the history already ends with it
+        if not messages or messages[-1] != {"role": "user", "content": prompt}:
+            messages.append({"role": "user", "content": prompt})
         
-        # Return the stream for processing
-        return response_stream
+        # Stream text chunks; the model is set by the "document_chat" route
+        return llm_gateway.stream("document_chat", messages)
     except Exception as e:
         return f"Error generating response: {str(e)}"
 
@@ -167,10 +151,9 @@ if prompt := st.chat_input("Ask me anything..."):
         else:
             # Process the streaming response
             full_response = ""
-            for chunk in response_stream:
-                if hasattr(chunk, 'text'):
-                    full_response += chunk.text
-                    message_placeholder.markdown(full_response + "▌")
+            for text in response_stream:
+                full_response += text
+                message_placeholder.markdown(full_response + "▌")
             
             # Update with final response
             message_placeholder.markdown(full_response)
@@ -0,0 +1,47 @@
+"""
+Tests for answer_cache's shared first-turn answers, run against the fake LLM provider.
+
+  python -m pytest test_answer_cache.py
+"""
+import os
+
+# Set before the imports: the gateway and the cache read these at import time
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["ANSWER_DISK_CACHE"] = ""
+os.environ["ANSWER_REPLAY_DELAY"] = "0"
+
+import answer_cache  # noqa: E402
+import llm_gateway  # noqa: E402
+from llm_providers import FakeProvider  # noqa: E402
+from system_prompts import STUDENT_PROMPT_PREFIX, student_prompt  # noqa: E402
+
+
+def _answer(prompt_text, topic_name, branch_name):
+    key = answer_cache.canonical_key(prompt_text, topic_name, branch_name)
+    return key, "".join(answer_cache.stream_answer(key, topic_name, branch_name, prompt_text))
+
+
+def test_students_with_different_weak_concepts_share_an_answer():
+    provider = FakeProvider()
+    llm_gateway.set_provider("fake", provider)
+    answer_cache.invalidate()
+
+    # Their full system prompts differ, but the canonical answer does not depend on them
+    assert student_prompt("Fractions", "Class 8", ("Equivalent fractions",)) != \
+        student_prompt("Fractions", "Class 8", ("Mixed numbers", "Decimals"))
+    first_key, first = _answer("Can you explain the concept of Equivalent Fractions?", "Fractions", "Class 8")
+    second_key, second = _answer("can you explain the concept of  equivalent fractions", "Fractions ", "class 8")
+
+    assert first_key == second_key
+    assert first and first == second
+    assert len(provider.requests) == 1
+    system = provider.requests[0]["messages"][0]["content"]
+    assert system.startswith(STUDENT_PROMPT_PREFIX)
+    assert "weak concepts are:" not in system
+
+
+def test_topic_and_branch_are_part_of_the_key():
+    key = answer_cache.canonical_key("Help me understand ratios", "Ratios", "Class 7")
+    assert key != answer_cache.canonical_key("Help me understand ratios", "Ratios", "Class 8")
+    assert key != answer_cache.canonical_key("Help me understand ratios", "Percentages", "Class 7")
+    assert answer_cache.canonical_key("What is a ratio?", "Ratios", "Class 7") is None
@@ -0,0 +1,29 @@
+"""
+Tests for fastjson.stream_arrays: the ijson and plain-json paths must return the same shape.
+
+  python -m pytest test_fastjson.py
+"""
+import io
+
+import pytest
+
+import fastjson
+
+BODY = (
+    b'{"Status": "Success", "Students": null, "Concepts": [{"ConceptID": 1, "Remark": null}],'
+    b' "Note": null, "Summary": {"Total": 1}, "Ids": [1, 2]}'
+)
+CONVERTERS = {"Students": dict, "Concepts": dict}
+EXPECTED = {"Status": "Success", "Students": None, "Concepts": [{"ConceptID": 1, "Remark": None}], "Note": None}
+
+
+def test_null_array_without_ijson(monkeypatch):
+    monkeypatch.setattr(fastjson, "ijson", None)
+
+    assert fastjson.stream_arrays(io.BytesIO(BODY), CONVERTERS) == EXPECTED
+
+
+def test_null_array_with_ijson():
+    pytest.importorskip("ijson")
+
+    assert fastjson.stream_arrays(io.BytesIO(BODY), CONVERTERS) == EXPECTED
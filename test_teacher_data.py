@@ -0,0 +1,45 @@
+"""
+Tests for teacher_data's batch-format detection, with the Edubull endpoints replaced by coroutines.
+
+  python -m pytest test_teacher_data.py
+"""
+import asyncio
+
+import teacher_data
+from edubull_client import API_STUDENT_INFO
+
+COMBINED = {"Concepts": [{"ConceptID": 1}], "Students": [{"UserID": 7}]}
+LEGACY = [{"ConceptID": 1}]
+
+
+def _endpoints(combined, legacy):
+    """apost_json stand-in; each endpoint is (delay, response or exception)."""
+    async def apost_json(url, params):
+        delay, response = combined if url == API_STUDENT_INFO else legacy
+        await asyncio.sleep(delay)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return apost_json
+
+
+def test_combined_org_is_classified_when_legacy_answers_first(monkeypatch):
+    monkeypatch.setattr(teacher_data, "apost_json", _endpoints((0.1, COMBINED), (0.01, LEGACY)))
+    teacher_data.org_capabilities.clear()
+
+    data = teacher_data.fetch_batch_data(3, 5, "race-org")
+
+    assert data == COMBINED
+    assert teacher_data.org_capabilities.get("race-org") == teacher_data.FORMAT_COMBINED
+
+
+def test_legacy_org_is_classified_once_combined_answers_in_the_old_shape(monkeypatch):
+    monkeypatch.setattr(teacher_data, "apost_json", _endpoints((0.05, {"Concepts": []}), (0.01, LEGACY)))
+
+    assert asyncio.run(teacher_data._race_formats({})) == (teacher_data.FORMAT_LEGACY, LEGACY)
+
+
+def test_legacy_data_is_unclassified_when_combined_fails(monkeypatch):
+    monkeypatch.setattr(teacher_data, "apost_json", _endpoints((0.05, RuntimeError("down")), (0.01, LEGACY)))
+
+    assert asyncio.run(teacher_data._race_formats({})) == (None, LEGACY)